@@ -5,15 +5,28 @@ Enhanced with real-time internet research and continuous learning
 import asyncio
 import aiohttp
 import logging
-from typing import Optional, Dict, List
-from config import OPENROUTER_API_KEY
+import time
+from typing import AsyncIterator, Optional, Dict, List, Tuple
+from config import OPENROUTER_API_KEY, OPENROUTER_BASE_URL, WEB_RESEARCH_ENABLED
 from literature_knowledge import (
     generate_literature_context, get_literature_system_prompt,
-    get_writer_knowledge, get_work_knowledge, get_movement_knowledge
+    get_writer_knowledge, get_work_knowledge, get_movement_knowledge,
+    match_writer, match_work, match_movement
 )
-from neural_trainer import record_user_feedback, optimize_response, get_training_metrics
+import literature_knowledge
+from neural_trainer import record_user_feedback, optimize_stream, get_training_metrics, shutdown_training
 from web_scraper import LiteratureWebScraper
+from chatgpt_brain import generate_offline_answer
+from question_router import route_question, log_routing
+from model_hedging import HedgedModelCaller
+from web_context_cache import WebContextCache
+from upstream_guard import (
+    UpstreamGuard, UpstreamError, CircuitOpenError, DeadlineExceededError,
+    parse_retry_after
+)
 import json
+import re
+from urllib.parse import urlencode
 
 logger = logging.getLogger(__name__)
 
@@ -24,9 +37,68 @@ MAX_MEMORY = 50  # Extended memory
 # Web scraper instance
 scraper = LiteratureWebScraper()
 
-# Cache for fetched data
-knowledge_cache: Dict[str, Dict] = {}
+# Cache for fetched web context, keyed by resolved entity
 CACHE_TTL = 3600  # 1 hour cache
+FAILURE_CACHE_TTL = 300  # failed fetches are retried after 5 minutes
+CACHE_MAX_ENTRIES = 1000
+WEB_CONTEXT_CACHE_FILE = "web_context_cache.json"
+
+knowledge_cache = WebContextCache(
+    WEB_CONTEXT_CACHE_FILE, ttl=CACHE_TTL,
+    failure_ttl=FAILURE_CACHE_TTL, max_entries=CACHE_MAX_ENTRIES
+)
+knowledge_cache.load()
+
+# Upstream protection for OpenRouter
+OPENROUTER_URL = f"{OPENROUTER_BASE_URL.rstrip('/')}/chat/completions"
+UPSTREAM_GLOBAL_CONCURRENCY = 8   # in-flight requests across all users
+UPSTREAM_PER_USER_CONCURRENCY = 1  # in-flight requests per user
+UPSTREAM_RATE_PER_SECOND = 5       # token-bucket refill rate
+UPSTREAM_BURST = 10                # token-bucket capacity
+UPSTREAM_MAX_RETRIES = 3
+REQUEST_DEADLINE = 30              # seconds for the whole call, retries included
+
+# Ordered model chain: primary first, faster fallbacks after.
+# ttft_slo is the time-to-first-token (seconds) after which a hedge may fire
+# until enough latency samples exist to derive the threshold automatically.
+MODEL_CHAIN = [
+    {"model": "anthropic/claude-3.5-sonnet", "ttft_slo": 4.0},
+    {"model": "anthropic/claude-3-haiku", "ttft_slo": 2.0},
+    {"model": "openai/gpt-4o-mini", "ttft_slo": 2.0},
+]
+
+model_caller = HedgedModelCaller(MODEL_CHAIN)
+
+upstream_guard = UpstreamGuard(
+    global_concurrency=UPSTREAM_GLOBAL_CONCURRENCY,
+    per_user_concurrency=UPSTREAM_PER_USER_CONCURRENCY,
+    rate_per_second=UPSTREAM_RATE_PER_SECOND,
+    burst=UPSTREAM_BURST,
+    max_retries=UPSTREAM_MAX_RETRIES,
+    deadline=REQUEST_DEADLINE,
+)
+
+
+def resolve_web_entity(query: str) -> Tuple[str, str]:
+    """Map a question to (cache key, Wikipedia title) via the local knowledge base"""
+    writer, alias = match_writer(query)
+    if writer:
+        # Read through the module: registrations swap in a new alias dict
+        writer_key = literature_knowledge.WRITER_ALIASES.get(alias, alias)
+        title = writer["name"] if writer["name"].isascii() else writer_key.replace("_", " ").title()
+        return f"writer:{writer_key}", title
+    
+    work, alias = match_work(query)
+    if work:
+        return f"work:{work['title'].lower()}", work["title"]
+    
+    movement, alias = match_movement(query)
+    if movement:
+        return f"movement:{movement['name'].lower()}", movement["name"]
+    
+    # Unknown entity: fall back to the normalized question text
+    normalized = re.sub(r"\s+", " ", query.lower()).strip(" ?!.")
+    return f"query:{normalized}", query
 
 
 async def fetch_enhanced_literature_context(query: str) -> Dict[str, str]:
@@ -36,40 +108,129 @@ async def fetch_enhanced_literature_context(query: str) -> Dict[str, str]:
         "wikipedia": "",
         "analysis": ""
     }
+    cache_key, title = resolve_web_entity(query)
+    
+    # Check cache first
+    cached = knowledge_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"📚 Using cached knowledge for {cache_key}")
+        return cached
     
+    ok = False
     try:
-        # Check cache first
-        if query in knowledge_cache:
-            logger.info("📚 Using cached knowledge")
-            return knowledge_cache[query]
-        
         # Try Wikipedia first
-        wikipedia_context = await scraper.fetch_url(
-            f"https://en.wikipedia.org/w/api.php?action=query&titles={query}&"
-            f"prop=extracts&explaintext=1&format=json"
-        )
+        params = urlencode({
+            "action": "query", "titles": title, "prop": "extracts",
+            "explaintext": 1, "redirects": 1, "format": "json",
+        })
+        wikipedia_context = await scraper.fetch_url(f"{scraper.api_url}?{params}")
         
         if wikipedia_context:
-            try:
-                data = json.loads(wikipedia_context)
-                pages = data.get('query', {}).get('pages', {})
-                for page_id, page in pages.items():
-                    if page_id != '-1':
-                        context["wikipedia"] = page.get('extract', '')[:1500]
-            except:
-                pass
+            data = json.loads(wikipedia_context)
+            pages = data.get('query', {}).get('pages', {})
+            for page_id, page in pages.items():
+                if page_id != '-1':
+                    context["wikipedia"] = page.get('extract', '')[:1500]
+            ok = bool(context["wikipedia"])
         
-        # Cache the result
-        knowledge_cache[query] = context
-        logger.info(f"✅ Enhanced context fetched for: {query}")
+        logger.info(f"✅ Enhanced context fetched for: {cache_key}")
     
     except Exception as e:
         logger.warning(f"Web fetch error: {e}")
     
+    # Empty results are cached briefly so a flaky fetch is retried soon
+    knowledge_cache.set(cache_key, context, ok=ok)
     return context
 
 
+def save_web_context_cache():
+    """Write the web context cache snapshot to disk"""
+    knowledge_cache.save()
+
+
+def shutdown_brain():
+    """Checkpoint the trainer and the web context cache; call once on shutdown"""
+    shutdown_training()
+    save_web_context_cache()
+
+
+async def _stream_completion(payload: Dict, model: str, timeout: float) -> AsyncIterator[str]:
+    """Stream one OpenRouter chat completion; raises UpstreamError on failure"""
+    headers = {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "HTTP-Referer": "https://replit.com",
+        "X-Title": "AdvancedLiteraryBot"
+    }
+    body = {**payload, "model": model, "stream": True}
+    
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        async with session.post(OPENROUTER_URL, headers=headers, json=body) as resp:
+            if resp.status != 200:
+                error_data = await resp.text()
+                raise UpstreamError(
+                    resp.status, error_data, parse_retry_after(resp.headers.get("Retry-After"))
+                )
+            async for raw_line in resp.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue  # SSE comments and keep-alives
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    raise UpstreamError(502, str(chunk["error"]))
+                content = chunk.get('choices', [{}])[0].get('delta', {}).get('content')
+                if content:
+                    yield content
+
+
+async def _request_completion(payload: Dict, timeout: float, question: str) -> str:
+    """Hedged completion over MODEL_CHAIN, optimized as it streams; the first model to stream a token wins"""
+    # Each attempt gets its own optimizer stream, which stops generation once the answer is trimmed;
+    # hedges and fallbacks each take their own rate token (and slot, when concurrent) from the guard
+    deadline = time.monotonic() + timeout
+    return await model_caller.call(
+        lambda model: optimize_stream(_stream_completion(payload, model, timeout), question),
+        extra_budget=lambda concurrent: upstream_guard.extra_request(deadline, concurrent),
+    )
+
+
+def get_model_latency_stats() -> Dict[str, Dict]:
+    """Per-model time-to-first-token percentiles and hedge thresholds"""
+    return model_caller.get_latency_stats()
+
+
+def _remember_exchange(user_id: int, question: str, answer: str) -> None:
+    """Store a question/answer pair in the user's conversation memory"""
+    history = user_conversations.setdefault(user_id, [])
+    history.append({"role": "user", "content": question})
+    history.append({"role": "assistant", "content": answer})
+    
+    # Trim memory if too long
+    if len(history) > MAX_MEMORY:
+        user_conversations[user_id] = history[-MAX_MEMORY:]
+
+
 async def advanced_answer_literature_question(user_id: int, question: str) -> str:
+    """
+    Local-first answering: confident factual questions are answered from the
+    knowledge base, open-ended ones are escalated to the LLM
+    """
+    started = time.perf_counter()
+    decision = route_question(question)
+    
+    if decision["route"] == "local":
+        answer = generate_offline_answer(question)
+        _remember_exchange(user_id, question, answer)
+    else:
+        answer = await _answer_with_llm(user_id, question)
+    
+    log_routing(decision, (time.perf_counter() - started) * 1000)
+    return answer
+
+
+async def _answer_with_llm(user_id: int, question: str) -> str:
     """
     Advanced neural network function with web learning capabilities
     Uses multiple sources for comprehensive answers
@@ -83,9 +244,17 @@ async def advanced_answer_literature_question(user_id: int, question: str) -> st
     if user_id not in user_conversations:
         user_conversations[user_id] = []
     
+    # Skip web research entirely while the upstream is known to be down
+    if upstream_guard.breaker.is_open:
+        logger.warning("⛔ Upstream circuit open - answering from local knowledge base")
+        return generate_offline_answer(question)
+    
     try:
         # Fetch enhanced context from web
-        web_context = await fetch_enhanced_literature_context(question)
+        if WEB_RESEARCH_ENABLED:
+            web_context = await fetch_enhanced_literature_context(question)
+        else:
+            web_context = {"web_search": "", "wikipedia": "", "analysis": ""}
         
         # Get local knowledge
         local_writer = get_writer_knowledge(question)
@@ -131,47 +300,32 @@ INSTRUCTION:
             "content": enriched_message
         })
         
-        # Call Claude API with enhanced context
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "HTTP-Referer": "https://replit.com",
-                "X-Title": "AdvancedLiteraryBot"
-            }
-            
-            payload = {
-                "model": "claude-3.5-sonnet",
-                "messages": messages,
-                "temperature": 0.7,
-                "max_tokens": 2000,
-                "system": system_prompt
-            }
-            
-            async with session.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=payload
-            ) as resp:
-                if resp.status == 200:
-                    response_data = await resp.json()
-                    assistant_response = response_data.get('choices', [{}])[0].get('message', {}).get('content', '')
-                    
-                    # Optimize response based on learning
-                    optimized_response = optimize_response(assistant_response, question)
-                    
-                    # Store in memory
-                    user_conversations[user_id].append({"role": "user", "content": question})
-                    user_conversations[user_id].append({"role": "assistant", "content": optimized_response})
-                    
-                    # Trim memory if too long
-                    if len(user_conversations[user_id]) > MAX_MEMORY:
-                        user_conversations[user_id] = user_conversations[user_id][-MAX_MEMORY:]
-                    
-                    logger.info(f"✅ Advanced response generated for user {user_id}")
-                    return optimized_response
-                else:
-                    error_data = await resp.text()
-                    logger.error(f"API error {resp.status}: {error_data}")
+        payload = {
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 2000,
+            "system": system_prompt
+        }
+        
+        # Call the model chain through the upstream guard; the response is
+        # optimized from learned patterns while it streams
+        optimized_response = await upstream_guard.call(
+            user_id, lambda timeout: _request_completion(payload, timeout, question)
+        )
+        
+        # Store in memory
+        _remember_exchange(user_id, question, optimized_response)
+        
+        logger.info(f"✅ Advanced response generated for user {user_id}")
+        return optimized_response
+    
+    except CircuitOpenError:
+        logger.warning("⛔ Upstream circuit open - answering from local knowledge base")
+        return generate_offline_answer(question)
+    
+    except (UpstreamError, DeadlineExceededError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"API error after retries: {e}")
+        return generate_offline_answer(question)
     
     except Exception as e:
         logger.error(f"Advanced error: {e}")
@@ -179,9 +333,10 @@ INSTRUCTION:
     return "I encountered an error processing your request. Please try again."
 
 
-async def rate_response(user_id: int, question: str, response: str, rating: int):
-    """Record user rating for training"""
-    record_user_feedback(user_id, question, response, rating)
+async def rate_response(user_id: int, question: str, response: str, rating: int,
+                        category: Optional[str] = None):
+    """Record user rating (and optional question type) for training"""
+    record_user_feedback(user_id, question, response, rating, category)
     logger.info(f"📊 Response rated {rating}/5 by user {user_id}")
 
 
@@ -3,11 +3,15 @@ Advanced Flask API for Literature Chatbot
 With neural learning, web integration, and optimized responses
 """
 from flask import Flask, request, jsonify, render_template
+import atexit
 import os
 import logging
 from datetime import datetime
 import asyncio
 
+from interaction_store import coerce_rating
+from question_classifier import QUESTION_TYPES, coerce_category
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -29,7 +33,9 @@ stats = {
 # Import learning systems
 try:
     from chatgpt_brain import answer_literature_question, clear_user_memory
-    from neural_trainer import record_user_feedback, get_training_metrics
+    from neural_trainer import record_user_feedback, get_training_metrics, shutdown_training
+    # Checkpoint queued feedback on exit
+    atexit.register(shutdown_training)
     logger.info("✅ Advanced systems loaded successfully")
 except ImportError as e:
     logger.warning(f"⚠️ Could not load advanced systems: {e}")
@@ -144,9 +150,19 @@ def submit_feedback():
         question = data.get('question', '')
         response = data.get('response', '')
         rating = data.get('rating', 3)
+        category = data.get('category')
         
-        if not (1 <= rating <= 5):
-            return jsonify({'error': 'Рейтинг должен быть 1-5'}), 400
+        try:
+            # Same rule as the interaction store, so 4.0 is accepted and 4.5 is not
+            rating = coerce_rating(rating)
+        except ValueError:
+            rating = None
+        if rating is None:
+            return jsonify({'error': 'Рейтинг должен быть целым числом 1-5'}), 400
+        try:
+            category = coerce_category(category)
+        except ValueError:
+            return jsonify({'error': f"Категория должна быть одной из: {', '.join(QUESTION_TYPES)}"}), 400
         
         # Record feedback
         stats["total_feedback"] += 1
@@ -161,7 +177,7 @@ def submit_feedback():
         # Try to record with learning system
         if record_user_feedback:
             try:
-                record_user_feedback(user_id, question, response, rating)
+                record_user_feedback(user_id, question, response, rating, category)
             except Exception as e:
                 logger.warning(f"Could not record feedback: {e}")
         
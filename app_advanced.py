@@ -3,13 +3,17 @@ Advanced Flask API with Neural Network Learning Capabilities
 REST API for Literature Chatbot with Web Learning & Feedback
 """
 from flask import Flask, request, jsonify, render_template
+import atexit
 import os
 import asyncio
 import logging
 from advanced_chatgpt_brain import (
-    advanced_answer_literature_question, rate_response, get_neural_metrics
+    advanced_answer_literature_question, rate_response, get_neural_metrics, shutdown_brain
 )
 from neural_trainer import load_training_data, save_training_data
+from interaction_store import coerce_rating
+from question_classifier import QUESTION_TYPES, coerce_category
+from scrape_pipeline import expand_live_index
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -17,8 +21,9 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Load training data on startup
+# Load training data on startup; checkpoint it (and the web context cache) on exit
 load_training_data()
+atexit.register(shutdown_brain)
 
 # Sample Russian literature database (fallback)
 LITERATURE_DB = {
@@ -80,12 +85,22 @@ async def submit_feedback():
         question = data.get('question', '')
         response = data.get('response', '')
         rating = data.get('rating', 3)  # 1-5 stars
+        category = data.get('category')  # optional question type label
         
-        if not (1 <= rating <= 5):
-            return jsonify({'error': 'Rating must be 1-5'}), 400
+        try:
+            # Same rule as the interaction store, so 4.0 is accepted and 4.5 is not
+            rating = coerce_rating(rating)
+        except ValueError:
+            rating = None
+        if rating is None:
+            return jsonify({'error': 'Rating must be an integer from 1 to 5'}), 400
+        try:
+            category = coerce_category(category)
+        except ValueError:
+            return jsonify({'error': f"Category must be one of: {', '.join(QUESTION_TYPES)}"}), 400
         
         # Record feedback for training
-        await rate_response(user_id, question, response, rating)
+        await rate_response(user_id, question, response, rating, category)
         
         logger.info(f"📊 Feedback recorded: {rating}⭐ from user {user_id}")
         
@@ -114,6 +129,34 @@ async def get_metrics():
         logger.error(f"Metrics error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/expand-knowledge', methods=['POST'])
+async def expand_knowledge():
+    """Scrape authors/works into the live offline index"""
+    try:
+        data = request.get_json(silent=True) or {}
+        authors = data.get('authors', [])
+        works = data.get('works', [])
+        if (not isinstance(authors, list) or not all(isinstance(a, str) for a in authors)
+                or not isinstance(works, list)
+                or not all(isinstance(w, list) and len(w) == 2 and all(isinstance(p, str) for p in w)
+                           for w in works)):
+            return jsonify({'error': "Expected 'authors': [name, ...] and 'works': [[title, author], ...]"}), 400
+        works = [(title, author) for title, author in works]
+        
+        if not authors and not works:
+            return jsonify({'error': 'Nothing to expand'}), 400
+        
+        stats = await expand_live_index(authors, works)
+        
+        return jsonify({
+            'stats': stats,
+            'status': 'success'
+        })
+    
+    except Exception as e:
+        logger.error(f"Expand knowledge error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint"""
@@ -129,7 +172,8 @@ def health():
 def save_training():
     """Save training data"""
     try:
-        save_training_data()
+        if not save_training_data():
+            return jsonify({'error': 'Timed out waiting for the trainer to save'}), 503
         return jsonify({
             'status': 'success',
             'message': 'Training data saved successfully'
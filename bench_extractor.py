@@ -0,0 +1,154 @@
+"""
+Field Extraction Micro-benchmark
+Times the legacy per-field extract_* helpers (one lowercase copy and substring
+scan per field, a regex compiled per call) against the single-pass extractor,
+and reports how often each extracted field differs between the two
+
+Usage:
+    python bench_extractor.py                          # stored extracts, else synthetic
+    python bench_extractor.py --source crawl_results.jsonl --repeat 5
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import time
+from typing import Dict, List
+
+from field_extractor import extract_fields, NATIONALITIES, ERAS, GENRES, THEMES
+from http_cache import HTTP_CACHE_DIR
+from crawl_scheduler import RESULTS_FILE
+
+SYNTHETIC_EXTRACTS = 5000
+EXTRACT_CHARS = 2000
+EXAMPLES_PER_FIELD = 3        # sample disagreements shown per field
+EXAMPLE_CHARS = 160
+
+
+def legacy_extract(text: str) -> Dict:
+    """The extract_* helpers as they were: every field rescans a fresh lowercase copy"""
+    def year(keywords):
+        match = re.search(rf"({'|'.join(keywords.split('|'))})\s+(\d{{4}})", text, re.IGNORECASE)
+        return int(match.group(2)) if match else None
+
+    def first(options, default):
+        for option in options:
+            if option.lower() in text.lower():
+                return option
+        return default
+
+    author = re.search(r"by\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)", text)
+    genre = first(GENRES, None)
+    return {
+        "birth_year": year("born"),
+        "death_year": year("died"),
+        "year": year("published|written|year"),
+        "nationality": first(NATIONALITIES, "Unknown"),
+        "era": first(ERAS, "Unknown"),
+        "genre": genre.capitalize() if genre else "Literary Work",
+        "themes": [t.capitalize() for t in THEMES if t in text.lower()][:3],
+        "author": author.group(1) if author else "Unknown",
+    }
+
+
+def load_extracts(source: str = None) -> List[str]:
+    """Extracts from a crawl results log or the HTTP cache bodies"""
+    extracts = []
+    if source or os.path.exists(RESULTS_FILE):
+        with open(source or RESULTS_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    data = json.loads(line).get("data") or {}
+                except ValueError:
+                    continue
+                if data.get("wikipedia_summary"):
+                    extracts.append(data["wikipedia_summary"])
+    if not extracts:
+        for body_path in glob.glob(os.path.join(HTTP_CACHE_DIR, "*", "*.body")):
+            try:
+                with open(body_path, 'r', encoding='utf-8') as f:
+                    pages = json.load(f).get("query", {}).get("pages", {})
+            except (OSError, ValueError, AttributeError):
+                continue
+            pages = pages.values() if isinstance(pages, dict) else pages
+            extracts.extend(p["extract"][:EXTRACT_CHARS] for p in pages if p.get("extract"))
+    return extracts
+
+
+def synthetic_extracts(count: int = SYNTHETIC_EXTRACTS) -> List[str]:
+    """Wikipedia-like leads mixing keywords, years and filler"""
+    rng = random.Random(42)
+    filler = ("the writer spent several years abroad and returned with a body of work "
+              "that shaped the literature of the century and later generations").split()
+    vocabulary = NATIONALITIES + ERAS + GENRES + THEMES + ["born", "died", "published"]
+    extracts = []
+    for _ in range(count):
+        words = []
+        while sum(len(w) + 1 for w in words) < EXTRACT_CHARS:
+            words.append(rng.choice(filler))
+            if rng.random() < 0.08:
+                words.append(rng.choice(vocabulary))
+            if rng.random() < 0.02:
+                words.append(str(rng.randint(1600, 1990)))
+        extracts.append(f"{rng.choice(filler).capitalize()} by Leo Tolstoy " + " ".join(words))
+    return [extract[:EXTRACT_CHARS] for extract in extracts]
+
+
+def compare_fields(extracts: List[str], examples: int = EXAMPLES_PER_FIELD) -> Dict:
+    """Per-field agreement between the legacy and single-pass extractors, with sample disagreements"""
+    report = {}
+    all_agree = 0
+    for extract in extracts:
+        legacy, single_pass = legacy_extract(extract), extract_fields(extract)
+        all_agree += legacy == {field: single_pass[field] for field in legacy}
+        for field, legacy_value in legacy.items():
+            row = report.setdefault(field, {"disagreements": 0, "examples": []})
+            if single_pass[field] != legacy_value:
+                row["disagreements"] += 1
+                if len(row["examples"]) < examples:
+                    row["examples"].append({"legacy": legacy_value, "single_pass": single_pass[field],
+                                            "extract": extract[:EXAMPLE_CHARS]})
+    for row in report.values():
+        row["agreement"] = round(1 - row["disagreements"] / len(extracts), 3)
+    return {"all_fields_agreement": round(all_agree / len(extracts), 3), "fields": report}
+
+
+def timed(fn, extracts: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for extract in extracts:
+            fn(extract)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(args: argparse.Namespace) -> Dict:
+    extracts = load_extracts(args.source)
+    source = "stored"
+    if len(extracts) < args.min_extracts:
+        extracts = synthetic_extracts(args.min_extracts)
+        source = "synthetic"
+
+    legacy = timed(legacy_extract, extracts, args.repeat)
+    single_pass = timed(extract_fields, extracts, args.repeat)
+    comparison = compare_fields(extracts)
+    return {
+        "extracts": len(extracts),
+        "source": source,
+        "legacy_us_per_extract": round(legacy / len(extracts) * 1e6, 1),
+        "single_pass_us_per_extract": round(single_pass / len(extracts) * 1e6, 1),
+        "speedup": round(legacy / single_pass, 2),
+        **comparison,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark structured field extraction")
+    parser.add_argument("--source", help="Crawl results JSONL with stored extracts")
+    parser.add_argument("--min-extracts", type=int, default=SYNTHETIC_EXTRACTS,
+                        help="Fall back to synthetic extracts below this many stored ones")
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of repetitions")
+    print(json.dumps(main(parser.parse_args()), indent=2))
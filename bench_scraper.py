@@ -0,0 +1,141 @@
+"""
+Scraper Throughput Benchmark - pages/sec and peak memory against replayed fixtures
+Starts replay_server in a child process (or uses --api-url), then runs
+fetch_multiple_authors and the crawl scheduler unchanged against it
+
+Usage:
+    python bench_scraper.py --fixtures wiki_fixtures.json
+    python bench_scraper.py --synthesize-missing --pages 2000 --latency-ms 50 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+import aiohttp
+from aiohttp import web
+
+from crawl_scheduler import CrawlScheduler
+from replay_server import API_PATH, FixtureStore, add_replay_arguments, replay_app_from_args
+from web_scraper import LiteratureWebScraper
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGES = 1000
+BENCH_PORT = 8781
+CRAWL_RATE = 1e6              # no politeness limit against a local server
+
+
+def _serve(args: argparse.Namespace, port: int):
+    web.run_app(replay_app_from_args(args), host="127.0.0.1", port=port, print=None)
+
+
+async def _wait_ready(base_url: str, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(f"{base_url}/stats") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                if time.monotonic() > deadline:
+                    raise
+            await asyncio.sleep(0.1)
+
+
+async def run_fetch_authors(api_url: str, titles: List[str]) -> int:
+    scraper = LiteratureWebScraper(api_url=api_url, cache_dir=None)
+    try:
+        return len(await scraper.fetch_multiple_authors(titles))
+    finally:
+        await scraper.close()
+
+
+async def run_crawl(api_url: str, seeds: List[str], max_entries: int) -> int:
+    scraper = LiteratureWebScraper(api_url=api_url, cache_dir=None)
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduler = CrawlScheduler(
+            scraper, rate_per_second=CRAWL_RATE, max_entries=max_entries,
+            checkpoint_path=os.path.join(tmp, "checkpoint.json"),
+            results_path=os.path.join(tmp, "results.jsonl"),
+        )
+        try:
+            for title in seeds:
+                scheduler.schedule(title, "author")
+            return (await scheduler.run())["fetched"]
+        finally:
+            await scraper.close()
+
+
+def measure(name: str, make_coro) -> Dict:
+    """Throughput pass, then a tracemalloc pass for peak Python memory"""
+    started = time.perf_counter()
+    pages = asyncio.run(make_coro())
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    asyncio.run(make_coro())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "scenario": name,
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 1) if elapsed else 0.0,
+        "peak_python_mb": round(peak / 2**20, 2),
+    }
+
+
+def benchmark_titles(args: argparse.Namespace) -> List[str]:
+    """Recorded page titles, padded with synthetic ones when allowed"""
+    store = FixtureStore(args.fixtures)
+    store.load()
+    titles = sorted(store.pages)[:args.pages]
+    if args.synthesize_missing:
+        titles += [f"Benchmark Author {i}" for i in range(args.pages - len(titles))]
+    return titles
+
+
+def main(args: argparse.Namespace) -> Dict:
+    server = None
+    api_url = args.api_url
+    if not api_url:
+        server = multiprocessing.Process(target=_serve, args=(args, args.port), daemon=True)
+        server.start()
+        api_url = f"http://127.0.0.1:{args.port}{API_PATH}"
+        asyncio.run(_wait_ready(f"http://127.0.0.1:{args.port}"))
+    try:
+        titles = benchmark_titles(args)
+        if not titles:
+            raise SystemExit("No fixture pages: record some first or pass --synthesize-missing")
+        results = [
+            measure("fetch_multiple_authors", lambda: run_fetch_authors(api_url, titles)),
+            measure("crawl", lambda: run_crawl(api_url, titles[:20], args.pages)),
+        ]
+    finally:
+        if server:
+            server.terminate()
+            server.join()
+    return {
+        "api_url": api_url,
+        "results": results,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against replayed fixtures")
+    parser.add_argument("--api-url", help="Use an already running replay server")
+    parser.add_argument("--port", type=int, default=BENCH_PORT)
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES, help="Pages per scenario")
+    add_replay_arguments(parser)
+    print(json.dumps(main(parser.parse_args()), indent=2))
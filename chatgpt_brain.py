@@ -62,6 +62,9 @@ def generate_offline_answer(question: str) -> str:
             
             if writer.get('influence'):
                 answer_parts.append(f"\n✨ Влияние: {writer.get('influence', '')}\n")
+            
+            if writer.get('summary'):
+                answer_parts.append(f"\n{writer['summary']}\n")
         
         # WORK INFO
         if work and not writer:
@@ -72,6 +75,9 @@ def generate_offline_answer(question: str) -> str:
             
             if work.get('themes'):
                 answer_parts.append(f"\nТемы: {', '.join(work['themes'][:3])}\n")
+            
+            if work.get('summary'):
+                answer_parts.append(f"\n{work['summary']}\n")
         
         # MOVEMENT INFO
         if movement:
@@ -110,6 +116,11 @@ def generate_offline_answer(question: str) -> str:
         return "⚠️ Ошибка обработки. Попробуйте позже."
 
 
+def invalidate_response_cache() -> None:
+    """Drop cached answers after the knowledge base index changes"""
+    response_cache.clear()
+
+
 async def answer_literature_question(user_id: int, question: str) -> str:
     """
     OPTIMIZED: Returns FAST response with timeout
@@ -5,3 +5,5 @@ load_dotenv()
 
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
+OPENROUTER_BASE_URL = os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1')
+WEB_RESEARCH_ENABLED = os.getenv('WEB_RESEARCH_ENABLED', '1') != '0'
@@ -0,0 +1,326 @@
+"""
+Crawl Scheduler - Resumable, rate-limited knowledge base expansion
+Workers pull batches of titles from an asyncio.Queue, fetch them with
+multi-title Wikipedia queries under a politeness rate limit, follow links to
+works and influences mentioned in each page's lead, and checkpoint progress
+so a large crawl resumes after a crash without refetching completed pages.
+
+Usage:
+    python crawl_scheduler.py --max-entries 10000 --workers 4
+    python crawl_scheduler.py --max-entries 10000 --resume
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+from upstream_guard import TokenBucket
+from web_scraper import (
+    LiteratureWebScraper, SEED_AUTHORS, SEED_WORKS, MAX_EXTRACTS_PER_QUERY, author_entry, work_entry, work_key
+)
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = "crawl_checkpoint.json"
+RESULTS_FILE = "crawl_results.jsonl"
+
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 2.0            # API requests per second (politeness)
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_DEPTH = 3
+CHECKPOINT_EVERY = 50         # completed pages between checkpoints
+MAX_LINKS_PER_PAGE = 25
+MAX_BATCH_ATTEMPTS = 3        # tries per batch within a run; then it waits for --resume
+RETRY_BACKOFF = 2.0           # seconds before the first retry, doubled per attempt
+
+# Lead extract plus outgoing article links for the frontier
+CRAWL_QUERY = {
+    "prop": "extracts|links|info",
+    "explaintext": 1,
+    "exintro": 1,
+    "exlimit": "max",
+    "plnamespace": 0,
+    "pllimit": "max",
+}
+
+_WORK_RE = re.compile(
+    r"\b(?:is|was) (?:an?|the) [^.]{0,80}?\b(?:novel|novella|play|poem|short story|tragedy|"
+    r"comedy|drama|epic|book|literary work|collection)\b", re.IGNORECASE
+)
+_AUTHOR_RE = re.compile(
+    r"\b(?:is|was) (?:an?|the) [^.]{0,80}?\b(?:writer|novelist|poet|playwright|dramatist|"
+    r"author|essayist|critic)\b", re.IGNORECASE
+)
+
+
+def classify_page(extract: str) -> Optional[str]:
+    """'author', 'work' or None for pages outside literature, from the first sentence"""
+    first_sentence = extract[:400]
+    if _WORK_RE.search(first_sentence):
+        return "work"
+    if _AUTHOR_RE.search(first_sentence):
+        return "author"
+    return None
+
+
+class CrawlScheduler:
+    """Bounded worker pool over a title frontier with checkpoints"""
+
+    def __init__(self, scraper: LiteratureWebScraper, workers: int = DEFAULT_WORKERS,
+                 rate_per_second: float = DEFAULT_RATE, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_depth: int = DEFAULT_MAX_DEPTH, checkpoint_path: str = CHECKPOINT_FILE,
+                 results_path: str = RESULTS_FILE, batch_size: int = MAX_EXTRACTS_PER_QUERY):
+        self.scraper = scraper
+        self.workers = workers
+        self.bucket = TokenBucket(rate_per_second, capacity=max(1.0, rate_per_second))
+        self.max_entries = max_entries
+        self.max_depth = max_depth
+        self.checkpoint_path = checkpoint_path
+        self.results_path = results_path
+        self.batch_size = batch_size
+
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.seen = set()                      # every title ever scheduled
+        self.completed = set()                 # titles whose result is on disk
+        self.pending: Dict[str, Dict] = {}     # scheduled but not completed (queued or in flight)
+        self.stats = {"fetched": 0, "stored": 0, "skipped": 0, "requests": 0, "failed_batches": 0}
+        self._since_checkpoint = 0
+
+    # -- frontier -------------------------------------------------------
+
+    def schedule(self, title: str, kind: Optional[str] = None, depth: int = 0) -> bool:
+        """Add a title to the frontier unless seen or over budget"""
+        if title in self.seen or len(self.seen) >= self.max_entries:
+            return False
+        item = {"title": title, "kind": kind, "depth": depth}
+        self.seen.add(title)
+        self.pending[title] = item
+        self.queue.put_nowait(item)
+        return True
+
+    def seed_defaults(self):
+        for author in SEED_AUTHORS:
+            self.schedule(author, "author")
+        for title, _author in SEED_WORKS:
+            self.schedule(title, "work")
+
+    def _follow_links(self, item: Dict, page: Dict) -> List[List]:
+        """Schedule linked pages named in the lead; returns [title, depth] pairs scheduled"""
+        if item["depth"] >= self.max_depth:
+            return []
+        extract_lower = page.get("extract", "").lower()
+        followed = []
+        for link in page.get("links", []):
+            title = link["title"]
+            # Links named in the lead are the works, influences and peers that matter
+            if title.lower() in extract_lower and self.schedule(title, None, item["depth"] + 1):
+                followed.append([title, item["depth"] + 1])
+                if len(followed) >= MAX_LINKS_PER_PAGE:
+                    break
+        return followed
+
+    # -- persistence ----------------------------------------------------
+
+    def _append_results(self, records: List[Dict]):
+        with open(self.results_path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def checkpoint(self):
+        """Atomically persist the frontier; results are already on disk"""
+        state = {
+            "pending": list(self.pending.values()),
+            "seen": sorted(self.seen),
+            "stats": self.stats,
+            "timestamp": time.time(),
+        }
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
+        self._since_checkpoint = 0
+        logger.info(f"💾 Checkpoint: {len(self.completed)} done, {len(self.pending)} pending")
+
+    def resume(self) -> bool:
+        """Restore frontier and completed set; returns False when there is nothing to resume"""
+        followed = []
+        if os.path.exists(self.results_path):
+            # The results log is the source of truth for what is finished
+            with open(self.results_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line after a crash
+                    self.completed.add(record["requested"])
+                    followed.extend(record.get("followed", []))
+
+        state = {}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        elif not self.completed:
+            return False
+        self.stats.update(state.get("stats", {}))
+        self.seen = set(state.get("seen", [])) | self.completed
+
+        # Frontier = checkpointed pending items plus links followed after the checkpoint
+        items = state.get("pending", []) + [
+            {"title": title, "kind": None, "depth": depth} for title, depth in followed
+        ]
+        for item in items:
+            item.pop("attempts", None)
+            if item["title"] not in self.completed and item["title"] not in self.pending:
+                self.seen.add(item["title"])
+                self.pending[item["title"]] = item
+                self.queue.put_nowait(item)
+        logger.info(f"♻️ Resuming crawl: {len(self.completed)} done, {len(self.pending)} pending")
+        return True
+
+    # -- workers --------------------------------------------------------
+
+    async def _acquire(self):
+        """One politeness token per HTTP request, continuation requests included"""
+        await self.bucket.acquire()
+        self.stats["requests"] += 1
+
+    async def _retry_later(self, items: List[Dict]):
+        """Re-queue a failed batch after exponential backoff, up to MAX_BATCH_ATTEMPTS"""
+        for item in items:
+            item["attempts"] = item.get("attempts", 0) + 1
+        # Exhausted items stay pending so the next resume retries them
+        retry = [item for item in items if item["attempts"] < MAX_BATCH_ATTEMPTS]
+        if len(retry) < len(items):
+            logger.warning(f"Giving up on {len(items) - len(retry)} titles for this run")
+        if not retry:
+            return
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** (max(item["attempts"] for item in retry) - 1))
+        for item in retry:
+            self.queue.put_nowait(item)
+
+    async def _process_batch(self, items: List[Dict]):
+        titles = [item["title"] for item in items]
+        try:
+            pages = await self.scraper.query_titles(titles, CRAWL_QUERY, before_request=self._acquire)
+        except Exception as e:
+            self.stats["failed_batches"] += 1
+            logger.warning(f"Crawl batch failed: {e}")
+            await self._retry_later(items)
+            return
+
+        records = []
+        for item in items:
+            page = pages.get(item["title"])
+            self.stats["fetched"] += 1
+            kind = None
+            if page:
+                kind = item["kind"] or classify_page(page.get("extract", ""))
+            record = {"requested": item["title"], "kind": kind, "data": None}
+            if kind == "author":
+                record["data"] = author_entry(page, item["title"])
+            elif kind == "work":
+                record["data"] = work_entry(page, item["title"])
+            if record["data"]:
+                self.stats["stored"] += 1
+                record["followed"] = self._follow_links(item, page)
+            else:
+                self.stats["skipped"] += 1
+            records.append(record)
+
+        self._append_results(records)
+        for item in items:
+            self.completed.add(item["title"])
+            self.pending.pop(item["title"], None)
+        self._since_checkpoint += len(items)
+        if self._since_checkpoint >= CHECKPOINT_EVERY:
+            self.checkpoint()
+
+    async def _worker(self):
+        while True:
+            items = [await self.queue.get()]
+            while len(items) < self.batch_size and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+            try:
+                await self._process_batch(items)
+            except Exception as e:
+                # Keep the worker alive; the items stay pending for --resume
+                self.stats["failed_batches"] += 1
+                logger.error(f"❌ Crawl worker error on {len(items)} titles: {e}")
+            finally:
+                # Retries were re-queued above, so join() still waits for them
+                for _ in items:
+                    self.queue.task_done()
+
+    async def run(self) -> Dict:
+        """Crawl until the frontier is empty or the entry budget is spent"""
+        started = time.monotonic()
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await self.queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.checkpoint()
+        elapsed = time.monotonic() - started
+        logger.info(f"✅ Crawl finished: {self.stats} in {elapsed:.1f}s")
+        return {**self.stats, "seconds": round(elapsed, 2)}
+
+
+def load_crawl_results(results_path: str = RESULTS_FILE) -> Dict:
+    """Fold the results log into the build_expanded_knowledge_base schema"""
+    authors, works = {}, {}
+    with open(results_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            data = record.get("data")
+            if not data:
+                continue
+            if record["kind"] == "author":
+                authors[record["requested"]] = data
+            elif record["kind"] == "work":
+                works[work_key(data)] = data
+    return {
+        "authors": authors,
+        "works": works,
+        "timestamp": str(time.time()),
+        "sources": ["Wikipedia API"],
+    }
+
+
+async def crawl(args: argparse.Namespace) -> Dict:
+    scraper = LiteratureWebScraper()
+    scheduler = CrawlScheduler(
+        scraper, workers=args.workers, rate_per_second=args.rate,
+        max_entries=args.max_entries, max_depth=args.max_depth,
+        checkpoint_path=args.checkpoint, results_path=args.results,
+    )
+    try:
+        if not (args.resume and scheduler.resume()):
+            for path in (args.checkpoint, args.results):
+                if os.path.exists(path):
+                    os.remove(path)
+            scheduler.seed_defaults()
+        return await scheduler.run()
+    finally:
+        await scraper.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Resumable literature crawl over Wikipedia")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="API requests per second")
+    parser.add_argument("--max-entries", type=int, default=DEFAULT_MAX_ENTRIES)
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--results", default=RESULTS_FILE)
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+    print(json.dumps(asyncio.run(crawl(parser.parse_args())), indent=2))
@@ -0,0 +1,228 @@
+"""
+Dump Ingestion - Offline knowledge base build from a local Wikipedia dump
+Streams a MediaWiki XML export or a JSON-lines dump at constant memory, fans
+wikitext cleanup, classification and field extraction out over a process
+pool, and emits the build_expanded_knowledge_base schema without network access
+
+Usage:
+    python dump_ingest.py enwiki-pages-articles.xml.bz2 --output expanded_kb.json
+    python dump_ingest.py pages.jsonl --refresh expanded_kb.json --workers 8
+"""
+import argparse
+import bz2
+import gzip
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse
+
+from crawl_scheduler import classify_page
+from web_scraper import author_entry, work_entry, work_key
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200              # pages per pool task
+MAX_BATCHES_IN_FLIGHT = 4     # per worker; bounds memory held by queued pages
+LEAD_CHARS = 2000
+
+# Wikitext markup stripped from the lead section
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_REF_RE = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.DOTALL | re.IGNORECASE)
+_TEMPLATE_RE = re.compile(r"\{\{[^{}]*\}\}")
+_TABLE_RE = re.compile(r"\{\|.*?\|\}", re.DOTALL)
+_FILE_RE = re.compile(r"\[\[(?:File|Image|Файл|Изображение):[^\[\]]*(?:\[\[[^\]]*\]\][^\[\]]*)*\]\]",
+                      re.IGNORECASE)
+_LINK_RE = re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]")
+_EXTERNAL_LINK_RE = re.compile(r"\[https?://\S+\s*([^\]]*)\]")
+_TAG_RE = re.compile(r"<[^>]+>")
+_QUOTES_RE = re.compile(r"'{2,}")
+_SPACES_RE = re.compile(r"[ \t]+")
+
+
+def wikitext_lead(wikitext: str) -> str:
+    """Plain text of the lead section of a wikitext article"""
+    lead = wikitext.split("\n==", 1)[0]
+    lead = _COMMENT_RE.sub("", lead)
+    lead = _REF_RE.sub("", lead)
+    # Templates nest ({{Infobox ... {{birth date|...}} ...}}): strip innermost first
+    previous = None
+    while previous != lead:
+        previous, lead = lead, _TEMPLATE_RE.sub("", lead)
+    lead = _TABLE_RE.sub("", lead)
+    lead = _FILE_RE.sub("", lead)
+    lead = _LINK_RE.sub(r"\1", lead)
+    lead = _EXTERNAL_LINK_RE.sub(r"\1", lead)
+    lead = _TAG_RE.sub("", lead)
+    lead = _QUOTES_RE.sub("", lead)
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in lead.splitlines())
+    return "\n".join(line for line in lines if line)[:LEAD_CHARS]
+
+
+def _open_dump(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_xml_pages(path: str) -> Iterator[Dict]:
+    """Article pages of a MediaWiki XML export, one element in memory at a time"""
+    with _open_dump(path) as f:
+        context = iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        page: Dict = {}
+        for event, elem in context:
+            if event != "end":
+                continue
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if tag == "title":
+                page["title"] = elem.text or ""
+            elif tag == "ns":
+                page["ns"] = elem.text
+            elif tag == "redirect":
+                page["redirect"] = True
+            elif tag == "id" and "pageid" not in page:
+                page["pageid"] = int(elem.text)
+            elif tag == "id" and "lastrevid" not in page:
+                page["lastrevid"] = int(elem.text)
+            elif tag == "timestamp":
+                page["touched"] = elem.text
+            elif tag == "text":
+                page["wikitext"] = elem.text or ""
+            elif tag == "page":
+                if page.get("ns") == "0" and not page.get("redirect"):
+                    yield page
+                page = {}
+                # Drop parsed pages so the tree never grows with the dump
+                root.clear()
+
+
+def iter_jsonl_pages(path: str) -> Iterator[Dict]:
+    """Pages of a JSON-lines dump with title plus extract/opening_text/text"""
+    with _open_dump(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("namespace", 0) != 0 or record.get("redirect"):
+                continue
+            yield {
+                "title": record.get("title", ""),
+                "extract": record.get("extract") or record.get("opening_text")
+                or record.get("text", ""),
+                "pageid": record.get("pageid") or record.get("page_id"),
+                "lastrevid": record.get("lastrevid") or record.get("version"),
+                "touched": record.get("touched") or record.get("timestamp"),
+            }
+
+
+def iter_pages(path: str) -> Iterator[Dict]:
+    """Pick the reader from the dump's extension, ignoring compression suffixes"""
+    name = re.sub(r"\.(bz2|gz)$", "", path)
+    if name.endswith(".xml"):
+        return iter_xml_pages(path)
+    return iter_jsonl_pages(path)
+
+
+def process_batch(pages: List[Dict]) -> List[tuple]:
+    """Pool task: (kind, key, entry) for the literature pages in a batch"""
+    results = []
+    for page in pages:
+        if "wikitext" in page:
+            page["extract"] = wikitext_lead(page.pop("wikitext"))
+        else:
+            page["extract"] = page.get("extract", "")[:LEAD_CHARS]
+        kind = classify_page(page["extract"])
+        if kind == "author":
+            results.append((kind, page["title"], author_entry(page, page["title"])))
+        elif kind == "work":
+            entry = work_entry(page, page["title"])
+            results.append((kind, work_key(entry), entry))
+    return results
+
+
+def ingest_dump(path: str, workers: Optional[int] = None, batch_size: int = BATCH_SIZE,
+                max_pages: Optional[int] = None) -> Iterator[tuple]:
+    """Stream (kind, key, entry) results for a dump, with a bounded number of batches in flight"""
+    workers = workers or os.cpu_count() or 1
+    pages = iter_pages(path)
+    if max_pages:
+        pages = islice(pages, max_pages)
+
+    with Pool(workers) as pool:
+        # Pool.imap would drain the whole dump into its task queue; submitting
+        # a fixed window of batches keeps reader memory constant instead
+        in_flight = deque()
+        while True:
+            batch = list(islice(pages, batch_size))
+            if batch:
+                in_flight.append(pool.apply_async(process_batch, (batch,)))
+            if in_flight and (not batch or len(in_flight) >= workers * MAX_BATCHES_IN_FLIGHT):
+                yield from in_flight.popleft().get()
+            elif not batch:
+                break
+
+
+def build_knowledge_base_from_dump(path: str, kb: Optional[Dict] = None,
+                                   workers: Optional[int] = None,
+                                   max_pages: Optional[int] = None) -> Dict:
+    """Build a new knowledge base from a dump, or refresh `kb` with entries whose revision changed"""
+    started = time.monotonic()
+    kb = kb or {"authors": {}, "works": {}, "sources": []}
+    stats = {"added": 0, "updated": 0, "unchanged": 0}
+    for kind, key, entry in ingest_dump(path, workers=workers, max_pages=max_pages):
+        section = kb["authors"] if kind == "author" else kb["works"]
+        existing = section.get(key)
+        if existing is None:
+            stats["added"] += 1
+        elif existing.get("page_revision", {}).get("lastrevid") == entry["page_revision"]["lastrevid"]:
+            stats["unchanged"] += 1
+            continue
+        else:
+            stats["updated"] += 1
+        section[key] = entry
+
+    source = f"Wikipedia dump ({os.path.basename(path)})"
+    if source not in kb.setdefault("sources", []):
+        kb["sources"].append(source)
+    kb["timestamp"] = str(time.time())
+    kb["last_refresh"] = {**stats, "seconds": round(time.monotonic() - started, 2)}
+    logger.info(f"✅ Dump ingestion complete: {kb['last_refresh']}")
+    return kb
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build the expanded knowledge base from a local dump")
+    parser.add_argument("dump", help="MediaWiki XML export or JSON-lines dump (.bz2/.gz allowed)")
+    parser.add_argument("--output", help="Write the knowledge base to this file instead of stdout")
+    parser.add_argument("--refresh", metavar="KB_FILE",
+                        help="Update an existing knowledge base file with changed pages")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPUs)")
+    parser.add_argument("--max-pages", type=int, default=None, help="Stop after this many pages")
+    args = parser.parse_args()
+
+    kb = None
+    if args.refresh:
+        with open(args.refresh, 'r', encoding='utf-8') as f:
+            kb = json.load(f)
+    kb = build_knowledge_base_from_dump(args.dump, kb, workers=args.workers,
+                                        max_pages=args.max_pages)
+
+    output_path = args.output or args.refresh
+    if output_path:
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(kb, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, output_path)
+        logger.info(f"💾 Knowledge base written to {output_path}")
+    else:
+        print(json.dumps(kb, indent=2, ensure_ascii=False))
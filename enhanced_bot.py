@@ -10,7 +10,7 @@ from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMar
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from config import BOT_TOKEN
-from advanced_chatgpt_brain import advanced_answer_literature_question, rate_response
+from advanced_chatgpt_brain import advanced_answer_literature_question, rate_response, shutdown_brain
 from writers_brain import (
     get_available_writers, set_user_writer, get_user_writer, 
     talk_to_writer, get_writer_info, clear_writer_conversation
@@ -193,6 +193,8 @@ async def main():
         await dp.start_polling(bot)
     finally:
         await bot.session.close()
+        # Checkpoint learned feedback and cached web context before exiting
+        await asyncio.to_thread(shutdown_brain)
 
 if __name__ == "__main__":
     if bot and dp:
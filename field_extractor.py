@@ -0,0 +1,120 @@
+"""
+Field Extractor - Single-pass structured field extraction from page extracts
+Lowercases and tokenizes each extract once, then resolves nationality, era,
+genre and themes with one set intersection and years with precompiled patterns
+"""
+import re
+import string
+from functools import lru_cache
+from typing import Dict, List
+
+# Keyword tables in priority order: earlier entries win when several appear
+NATIONALITIES = ['Russian', 'English', 'French', 'German', 'American', 'Italian']
+
+ERAS = [
+    'Romantic', 'Victorian', 'Elizabethan', 'Realist', 'Modernist',
+    'Baroque', 'Classical', 'Medieval', 'Renaissance', 'Contemporary'
+]
+# Movement names that imply an era label
+ERA_VARIANTS = {
+    'romanticism': 'Romantic', 'realism': 'Realist', 'modernism': 'Modernist',
+    'classicism': 'Classical',
+}
+
+GENRES = ['novel', 'play', 'poem', 'drama', 'tragedy', 'comedy', 'novella', 'short story']
+
+THEMES = [
+    'love', 'death', 'power', 'morality', 'freedom', 'society', 'betrayal',
+    'redemption', 'justice', 'identity', 'fate', 'madness', 'revenge', 'grief'
+]
+MAX_THEMES = 3
+
+# Keywords that introduce a year ("born 1821", "published 1866")
+YEAR_KEYWORDS = {
+    'born': 'birth_year',
+    'died': 'death_year',
+    'published': 'year',
+    'written': 'year',
+    'year': 'year',
+}
+
+_AUTHOR_RE = re.compile(r"by\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)")
+# Everything that is not part of a word becomes a space before splitting
+_SEPARATORS = str.maketrans({c: ' ' for c in string.punctuation + string.digits + '«»—–“”„’'})
+
+
+def _build_index() -> Dict[str, List]:
+    """word -> [(field, rank, label)] for every single-word keyword and its plural"""
+    index: Dict[str, List] = {}
+
+    def add(keyword, field, rank, label):
+        for word in (keyword, keyword + 's'):
+            index.setdefault(word, []).append((field, rank, label))
+
+    for rank, nationality in enumerate(NATIONALITIES):
+        add(nationality.lower(), "nationality", rank, nationality)
+    for rank, era in enumerate(ERAS):
+        add(era.lower(), "era", rank, era)
+    for variant, era in ERA_VARIANTS.items():
+        add(variant, "era", ERAS.index(era), era)
+    for rank, genre in enumerate(GENRES):
+        add(genre, "genre", rank, genre.capitalize())
+    for rank, theme in enumerate(THEMES):
+        add(theme, "themes", rank, theme.capitalize())
+    return index
+
+
+_KEYWORD_INDEX = _build_index()
+# Multi-word keywords ("short story") cannot come out of the word set
+_PHRASES = {k: v for k, v in _KEYWORD_INDEX.items() if " " in k}
+
+# One pattern per year keyword: a literal prefix lets the regex engine skip
+# ahead with a fast substring search instead of trying every position
+_YEAR_PATTERNS = [
+    (field, re.compile(rf"{keyword}\s+(\d{{4}})\b")) for keyword, field in YEAR_KEYWORDS.items()
+]
+
+
+def extract_fields(text: str) -> Dict:
+    """
+    All structured fields of an extract in one pass:
+    birth_year, death_year, year, nationality, era, genre, themes, author
+    """
+    lowered = text.lower()
+    words = set(lowered.translate(_SEPARATORS).split())
+    hits = [_KEYWORD_INDEX[word] for word in words & _KEYWORD_INDEX.keys()]
+    hits.extend(entries for phrase, entries in _PHRASES.items() if phrase in lowered)
+
+    best: Dict[str, tuple] = {}       # field -> (rank, label) with the lowest rank
+    themes: Dict[int, str] = {}
+    for entries in hits:
+        for field, rank, label in entries:
+            if field == "themes":
+                themes[rank] = label
+            elif field not in best or rank < best[field][0]:
+                best[field] = (rank, label)
+
+    # Earliest "<keyword> <year>" wins when several keywords feed one field
+    years: Dict[str, tuple] = {}
+    for field, pattern in _YEAR_PATTERNS:
+        match = pattern.search(lowered)
+        if match and (field not in years or match.start() < years[field][0]):
+            years[field] = (match.start(), int(match.group(1)))
+
+    author_match = _AUTHOR_RE.search(text)
+    return {
+        "birth_year": years["birth_year"][1] if "birth_year" in years else None,
+        "death_year": years["death_year"][1] if "death_year" in years else None,
+        "year": years["year"][1] if "year" in years else None,
+        "nationality": best["nationality"][1] if "nationality" in best else "Unknown",
+        "era": best["era"][1] if "era" in best else "Unknown",
+        "genre": best["genre"][1] if "genre" in best else "Literary Work",
+        "themes": [themes[rank] for rank in sorted(themes)][:MAX_THEMES],
+        "author": author_match.group(1) if author_match else "Unknown",
+    }
+
+
+@lru_cache(maxsize=64)
+def year_pattern(keywords: str) -> re.Pattern:
+    """Compiled "<keyword> <year>" pattern for a '|'-separated keyword list"""
+    return re.compile(rf"(?:{keywords})\s+(\d{{4}})", re.IGNORECASE)
@@ -0,0 +1,146 @@
+"""
+HTML Extractor - BeautifulSoup/lxml parsing of non-API literature sites
+Parsing runs in a ProcessPoolExecutor so the async fetchers and the bot's
+event loop stay I/O-bound; per-site rules pick the title, body and fields
+"""
+import asyncio
+import codecs
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+MAX_DOCUMENT_BYTES = 2 * 1024 * 1024   # larger documents are skipped, not parsed
+MAX_TEXT_CHARS = 5000                  # text kept per document
+HTML_PARSER = "lxml"
+
+# CSS selectors per host, alternatives in priority order; fields map a name to
+# a selector whose text is kept
+SITE_RULES = {
+    "www.gutenberg.org": {
+        "title": "h1[itemprop=name], h1",
+        "content": "#bibrec, .page_content",
+        "fields": {"author": "a[itemprop=creator]", "language": "tr[property='dcterms:language'] td"},
+    },
+    "ru.wikisource.org": {
+        "title": "#firstHeading",
+        "content": "#mw-content-text .mw-parser-output",
+        "fields": {"author": "#ws-author", "year": "#ws-year"},
+    },
+    "www.poetryfoundation.org": {
+        "title": "h1",
+        "content": ".o-poem, .c-feature-bd",
+        "fields": {"author": ".c-feature-sub a, .c-txt_attribution a"},
+    },
+    "ilibrary.ru": {
+        "title": ".title h1, h1",
+        "content": "#text, .text",
+        "fields": {"author": ".author"},
+    },
+}
+DEFAULT_RULE = {
+    "title": "h1, title",
+    "content": "article, main, #content, body",
+    "fields": {"description": "meta[name=description]"},
+}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+SNIFF_BYTES = 2048                     # head of the body searched for a <meta> charset
+
+
+def document_bytes(html: str) -> int:
+    """Size of a decoded document in UTF-8 bytes, the unit of MAX_DOCUMENT_BYTES"""
+    if len(html) > MAX_DOCUMENT_BYTES or 4 * len(html) <= MAX_DOCUMENT_BYTES:
+        return len(html)   # decides the cap either way without encoding
+    return len(html.encode('utf-8', errors='replace'))
+
+
+def sniff_charset(body: bytes, declared: Optional[str] = None) -> str:
+    """Header charset, else a <meta> charset in the first bytes, else UTF-8"""
+    candidates = [declared]
+    match = _META_CHARSET_RE.search(body[:SNIFF_BYTES])
+    if match:
+        candidates.append(match.group(1).decode('ascii', errors='ignore'))
+    for charset in candidates:
+        if charset:
+            try:
+                return codecs.lookup(charset).name
+            except LookupError:
+                continue
+    return "utf-8"
+
+
+def rule_for(url: str) -> Dict:
+    return SITE_RULES.get(urlparse(url).netloc.lower(), DEFAULT_RULE)
+
+
+def _select(soup, selector: str):
+    """First match of the comma-separated alternatives, tried in priority order"""
+    for alternative in selector.split(","):
+        node = soup.select_one(alternative.strip())
+        if node is not None:
+            return node
+    return None
+
+
+def _text(node) -> str:
+    if node is None:
+        return ""
+    if node.name == "meta":
+        return node.get("content", "").strip()
+    return _WHITESPACE_RE.sub(" ", node.get_text(" ", strip=True)).strip()
+
+
+def parse_html(url: str, html: str) -> Dict:
+    """Runs in a worker process: title, text and rule fields of one document"""
+    rule = rule_for(url)
+    soup = BeautifulSoup(html, HTML_PARSER)
+    for tag in soup(["script", "style", "noscript", "nav", "footer"]):
+        tag.decompose()
+    content = _select(soup, rule["content"])
+    return {
+        "url": url,
+        "title": _text(_select(soup, rule["title"])),
+        "text": _text(content)[:MAX_TEXT_CHARS],
+        "fields": {name: _text(_select(soup, selector))
+                   for name, selector in rule.get("fields", {}).items()},
+    }
+
+
+class HtmlExtractor:
+    """Async front end over a process pool of parse_html workers"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.stats = {"parsed": 0, "too_large": 0, "failed": 0}
+
+    async def extract(self, url: str, html: str) -> Optional[Dict]:
+        """Parse one document off the event loop; None if oversized or unparseable"""
+        if document_bytes(html) > MAX_DOCUMENT_BYTES:
+            self.stats["too_large"] += 1
+            logger.warning(f"⚠️ Skipping {url}: document exceeds {MAX_DOCUMENT_BYTES} bytes")
+            return None
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, parse_html, url, html
+            )
+            self.stats["parsed"] += 1
+            return result
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning(f"HTML extraction failed for {url}: {e}")
+            return None
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,110 @@
+"""
+On-disk HTTP Cache - Persistent response bodies with conditional revalidation
+Stores bodies next to their ETag / Last-Modified validators so repeat runs of
+the scraper become local reads while fresh and cheap 304s once stale
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Next to the code rather than the working directory; HTTP_CACHE_DIR overrides it
+HTTP_CACHE_DIR = os.getenv(
+    "HTTP_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache")
+)
+# Wikipedia API responses are sent with max-age=0, so freshness is driven by
+# this local TTL unless the server allows a longer max-age
+DEFAULT_FRESH_TTL = 24 * 3600
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class HttpCache:
+    """File-per-URL response cache keyed by a hash of the full URL"""
+
+    def __init__(self, cache_dir: str = HTTP_CACHE_DIR, fresh_ttl: float = DEFAULT_FRESH_TTL):
+        self.cache_dir = cache_dir
+        self.fresh_ttl = fresh_ttl
+        # The directory is created on the first write, not on import
+        self.stats = {"fresh": 0, "revalidated": 0, "stale_served": 0, "stored": 0, "misses": 0}
+
+    def _paths(self, url: str):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, digest[:2], digest)
+        return f"{base}.json", f"{base}.body"
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Cached entry {"meta": ..., "body": ...} for a URL, fresh or stale"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'r', encoding='utf-8') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            self.stats["misses"] += 1
+            return None
+        return {"meta": meta, "body": body}
+
+    def is_fresh(self, entry: Dict) -> bool:
+        meta = entry["meta"]
+        return time.time() - meta["fetched_at"] < meta.get("max_age", self.fresh_ttl)
+
+    def conditional_headers(self, entry: Dict) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for revalidating an entry"""
+        headers = {}
+        if entry["meta"].get("etag"):
+            headers["If-None-Match"] = entry["meta"]["etag"]
+        if entry["meta"].get("last_modified"):
+            headers["If-Modified-Since"] = entry["meta"]["last_modified"]
+        return headers
+
+    def _max_age(self, headers) -> float:
+        match = _MAX_AGE_RE.search(headers.get("Cache-Control", ""))
+        server_max_age = int(match.group(1)) if match else 0
+        return max(self.fresh_ttl, server_max_age)
+
+    def _write_atomic(self, path: str, content: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def store(self, url: str, body: str, headers) -> None:
+        """Save a 200 response with its validators"""
+        if "no-store" in headers.get("Cache-Control", ""):
+            return
+        meta_path, body_path = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+            "max_age": self._max_age(headers),
+        }
+        try:
+            # Body first so a crash never leaves metadata pointing at a missing body
+            self._write_atomic(body_path, body)
+            self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False))
+            self.stats["stored"] += 1
+        except OSError as e:
+            logger.warning(f"⚠️ HTTP cache write failed for {url}: {e}")
+
+    def refresh(self, url: str, entry: Dict, headers) -> None:
+        """Mark an entry fresh again after a 304 Not Modified"""
+        meta = dict(entry["meta"])
+        meta["fetched_at"] = time.time()
+        meta["max_age"] = self._max_age(headers)
+        meta["etag"] = headers.get("ETag") or meta.get("etag")
+        meta["last_modified"] = headers.get("Last-Modified") or meta.get("last_modified")
+        meta_path, _ = self._paths(url)
+        try:
+            self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False))
+        except OSError as e:
+            logger.warning(f"⚠️ HTTP cache refresh failed for {url}: {e}")
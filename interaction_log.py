@@ -0,0 +1,145 @@
+"""
+Interaction Log - Append-only segmented JSON-lines log with snapshot compaction
+Saves append only what is new; once enough segments pile up they are folded
+into an aggregate snapshot, so startup reads the snapshot plus a short tail
+"""
+import json
+import logging
+import os
+import re
+import shutil
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRAINING_LOG_DIR = "training_log"
+SNAPSHOT_FILE = "snapshot.json"
+ARCHIVE_DIR = "archive"
+SEGMENT_MAX_RECORDS = 10000       # records per segment before rotating
+COMPACT_AFTER_SEGMENTS = 4        # full segments that trigger compaction
+
+_SEGMENT_RE = re.compile(r"^segment-(\d{6})\.jsonl$")
+
+
+def read_segment(path: str) -> Iterator[Dict]:
+    """Records of one segment file, skipping a torn final line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class InteractionLog:
+    """Numbered segment files plus snapshot.json in one directory"""
+
+    def __init__(self, log_dir: str = TRAINING_LOG_DIR,
+                 segment_max_records: int = SEGMENT_MAX_RECORDS,
+                 compact_after_segments: int = COMPACT_AFTER_SEGMENTS,
+                 archive_compacted: bool = False):
+        self.log_dir = log_dir
+        self.segment_max_records = segment_max_records
+        self.compact_after_segments = compact_after_segments
+        # Keep compacted segments under archive/ (for offline retraining) instead of deleting
+        self.archive_compacted = archive_compacted
+        os.makedirs(log_dir, exist_ok=True)
+
+        snapshot = self.load_snapshot()
+        self.next_segment = snapshot["next_segment"] if snapshot else 1
+        live = self.segments()
+        self.current = live[-1] if live else self.next_segment
+        self._current_records = None   # counted on first append
+
+    def _segment_path(self, index: int, directory: Optional[str] = None) -> str:
+        return os.path.join(directory or self.log_dir, f"segment-{index:06d}.jsonl")
+
+    def segments(self) -> List[int]:
+        """Segment numbers not yet folded into the snapshot, oldest first"""
+        indexes = []
+        for name in os.listdir(self.log_dir):
+            match = _SEGMENT_RE.match(name)
+            # Segments below next_segment are leftovers of an interrupted compaction
+            if match and int(match.group(1)) >= self.next_segment:
+                indexes.append(int(match.group(1)))
+        return sorted(indexes)
+
+    def load_snapshot(self) -> Optional[Dict]:
+        path = os.path.join(self.log_dir, SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def iter_tail(self) -> Iterator[Dict]:
+        """Records appended since the last compaction, in order"""
+        for index in self.segments():
+            yield from read_segment(self._segment_path(index))
+
+    def segment_paths(self, include_archive: bool = True) -> List[str]:
+        """Segment files in record order: archived (if kept) then the tail"""
+        paths = []
+        archive = os.path.join(self.log_dir, ARCHIVE_DIR)
+        if include_archive and os.path.isdir(archive):
+            paths.extend(os.path.join(archive, name) for name in sorted(os.listdir(archive))
+                         if _SEGMENT_RE.match(name))
+        paths.extend(self._segment_path(index) for index in self.segments())
+        return paths
+
+    def iter_all(self) -> Iterator[Dict]:
+        """Archived records (if kept) followed by the tail"""
+        for path in self.segment_paths():
+            yield from read_segment(path)
+
+    def append(self, records: List[Dict]):
+        """Append records to the current segment, rotating when it is full"""
+        if self._current_records is None:
+            path = self._segment_path(self.current)
+            self._current_records = 0
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    self._current_records = sum(1 for _ in f)
+        start = 0
+        while start < len(records):
+            room = self.segment_max_records - self._current_records
+            if room <= 0:
+                self.current += 1
+                self._current_records = 0
+                continue
+            chunk = records[start:start + room]
+            with open(self._segment_path(self.current), 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in chunk))
+                f.flush()
+                os.fsync(f.fileno())
+            self._current_records += len(chunk)
+            start += len(chunk)
+
+    def needs_compaction(self) -> bool:
+        full_segments = len(self.segments()) - 1   # the current segment is still filling
+        return full_segments >= self.compact_after_segments
+
+    def compact(self, state: Dict):
+        """Replace every segment with a snapshot of the aggregate `state`"""
+        compacted = self.segments()
+        snapshot = {"next_segment": self.current + 1, "state": state}
+        path = os.path.join(self.log_dir, SNAPSHOT_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        # The snapshot lands before segments go away; a crash in between only
+        # leaves segments that load() already ignores
+        os.replace(tmp_path, path)
+
+        archive = os.path.join(self.log_dir, ARCHIVE_DIR)
+        if self.archive_compacted:
+            os.makedirs(archive, exist_ok=True)
+        for index in compacted:
+            if self.archive_compacted:
+                shutil.move(self._segment_path(index), self._segment_path(index, archive))
+            else:
+                os.remove(self._segment_path(index))
+        self.next_segment = self.current = snapshot["next_segment"]
+        self._current_records = 0
+        logger.info(f"🗜️ Compacted {len(compacted)} interaction log segments into a snapshot")
@@ -0,0 +1,164 @@
+"""
+Interaction Store - Compact columnar storage for trainer interactions
+Numeric fields live in typed arrays, categorical fields as interned codes and
+question/response text once per distinct string, with a retention window that
+drops the oldest records
+"""
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+RETENTION_MAX_RECORDS = 50000     # newest interactions kept in memory
+RETENTION_SLACK = 0.1             # trim this fraction extra so trimming is amortized O(1)
+NO_RATING = 0
+
+
+def coerce_rating(rating) -> Optional[int]:
+    """A 1-5 star rating as int, or None for no rating; ValueError for anything else"""
+    if rating is None:
+        return None
+    if (isinstance(rating, bool) or not isinstance(rating, (int, float))
+            or not 1 <= rating <= 5 or rating != int(rating)):
+        raise ValueError(f"Rating must be an integer from 1 to 5, got {rating!r}")
+    return int(rating)
+
+
+class InternTable:
+    """Value <-> small integer code"""
+
+    def __init__(self):
+        self.values: List = []
+        self.codes: Dict = {}
+
+    def code(self, value) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class TextTable:
+    """Deduplicated, reference-counted strings keyed by content"""
+
+    def __init__(self):
+        self.texts: List[Optional[str]] = []
+        self.refs = array('I')
+        self.ids: Dict[str, int] = {}
+        self.free: List[int] = []
+
+    def add(self, text: str) -> int:
+        text_id = self.ids.get(text)
+        if text_id is None:
+            if self.free:
+                text_id = self.free.pop()
+                self.texts[text_id] = text
+                self.refs[text_id] = 0
+            else:
+                text_id = len(self.texts)
+                self.texts.append(text)
+                self.refs.append(0)
+            self.ids[text] = text_id
+        self.refs[text_id] += 1
+        return text_id
+
+    def release(self, text_id: int):
+        self.refs[text_id] -= 1
+        if self.refs[text_id] == 0:
+            del self.ids[self.texts[text_id]]
+            self.texts[text_id] = None
+            self.free.append(text_id)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class InteractionStore:
+    """Append-only columns with oldest-first retention"""
+
+    def __init__(self, max_records: Optional[int] = RETENTION_MAX_RECORDS,
+                 max_age_days: Optional[float] = None):
+        self.max_records = max_records
+        self.max_age_days = max_age_days
+        self.timestamps = array('d')
+        self.ratings = array('b')
+        self.users = array('I')
+        self.types = array('B')
+        self.categories = array('H')
+        self.questions = array('I')
+        self.responses = array('I')
+        self.user_table = InternTable()
+        self.type_table = InternTable()
+        self.category_table = InternTable()
+        self.text = TextTable()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, interaction: Dict):
+        """Add one interaction to every column, or (on a bad record) to none"""
+        try:
+            timestamp = datetime.fromisoformat(interaction["timestamp"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            timestamp = time.time()
+        rating = coerce_rating(interaction.get("rating"))
+        question, response = interaction["question"], interaction["response"]
+        if not isinstance(question, str) or not isinstance(response, str):
+            raise ValueError("Interaction question and response must be strings")
+        
+        # Nothing below can fail, so the columns stay the same length
+        self.timestamps.append(timestamp)
+        self.ratings.append(rating if rating is not None else NO_RATING)
+        self.users.append(self.user_table.code(interaction.get("user_id")))
+        self.types.append(self.type_table.code(interaction.get("question_type", "general")))
+        self.categories.append(self.category_table.code(interaction.get("category")))
+        self.questions.append(self.text.add(question))
+        self.responses.append(self.text.add(response))
+        self._enforce_retention()
+
+    def _enforce_retention(self):
+        drop = 0
+        if self.max_records and len(self) > self.max_records:
+            drop = len(self) - int(self.max_records * (1 - RETENTION_SLACK))
+        if self.max_age_days and self.timestamps[0] < time.time() - self.max_age_days * 86400:
+            cutoff = time.time() - self.max_age_days * 86400
+            drop = max(drop, next((i for i, t in enumerate(self.timestamps) if t >= cutoff), len(self)))
+        if drop:
+            self.drop_oldest(drop)
+
+    def drop_oldest(self, count: int):
+        for i in range(count):
+            self.text.release(self.questions[i])
+            self.text.release(self.responses[i])
+        for column in (self.timestamps, self.ratings, self.users, self.types,
+                       self.categories, self.questions, self.responses):
+            del column[:count]
+        self.dropped += count
+
+    def get(self, index: int) -> Dict:
+        """One interaction as the dict record_interaction builds"""
+        rating = self.ratings[index]
+        return {
+            "timestamp": datetime.fromtimestamp(self.timestamps[index]).isoformat(),
+            "user_id": self.user_table.values[self.users[index]],
+            "question": self.text.texts[self.questions[index]],
+            "response": self.text.texts[self.responses[index]],
+            "rating": rating if rating != NO_RATING else None,
+            "category": self.category_table.values[self.categories[index]],
+            "question_type": self.type_table.values[self.types[index]],
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(len(self)):
+            yield self.get(index)
+
+    def by_type(self, question_type: str) -> Iterator[Dict]:
+        """Interactions of one question type, oldest first"""
+        code = self.type_table.codes.get(question_type)
+        if code is None:
+            return
+        for index, type_code in enumerate(self.types):
+            if type_code == code:
+                yield self.get(index)
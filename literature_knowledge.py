@@ -2,6 +2,7 @@
 Comprehensive Literature Knowledge Base
 Contains extensive information about writers, works, quotes, and literary movements
 """
+import threading
 
 # Comprehensive Database of Writers with Works and Quotes
 LITERATURE_DB = {
@@ -347,125 +348,205 @@ LITERATURE_DB = {
     }
 }
 
-def get_writer_knowledge(writer_name: str) -> dict | None:
-    """Get comprehensive knowledge about a writer - supports English and Russian names"""
-    # Russian name mappings (extended with variations)
-    russian_to_key = {
-        'пушкин': 'aleksandr_pushkin',
-        'толстой': 'lev_tolstoy',
-        'толстого': 'lev_tolstoy',
-        'толстогo': 'lev_tolstoy',
-        'достоевский': 'fedor_dostoevsky',
-        'достоевского': 'fedor_dostoevsky',
-        'чехов': 'anton_chekhov',
-        'чехова': 'anton_chekhov',
-        'гоголь': 'nikolai_gogol',
-        'гоголя': 'nikolai_gogol',
-        'александр': 'aleksandr_pushkin',
-        'лев': 'lev_tolstoy',
-        'фёдор': 'fedor_dostoevsky',
-        'федор': 'fedor_dostoevsky',
-        'антон': 'anton_chekhov',
-        'николай': 'nikolai_gogol',
-        'пушкина': 'aleksandr_pushkin',
-        'достоевски': 'fedor_dostoevsky',
-    }
-    
+# Alias tables used to resolve free-text questions to knowledge base entries
+# Russian name mappings (extended with variations)
+WRITER_ALIASES = {
+    'пушкин': 'aleksandr_pushkin',
+    'толстой': 'lev_tolstoy',
+    'толстого': 'lev_tolstoy',
+    'толстогo': 'lev_tolstoy',
+    'достоевский': 'fedor_dostoevsky',
+    'достоевского': 'fedor_dostoevsky',
+    'чехов': 'anton_chekhov',
+    'чехова': 'anton_chekhov',
+    'гоголь': 'nikolai_gogol',
+    'гоголя': 'nikolai_gogol',
+    'александр': 'aleksandr_pushkin',
+    'лев': 'lev_tolstoy',
+    'фёдор': 'fedor_dostoevsky',
+    'федор': 'fedor_dostoevsky',
+    'антон': 'anton_chekhov',
+    'николай': 'nikolai_gogol',
+    'пушкина': 'aleksandr_pushkin',
+    'достоевски': 'fedor_dostoevsky',
     # Western writers extended
-    western_names = {
-        'shakespeare': 'william_shakespeare',
-        'shakespeare\'s': 'william_shakespeare',
-        'шекспир': 'william_shakespeare',
-        'austen': 'jane_austen',
-        'остин': 'jane_austen',
-        'jane': 'jane_austen',
-        'dickens': 'charles_dickens',
-        'диккенс': 'charles_dickens',
-        'kafka': 'franz_kafka',
-        'кафка': 'franz_kafka',
-        'fitzgerald': 'f_scott_fitzgerald',
-        'фицджеральд': 'f_scott_fitzgerald',
-    }
-    
+    'shakespeare': 'william_shakespeare',
+    'shakespeare\'s': 'william_shakespeare',
+    'шекспир': 'william_shakespeare',
+    'austen': 'jane_austen',
+    'остин': 'jane_austen',
+    'jane': 'jane_austen',
+    'dickens': 'charles_dickens',
+    'диккенс': 'charles_dickens',
+    'kafka': 'franz_kafka',
+    'кафка': 'franz_kafka',
+    'fitzgerald': 'f_scott_fitzgerald',
+    'фицджеральд': 'f_scott_fitzgerald',
+}
+
+# Russian to English work title mappings
+WORK_ALIASES = {
+    'война и мир': 'war_and_peace',
+    'преступление': 'crime_and_punishment',
+    'идиот': 'the_idiot',
+    'гордость': 'pride_and_prejudice',
+    'гамлет': 'hamlet',
+    'анна': 'anna_karenina',
+    'оскорблённые': 'notes_from_underground',
+    'мастер': 'crime_and_punishment',
+    'великие': 'great_expectations',
+    'гэтсби': 'the_great_gatsby',
+}
+
+# Russian to English movement mappings
+MOVEMENT_ALIASES = {
+    'романтизм': 'romanticism',
+    'реализм': 'realism',
+    'натурализм': 'naturalism',
+    'модернизм': 'modernism',
+    'экзистенциализм': 'existentialism',
+    'барокко': 'romanticism',  # approximate
+    'классицизм': 'romanticism',  # approximate
+}
+
+# Aliases that are first names, common words or approximations - a match on
+# one of these alone is not strong evidence the question is about that entry
+WEAK_ALIASES = {
+    'александр', 'лев', 'фёдор', 'федор', 'антон', 'николай', 'jane',
+    'гордость', 'анна', 'мастер', 'великие', 'барокко', 'классицизм',
+}
+
+
+# Curated works; scraped data only fills in fields they lack
+_CURATED_WORKS = frozenset(LITERATURE_DB["famous_works"])
+
+# Serializes registrations; readers never lock because registrations build new
+# dicts and swap them in instead of resizing ones a match_* call may be iterating
+_registry_lock = threading.Lock()
+
+
+def _find_writer(key: str) -> dict | None:
+    for region, writers in LITERATURE_DB["classic_authors"].items():
+        if key in writers:
+            return writers[key]
+    return None
+
+
+def match_writer(writer_name: str) -> tuple[dict | None, str | None]:
+    """Resolve a writer and return (entry, matched alias or key)"""
     query_lower = writer_name.lower()
     
-    # Check if it's a Russian name
-    for russian_name, key in russian_to_key.items():
-        if russian_name in query_lower:
-            for region, writers in LITERATURE_DB["classic_authors"].items():
-                if key in writers:
-                    return writers[key]
-    
-    # Check western names
-    for western_name, key in western_names.items():
-        if western_name in query_lower:
-            for region, writers in LITERATURE_DB["classic_authors"].items():
-                if key in writers:
-                    return writers[key]
+    # Check aliases (Russian names first, then western names)
+    for alias, key in WRITER_ALIASES.items():
+        if alias in query_lower:
+            writer = _find_writer(key)
+            if writer:
+                return writer, alias
     
     # Standard search - check key and name
     for region, writers in LITERATURE_DB["classic_authors"].items():
         for writer_key, writer_data in writers.items():
             if query_lower in writer_key or query_lower in writer_data["name"].lower():
-                return writer_data
-    return None
+                return writer_data, writer_key
+    return None, None
 
-def get_work_knowledge(work_title: str) -> dict | None:
-    """Get knowledge about a specific literary work - supports Russian and English names"""
-    # Russian to English work title mappings
-    russian_to_work = {
-        'война и мир': 'war_and_peace',
-        'преступление': 'crime_and_punishment',
-        'идиот': 'the_idiot',
-        'гордость': 'pride_and_prejudice',
-        'гамлет': 'hamlet',
-        'анна': 'anna_karenina',
-        'оскорблённые': 'notes_from_underground',
-        'мастер': 'crime_and_punishment',
-        'великие': 'great_expectations',
-        'гэтсби': 'the_great_gatsby',
-    }
-    
+
+def match_work(work_title: str) -> tuple[dict | None, str | None]:
+    """Resolve a literary work and return (entry, matched alias or key)"""
     query_lower = work_title.lower()
     
     # Check for Russian titles
-    for russian_title, work_key in russian_to_work.items():
-        if russian_title in query_lower:
+    for alias, work_key in WORK_ALIASES.items():
+        if alias in query_lower:
             if work_key in LITERATURE_DB["famous_works"]:
-                return LITERATURE_DB["famous_works"][work_key]
+                return LITERATURE_DB["famous_works"][work_key], alias
     
     # Standard search - check key and title
     for work_key, work_data in LITERATURE_DB["famous_works"].items():
         if query_lower in work_key or query_lower in work_data["title"].lower():
-            return work_data
-    return None
+            return work_data, work_key
+    return None, None
 
-def get_movement_knowledge(movement_name: str) -> dict | None:
-    """Get knowledge about a literary movement - supports Russian and English names"""
-    # Russian to English movement mappings
-    russian_to_movement = {
-        'романтизм': 'romanticism',
-        'реализм': 'realism',
-        'натурализм': 'naturalism',
-        'модернизм': 'modernism',
-        'экзистенциализм': 'existentialism',
-        'барокко': 'romanticism',  # approximate
-        'классицизм': 'romanticism',  # approximate
-    }
-    
+
+def match_movement(movement_name: str) -> tuple[dict | None, str | None]:
+    """Resolve a literary movement and return (entry, matched alias or key)"""
     query_lower = movement_name.lower()
     
     # Check for Russian names
-    for russian_name, movement_key in russian_to_movement.items():
-        if russian_name in query_lower:
+    for alias, movement_key in MOVEMENT_ALIASES.items():
+        if alias in query_lower:
             if movement_key in LITERATURE_DB["literary_movements"]:
-                return LITERATURE_DB["literary_movements"][movement_key]
+                return LITERATURE_DB["literary_movements"][movement_key], alias
     
     # Standard search - check key and name
     for movement_key, movement_data in LITERATURE_DB["literary_movements"].items():
         if query_lower in movement_key or query_lower in movement_data["name"].lower():
-            return movement_data
-    return None
+            return movement_data, movement_key
+    return None, None
+
+
+def get_writer_knowledge(writer_name: str) -> dict | None:
+    """Get comprehensive knowledge about a writer - supports English and Russian names"""
+    return match_writer(writer_name)[0]
+
+def get_work_knowledge(work_title: str) -> dict | None:
+    """Get knowledge about a specific literary work - supports Russian and English names"""
+    return match_work(work_title)[0]
+
+def get_movement_knowledge(movement_name: str) -> dict | None:
+    """Get knowledge about a literary movement - supports Russian and English names"""
+    return match_movement(movement_name)[0]
+
+def _register_aliases(aliases: dict, names: list, key: str) -> list:
+    added = []
+    for alias in names:
+        alias = alias.lower().strip()
+        # Built-in aliases keep priority over scraped ones
+        if len(alias) >= 4 and alias not in aliases:
+            aliases[alias] = key
+            added.append(alias)
+    return added
+
+
+def register_writer(key: str, entry: dict, aliases: list, region: str = "scraped") -> list:
+    """Add or replace a writer in the live index; returns the aliases added"""
+    global WRITER_ALIASES
+    with _registry_lock:
+        authors = dict(LITERATURE_DB["classic_authors"])
+        authors[region] = {**authors.get(region, {}), key: entry}
+        writer_aliases = dict(WRITER_ALIASES)
+        added = _register_aliases(writer_aliases, aliases, key)
+        LITERATURE_DB["classic_authors"] = authors
+        WRITER_ALIASES = writer_aliases
+    return added
+
+
+def register_work(key: str, entry: dict, aliases: list) -> list:
+    """Add or replace a scraped work, or fill gaps in a curated one; returns the aliases added"""
+    global WORK_ALIASES
+    with _registry_lock:
+        works = dict(LITERATURE_DB["famous_works"])
+        if key in _CURATED_WORKS and key in works:
+            # Curated title, author, year and quotes win; "source" stays unset
+            entry = {**{k: v for k, v in entry.items() if k != "source"}, **works[key]}
+        works[key] = entry
+        work_aliases = dict(WORK_ALIASES)
+        added = _register_aliases(work_aliases, aliases, key)
+        LITERATURE_DB["famous_works"] = works
+        WORK_ALIASES = work_aliases
+    return added
+
+
+def link_work_to_writer(writer_key: str, title: str, region: str = "scraped"):
+    """Append a title to a registered writer's works"""
+    with _registry_lock:
+        writers = LITERATURE_DB["classic_authors"].get(region, {})
+        writer = writers.get(writer_key)
+        if writer is None or title in writer["works"]:
+            return
+        # A new list, so readers slicing the old one are unaffected
+        writer["works"] = writer["works"] + [title]
+
 
 def get_all_writers_list() -> list:
     """Get list of all available writers"""
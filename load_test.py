@@ -0,0 +1,147 @@
+"""
+Load Driver for the Advanced Brain
+Fires a mix of questions through advanced_answer_literature_question against
+the mock OpenRouter server and reports throughput and p50/p95/p99 latency
+
+Usage:
+    python load_test.py --requests 500 --concurrency 50 --latency-ms 800 --error-rate 0.05
+    python load_test.py --base-url http://127.0.0.1:8765/api/v1   # already running mock
+"""
+import argparse
+import asyncio
+import logging
+import math
+import os
+import random
+import time
+from typing import Dict, List
+
+from mock_openrouter import add_settings_arguments, settings_from_args, start_mock_server
+
+logger = logging.getLogger(__name__)
+
+# Mix of factual (answered locally) and open-ended (escalated) questions
+QUESTIONS = [
+    "Кто такой Пушкин?",
+    "Кто такой Достоевский?",
+    "Что такое романтизм?",
+    "Who is Shakespeare?",
+    "Расскажи про Гамлет",
+    "Сравните Толстого и Достоевского",
+    "Почему Раскольников совершил преступление?",
+    "Объясните смысл романа Война и мир",
+    "Analyze the themes of The Great Gatsby",
+    "Какие цитаты Чехова самые известные?",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies: List[float]) -> Dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0) * 1000, 1),
+    }
+
+
+async def run_load(total: int, concurrency: int, users: int) -> Dict:
+    """Drive `total` questions through the advanced path with bounded concurrency"""
+    # Imported late so the environment set up in main() is picked up
+    from advanced_chatgpt_brain import (
+        advanced_answer_literature_question, upstream_guard, model_caller
+    )
+    from question_router import route_question
+
+    latencies: Dict[str, List[float]] = {"local": [], "llm": []}
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal failures
+        question = random.choice(QUESTIONS)
+        route = route_question(question)["route"]
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await advanced_answer_literature_question(random.randrange(users), question)
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Request {i} failed: {e}")
+                return
+            latencies[route].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - started
+
+    all_latencies = latencies["local"] + latencies["llm"]
+    return {
+        "requests": total,
+        "failures": failures,
+        "wall_seconds": round(wall, 2),
+        "throughput_rps": round(len(all_latencies) / wall, 1) if wall else 0.0,
+        "overall": summarize(all_latencies),
+        "local": summarize(latencies["local"]),
+        "llm": summarize(latencies["llm"]),
+        "circuit_state": upstream_guard.breaker.state,
+        "hedging": dict(model_caller.stats),
+    }
+
+
+def print_report(report: Dict, mock_stats: Dict = None):
+    print("\n" + "=" * 60)
+    print("📈 ADVANCED BRAIN LOAD TEST")
+    print("=" * 60)
+    print(f"Requests: {report['requests']}  Failures: {report['failures']}  "
+          f"Wall: {report['wall_seconds']}s  Throughput: {report['throughput_rps']} req/s")
+    print(f"Circuit: {report['circuit_state']}  Hedging: {report['hedging']}")
+    for name in ("overall", "local", "llm"):
+        s = report[name]
+        print(f"{name:>8}: n={s['count']:<5} p50={s['p50_ms']}ms  p95={s['p95_ms']}ms  "
+              f"p99={s['p99_ms']}ms  max={s['max_ms']}ms")
+    if mock_stats:
+        print(f"    mock: {mock_stats}")
+    print("=" * 60)
+
+
+async def main(args: argparse.Namespace):
+    runner = None
+    if args.base_url:
+        os.environ["OPENROUTER_BASE_URL"] = args.base_url
+    else:
+        runner = await start_mock_server(settings_from_args(args), port=args.port)
+        os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{args.port}/api/v1"
+    os.environ.setdefault("OPENROUTER_API_KEY", "mock-key")
+    if not args.web:
+        os.environ["WEB_RESEARCH_ENABLED"] = "0"
+
+    try:
+        report = await run_load(args.requests, args.concurrency, args.users)
+        mock_stats = dict(runner.app["stats"]) if runner else None
+        print_report(report, mock_stats)
+    finally:
+        if runner:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Load test the advanced brain against a mock OpenRouter")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50, help="Distinct simulated user ids")
+    parser.add_argument("--base-url", help="Use an already running mock instead of starting one")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the in-process mock")
+    parser.add_argument("--web", action="store_true", help="Keep live Wikipedia research enabled")
+    add_settings_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
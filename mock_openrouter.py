@@ -0,0 +1,208 @@
+"""
+Mock OpenRouter Server - Local stand-in for the chat-completions endpoint
+Supports plain JSON and SSE streaming responses with configurable latency,
+error rates and token throughput for offline end-to-end load testing
+
+Usage:
+    python mock_openrouter.py --port 8765 --latency lognormal --latency-ms 800
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/api/v1 python enhanced_bot.py
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from typing import Dict, List
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+# Vocabulary for generated completions
+_WORDS = (
+    "роман автор герой сюжет эпоха поэзия проза реализм романтизм образ "
+    "символ конфликт мораль судьба общество любовь свобода память время "
+    "novel author hero plot era poetry prose realism theme symbol"
+).split()
+
+
+class MockSettings:
+    """Behaviour knobs for the mock server"""
+
+    def __init__(self, latency: str = "lognormal", latency_ms: float = 500.0,
+                 latency_sigma: float = 0.5, error_rate: float = 0.0,
+                 error_statuses: List[int] = None, retry_after: float = 1.0,
+                 tokens_per_second: float = 80.0, completion_tokens: int = 200,
+                 model_latency_scale: Dict[str, float] = None):
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency}")
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [429, 500, 503]
+        self.retry_after = retry_after
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        # Per-model multipliers, e.g. a faster fallback model at 0.3
+        self.model_latency_scale = model_latency_scale or {}
+
+    def sample_latency(self, model: str = "") -> float:
+        """Time to first token in seconds"""
+        mean = self.latency_ms / 1000 * self.model_latency_scale.get(model, 1.0)
+        if self.latency == "fixed":
+            return mean
+        if self.latency == "uniform":
+            spread = mean * self.latency_sigma
+            return max(0.0, random.uniform(mean - spread, mean + spread))
+        if self.latency == "exponential":
+            return random.expovariate(1 / mean) if mean > 0 else 0.0
+        # lognormal: latency_ms is the median
+        return random.lognormvariate(0, self.latency_sigma) * mean
+
+
+def _completion_tokens(settings: MockSettings, payload: Dict) -> List[str]:
+    count = min(settings.completion_tokens, int(payload.get("max_tokens") or settings.completion_tokens))
+    return [random.choice(_WORDS) + " " for _ in range(max(1, count))]
+
+
+def _error_response(settings: MockSettings) -> web.Response:
+    status = random.choice(settings.error_statuses)
+    headers = {"Retry-After": str(settings.retry_after)} if status == 429 else {}
+    return web.json_response(
+        {"error": {"code": status, "message": "Mock upstream error"}},
+        status=status, headers=headers
+    )
+
+
+async def chat_completions(request: web.Request) -> web.StreamResponse:
+    """POST /api/v1/chat/completions"""
+    settings: MockSettings = request.app["settings"]
+    stats: Dict = request.app["stats"]
+    payload = await request.json()
+    model = payload.get("model", "mock-model")
+    stats["requests"] += 1
+
+    await asyncio.sleep(settings.sample_latency(model))
+
+    if random.random() < settings.error_rate:
+        stats["errors"] += 1
+        return _error_response(settings)
+
+    tokens = _completion_tokens(settings, payload)
+    token_delay = 1 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+
+    if not payload.get("stream"):
+        await asyncio.sleep(token_delay * len(tokens))
+        return web.json_response({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens),
+                      "total_tokens": len(tokens)},
+        })
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+    })
+    try:
+        await response.prepare(request)
+        for token in tokens:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+            await asyncio.sleep(token_delay)
+        await response.write(b"data: [DONE]\n\n")
+    except ConnectionResetError:
+        # Client stopped reading - e.g. a cancelled hedge or early stop
+        stats["cancelled"] += 1
+    return response
+
+
+async def get_stats(request: web.Request) -> web.Response:
+    """GET /stats - request counters since start"""
+    return web.json_response(request.app["stats"])
+
+
+def create_app(settings: MockSettings) -> web.Application:
+    """Build the mock server application"""
+    app = web.Application()
+    app["settings"] = settings
+    app["stats"] = {"requests": 0, "errors": 0, "cancelled": 0}
+    app.router.add_post("/api/v1/chat/completions", chat_completions)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+async def start_mock_server(settings: MockSettings, host: str = "127.0.0.1",
+                            port: int = 8765) -> web.AppRunner:
+    """Start the mock server in the running event loop; call runner.cleanup() to stop"""
+    runner = web.AppRunner(create_app(settings))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"🧪 Mock OpenRouter listening on http://{host}:{port}/api/v1")
+    return runner
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser):
+    """Register mock behaviour options on a CLI parser"""
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal",
+                        help="Time-to-first-token distribution")
+    parser.add_argument("--latency-ms", type=float, default=500.0,
+                        help="Mean (median for lognormal) time to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5,
+                        help="Spread: lognormal sigma or uniform relative half-width")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with an error status")
+    parser.add_argument("--error-statuses", default="429,500,503",
+                        help="Comma-separated statuses to pick errors from")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0,
+                        help="Completion token throughput")
+    parser.add_argument("--completion-tokens", type=int, default=200,
+                        help="Tokens per completion (capped by max_tokens)")
+    parser.add_argument("--model-latency", default="",
+                        help="Per-model latency multipliers, e.g. openai/gpt-4o-mini=0.3")
+
+
+def settings_from_args(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_statuses.split(",") if s],
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        model_latency_scale={
+            model: float(scale)
+            for model, scale in (item.split("=") for item in args.model_latency.split(",") if item)
+        },
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Local mock of the OpenRouter chat-completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(create_app(settings_from_args(args)), host=args.host, port=args.port)
@@ -0,0 +1,202 @@
+"""
+Hedged LLM Requests - Multi-model fallback to cut tail latency
+Starts the primary model and, if it has not produced a first token within its
+percentile-based threshold, fires a hedge at the next (faster) model.
+The first attempt to stream a token wins; the others are cancelled.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import AsyncExitStack
+from typing import AsyncContextManager, AsyncIterator, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Samples kept per model for the time-to-first-token histogram
+HISTOGRAM_WINDOW = 500
+# Samples needed before the histogram replaces the configured SLO
+MIN_SAMPLES = 20
+# Hedge once the primary is slower than this share of its recent requests
+HEDGE_PERCENTILE = 90
+# Never hedge sooner than this (seconds)
+MIN_HEDGE_DELAY = 0.2
+# Attempts allowed in flight at once (primary + one hedge)
+MAX_PARALLEL_ATTEMPTS = 2
+
+
+class LatencyHistogram:
+    """Rolling window of time-to-first-token samples for one model"""
+
+    def __init__(self, window: int = HISTOGRAM_WINDOW):
+        self.samples = deque(maxlen=window)
+        # Attempts cancelled before their first token: lower bounds only, so
+        # they are kept apart and never feed the percentiles
+        self.censored = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def record_censored(self, seconds: float):
+        self.censored.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(len(ordered) * pct / 100) - 1))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+
+class HedgedModelCaller:
+    """Runs streaming completions over an ordered model chain with hedging"""
+
+    def __init__(self, models: List[Dict]):
+        """`models` is an ordered list of {"model": id, "ttft_slo": seconds}"""
+        self.models = models
+        self.histograms: Dict[str, LatencyHistogram] = {
+            spec["model"]: LatencyHistogram() for spec in models
+        }
+        self.stats = {"calls": 0, "hedges": 0, "fallbacks": 0, "wins": {}}
+
+    def hedge_delay(self, spec: Dict) -> float:
+        """Seconds to wait for a first token before hedging past this model"""
+        histogram = self.histograms[spec["model"]]
+        if len(histogram) < MIN_SAMPLES:
+            return spec["ttft_slo"]
+        observed = histogram.percentile(HEDGE_PERCENTILE)
+        return max(MIN_HEDGE_DELAY, min(observed, spec["ttft_slo"]))
+
+    async def _attempt(self, model: str, stream_fn: Callable[[str], AsyncIterator[str]],
+                       events: asyncio.Queue, budget: Optional[AsyncContextManager] = None) -> str:
+        """Stream one model; report the first token and the final text to the coordinator"""
+        task = asyncio.current_task()
+        async with AsyncExitStack() as stack:
+            if budget is not None:
+                try:
+                    await stack.enter_async_context(budget)
+                except Exception as e:
+                    # No upstream budget: drop this attempt without blaming the model
+                    events.put_nowait(("skipped", task, e))
+                    raise
+            started = time.monotonic()
+            chunks = []
+            try:
+                async for chunk in stream_fn(model):
+                    if not chunks:
+                        self.histograms[model].record(time.monotonic() - started)
+                        events.put_nowait(("first_token", task, None))
+                    chunks.append(chunk)
+            except asyncio.CancelledError:
+                if not chunks:
+                    # Censored sample: the model was at least this slow
+                    self.histograms[model].record_censored(time.monotonic() - started)
+                raise
+            except Exception as e:
+                events.put_nowait(("failed", task, e))
+                raise
+        text = "".join(chunks)
+        events.put_nowait(("done", task, text))
+        return text
+
+    async def call(self, stream_fn: Callable[[str], AsyncIterator[str]],
+                   extra_budget: Optional[Callable[[bool], AsyncContextManager]] = None) -> str:
+        """
+        Return the full completion text of the winning model.
+        `stream_fn(model)` must yield content chunks for that model.
+        `extra_budget(concurrent)` is entered around every attempt after the
+        first, so hedges and fallbacks count against the caller's rate limits.
+        Raises the last error when every model in the chain fails.
+        """
+        self.stats["calls"] += 1
+        events: asyncio.Queue = asyncio.Queue()
+        attempts: Dict[asyncio.Task, Dict] = {}
+        next_index = 0
+        winner: Optional[asyncio.Task] = None
+        last_error: Optional[BaseException] = None
+        hedge_at: Optional[float] = None
+
+        def launch() -> None:
+            nonlocal next_index, hedge_at
+            spec = self.models[next_index]
+            budget = None
+            if extra_budget is not None and next_index > 0:
+                budget = extra_budget(bool(attempts))
+            next_index += 1
+            task = asyncio.create_task(self._attempt(spec["model"], stream_fn, events, budget))
+            task.add_done_callback(_consume_exception)
+            attempts[task] = spec
+            hedge_at = time.monotonic() + self.hedge_delay(spec)
+
+        def can_launch() -> bool:
+            return next_index < len(self.models) and len(attempts) < MAX_PARALLEL_ATTEMPTS
+
+        launch()
+        try:
+            while attempts:
+                timeout = None
+                if winner is None and can_launch():
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                try:
+                    kind, task, payload = await asyncio.wait_for(events.get(), timeout)
+                except asyncio.TimeoutError:
+                    primary = next(iter(attempts.values()))["model"]
+                    logger.info(f"🪁 No first token from {primary} - hedging with "
+                                f"{self.models[next_index]['model']}")
+                    self.stats["hedges"] += 1
+                    launch()
+                    continue
+
+                if kind == "first_token" and winner is None:
+                    winner = task
+                    for other in list(attempts):
+                        if other is not task:
+                            other.cancel()
+                            attempts.pop(other)
+                elif kind == "done" and (winner is None or task is winner):
+                    model = attempts[task]["model"]
+                    self.stats["wins"][model] = self.stats["wins"].get(model, 0) + 1
+                    return payload
+                elif kind == "skipped":
+                    spec = attempts.pop(task, None)
+                    if spec:
+                        logger.info(f"⏳ Skipped {spec['model']}: {payload}")
+                elif kind == "failed":
+                    last_error = payload
+                    spec = attempts.pop(task, None)
+                    if task is winner:
+                        winner = None
+                    if spec:
+                        logger.warning(f"⚠️ Model {spec['model']} failed: {payload}")
+                    if winner is None and next_index < len(self.models):
+                        self.stats["fallbacks"] += 1
+                        launch()
+        finally:
+            for task in attempts:
+                task.cancel()
+
+        raise last_error or RuntimeError("No model produced a response")
+
+    def get_latency_stats(self) -> Dict[str, Dict]:
+        """Per-model histogram summary and current hedge thresholds"""
+        return {
+            spec["model"]: {
+                "samples": len(self.histograms[spec["model"]]),
+                "censored": len(self.histograms[spec["model"]].censored),
+                "p50": self.histograms[spec["model"]].percentile(50),
+                "p90": self.histograms[spec["model"]].percentile(90),
+                "p99": self.histograms[spec["model"]].percentile(99),
+                "hedge_delay": self.hedge_delay(spec),
+            }
+            for spec in self.models
+        }
+
+
+def _consume_exception(task: asyncio.Task):
+    """Mark failures of abandoned attempts as retrieved"""
+    if not task.cancelled():
+        task.exception()
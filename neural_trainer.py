@@ -1,35 +1,250 @@
 """
 Neural Network Training System
 Learns from user interactions and feedback
-Continuously improves response quality
+Continuously improves response quality; a background thread does the learning
+and publishes immutable model snapshots that request handlers read lock-free
+
+Usage (offline retrain/re-evaluation from the interaction log):
+    python neural_trainer.py training_log --output retrained_model --report report.json
+    python neural_trainer.py training_log --workers 8
 """
+import argparse
 import json
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import asyncio
-from collections import defaultdict
+import heapq
+import os
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from multiprocessing import Pool
+
+from interaction_log import ARCHIVE_DIR, InteractionLog, TRAINING_LOG_DIR, read_segment
+from interaction_store import InteractionStore, RETENTION_MAX_RECORDS, coerce_rating
+from question_classifier import (
+    MIN_TRAINING_SAMPLES, QuestionClassifier, QUESTION_TYPES, coerce_category, question_features
+)
 
 logger = logging.getLogger(__name__)
 
+HIGH_RATING = 4          # interactions rated at least this teach response patterns
+TOP_KEYWORDS = 10
+KEYWORD_SKETCH_SIZE = 100   # counters per question type; top-10 stays exact for skewed streams
+RATING_EWMA_ALPHA = 0.05 # weight of the newest rating in the recent mean
+LEGACY_TRAINING_FILE = "training_data.json"   # pre-log single-file format, imported once
+CLASSIFIER_FILE = "question_classifier.npz"   # saved next to the interaction log
+CLASSIFIER_RETRAIN_EVERY = 200                # new high-rated interactions between retrains
+PUBLISH_INTERVAL = 5.0   # seconds between background snapshot publishes
+PUBLISH_EVERY = 100      # ...or after this many queued interactions
+FLUSH_TIMEOUT = 30.0     # seconds to wait for the background trainer to catch up
+AUTOSAVE_INTERVAL = 60.0 # seconds before unsaved interactions are checkpointed
+AUTOSAVE_EVERY = 200     # ...or as soon as this many are unsaved
+BATCH_MAX_CLASSIFIER_SAMPLES = 200000   # newest high-rated questions kept for offline training
+HOLDOUT_EVERY = 10       # every Nth offline sample is held out for evaluation
+TRIM_SLACK = 1.5         # responses longer than recommended_length * this are trimmed
+LIST_MARKERS = [':', '●', '•', '-']
+EXAMPLES_FOOTER = "\n\n💡 *Example: This is a sample response format.*"
+
+
+class RunningStats:
+    """Count, mean and variance (Welford) plus an exponentially decayed mean, O(1) per update"""
+    
+    __slots__ = ("count", "mean", "m2", "recent_mean")
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.recent_mean = None
+    
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.recent_mean is None:
+            self.recent_mean = float(value)
+        else:
+            self.recent_mean += RATING_EWMA_ALPHA * (value - self.recent_mean)
+    
+    @property
+    def variance(self) -> float:
+        """Sample variance"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    def merge(self, other: "RunningStats", decay: float, weighted: float):
+        """Fold in `other`, whose values came after ours (Chan et al. for the variance)
+
+        The recent mean cannot be recombined from other.recent_mean alone:
+        `decay` and `weighted` describe other's values as an EWMA step applied
+        to a prior mean, new = decay * prior + weighted.
+        """
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2, self.recent_mean = other.state()
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.recent_mean = decay * self.recent_mean + weighted
+    
+    def state(self) -> List:
+        return [self.count, self.mean, self.m2, self.recent_mean]
+    
+    @classmethod
+    def from_state(cls, state: List) -> "RunningStats":
+        stats = cls()
+        stats.count, stats.mean, stats.m2, stats.recent_mean = state
+        return stats
+    
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 4),
+            "variance": round(self.variance, 4),
+            "stddev": round(self.variance ** 0.5, 4),
+            "recent_mean": round(self.recent_mean, 4) if self.recent_mean is not None else None,
+        }
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters: at most `capacity` counters, each count overestimates by <= its error"""
+    
+    __slots__ = ("capacity", "counts", "errors", "_heap")
+    
+    def __init__(self, capacity: int = KEYWORD_SKETCH_SIZE):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # Min-heap of (count, item); entries go stale on increment and are skipped lazily
+        self._heap: List[Tuple[int, str]] = []
+    
+    def add(self, item: str):
+        count = self.counts.get(item)
+        if count is not None:
+            self.counts[item] = count + 1
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = 1
+            self.errors[item] = 0
+        else:
+            # Replace the smallest counter; the newcomer inherits its count as error
+            smallest, victim = self._pop_min()
+            del self.counts[victim], self.errors[victim]
+            self.counts[item] = smallest + 1
+            self.errors[item] = smallest
+        heapq.heappush(self._heap, (self.counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, i) for i, c in self.counts.items()]
+            heapq.heapify(self._heap)
+    
+    def _pop_min(self) -> Tuple[int, str]:
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return count, item
+    
+    def merge(self, other: "SpaceSaving"):
+        """Union of two sketches: add counts and errors, keep the `capacity` largest
+
+        An item missing from a full sketch may still have occurred up to that
+        sketch's smallest count, so it is charged that much as count and error.
+        """
+        floor_self, floor_other = self._floor(), other._floor()
+        for item in self.counts.keys() | other.counts.keys():
+            count = self.counts.get(item, floor_self) + other.counts.get(item, floor_other)
+            error = self.errors.get(item, floor_self) + other.errors.get(item, floor_other)
+            self.counts[item], self.errors[item] = count, error
+        if len(self.counts) > self.capacity:
+            self.counts = dict(self.top(self.capacity))
+            self.errors = {item: self.errors[item] for item in self.counts}
+        self._heap = [(c, i) for i, c in self.counts.items()]
+        heapq.heapify(self._heap)
+    
+    def _floor(self) -> int:
+        """Upper bound on the count of an untracked item"""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+    
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        return heapq.nlargest(k, self.counts.items(), key=lambda x: x[1])
+    
+    def state(self) -> Dict:
+        return {"capacity": self.capacity, "counts": self.counts, "errors": self.errors}
+    
+    @classmethod
+    def from_state(cls, state: Dict) -> "SpaceSaving":
+        # Snapshots written before the sketch stored a plain word -> count dict
+        if "counts" not in state:
+            state = {"counts": dict(heapq.nlargest(KEYWORD_SKETCH_SIZE, state.items(), key=lambda x: x[1]))}
+        sketch = cls(state.get("capacity", KEYWORD_SKETCH_SIZE))
+        sketch.counts = dict(state["counts"])
+        sketch.errors = dict(state.get("errors") or {item: 0 for item in sketch.counts})
+        sketch._heap = [(c, i) for i, c in sketch.counts.items()]
+        heapq.heapify(sketch._heap)
+        return sketch
+
+
+def training_label(interaction: Dict) -> Optional[str]:
+    """Classifier label of an interaction: its explicitly supplied category, if that is a question type
+
+    The recorded question_type is the classifier's own prediction, so it is
+    never used as a label.
+    """
+    category = interaction.get("category")
+    return category if category in QUESTION_TYPES else None
+
+
+class ModelSnapshot:
+    """What the request path needs from the trainer; replaced whole, never mutated"""
+    
+    __slots__ = ("patterns", "classifier", "metrics")
+    
+    def __init__(self, patterns: Dict[str, Dict], classifier: QuestionClassifier, metrics: Dict):
+        self.patterns = patterns
+        self.classifier = classifier
+        self.metrics = metrics
+
+
 class NeuralNetworkTrainer:
     """Trains and optimizes the neural network based on interactions"""
     
-    def __init__(self):
-        self.user_interactions = []
-        self.question_patterns = defaultdict(list)
-        self.response_ratings = defaultdict(list)
+    def __init__(self, max_interactions: Optional[int] = RETENTION_MAX_RECORDS,
+                 max_age_days: Optional[float] = None):
+        # Columnar, deduplicated and retention-bounded; aggregates keep the full history
+        self.user_interactions = InteractionStore(max_interactions, max_age_days)
+        self.rating_stats = defaultdict(RunningStats)   # per question type
+        self.global_rating_stats = RunningStats()
         self.learned_answers = {}
+        self.type_counts = defaultdict(int)
+        # Interactions not yet appended to the on-disk log
+        self.unflushed: List[Dict] = []
+        self.dirty = 0   # changes since the last save
+        self.interaction_log: Optional[InteractionLog] = None
+        # Running aggregates of high-rated interactions per question type
+        self.pattern_stats: Dict[str, Dict] = {}
+        # Keyword rules until enough high-rated questions have been seen
+        self.classifier = QuestionClassifier()
+        self.classifier_pending = 0    # high-rated interactions since the last retrain
+        self.classifier_dirty = False  # retrained since the last save
         self.improvement_metrics = {
             "total_interactions": 0,
             "avg_response_quality": 0.0,
             "learned_answers_count": 0,
             "user_satisfaction": 0.0
         }
+        # Republish after every record unless a BackgroundTrainer batches publishes
+        self.autopublish = True
+        self.snapshot = ModelSnapshot({}, self.classifier, self.get_improvement_metrics())
     
     def record_interaction(self, user_id: int, question: str, response: str, 
-                          rating: Optional[int] = None, category: str = "general"):
-        """Record user interaction for learning"""
+                          rating: Optional[int] = None, category: Optional[str] = None):
+        """Record user interaction for learning; `category` is a known question type, if any"""
+        rating = coerce_rating(rating)
         interaction = {
             "timestamp": datetime.now().isoformat(),
             "user_id": user_id,
@@ -37,104 +252,154 @@ class NeuralNetworkTrainer:
             "response": response,
             "rating": rating,  # 1-5 stars
             "category": category,
+            "question_type": self._classify_question(question),
         }
         
-        self.user_interactions.append(interaction)
+        self._apply(interaction)
+        self.unflushed.append(interaction)
+        self.dirty += 1
+        if self.classifier_pending >= CLASSIFIER_RETRAIN_EVERY:
+            self.train_classifier()
+        if self.autopublish:
+            self.publish_snapshot()
         
+        logger.info(f"📊 Recorded interaction: {question[:50]}... (rating: {rating})")
+        return True
+    
+    def _apply(self, interaction: Dict):
+        """Fold one interaction into memory and the running aggregates"""
+        self.user_interactions.append(interaction)
+        self._aggregate(interaction)
+    
+    def _aggregate(self, interaction: Dict):
         # Analyze question pattern
-        question_type = self._classify_question(question)
-        self.question_patterns[question_type].append({
-            "question": question,
-            "rating": rating or 0,
-            "response": response
-        })
+        question_type = interaction["question_type"]
+        rating = interaction["rating"]
+        self.type_counts[question_type] += 1
+        if (rating or 0) >= HIGH_RATING:
+            self._update_pattern_stats(question_type, interaction["question"],
+                                       interaction["response"], rating)
+            if training_label(interaction):
+                self.classifier_pending += 1
         
         # Update metrics
         self.improvement_metrics["total_interactions"] += 1
         if rating:
-            self.response_ratings[question_type].append(rating)
-            avg = sum(self.response_ratings[question_type]) / len(self.response_ratings[question_type])
-            self.improvement_metrics["avg_response_quality"] = avg
-        
-        logger.info(f"📊 Recorded interaction: {question[:50]}... (rating: {rating})")
-        return True
+            self._update_rating_stats(question_type, rating)
     
     def _classify_question(self, question: str) -> str:
         """Classify question type"""
-        q_lower = question.lower()
-        
-        if any(kw in q_lower for kw in ['who', 'who is', 'кто', 'кто такой']):
-            return "author_info"
-        elif any(kw in q_lower for kw in ['what', 'what is', 'что', 'что такое']):
-            return "definition"
-        elif any(kw in q_lower for kw in ['compare', 'vs', 'difference', 'сравн', 'отличие']):
-            return "comparison"
-        elif any(kw in q_lower for kw in ['analyze', 'анализ', 'explain', 'объясн']):
-            return "analysis"
-        elif any(kw in q_lower for kw in ['quote', 'цитата', 'said', 'сказал']):
-            return "quotes"
-        else:
-            return "general"
+        return self.classifier.predict(question)
+    
+    def train_classifier(self) -> Dict:
+        """Retrain the question classifier on high-rated, explicitly labelled interactions in memory"""
+        questions, labels = [], []
+        store = self.user_interactions
+        for index, rating in enumerate(store.ratings):
+            if rating >= HIGH_RATING:
+                interaction = store.get(index)
+                label = training_label(interaction)
+                if label:
+                    questions.append(interaction["question"])
+                    labels.append(label)
+        self.classifier_pending = 0
+        classifier = QuestionClassifier()
+        result = classifier.fit(questions, labels)
+        if result["samples"] < MIN_TRAINING_SAMPLES:
+            # Too few labels: keep the current model (or the keyword rules)
+            return result
+        self.classifier = classifier
+        self.classifier_dirty = True
+        self.dirty += 1
+        return result
+    
+    def _update_pattern_stats(self, question_type: str, question: str, response: str, rating: int):
+        """Fold one high-rated interaction into its question type's aggregates"""
+        stats = self.pattern_stats.get(question_type)
+        if stats is None:
+            stats = self.pattern_stats[question_type] = {
+                "count": 0,
+                "rating_sum": 0,
+                "length_sum": 0,
+                "formatted": 0,
+                "with_examples": 0,
+                "keywords": SpaceSaving(),
+            }
+        stats["count"] += 1
+        stats["rating_sum"] += rating
+        stats["length_sum"] += len(response)
+        stats["formatted"] += '**' in response or '✅' in response
+        stats["with_examples"] += 'example' in response.lower()
+        for word in question.lower().split():
+            if len(word) > 4:  # Filter short words
+                stats["keywords"].add(word)
+        self.improvement_metrics["learned_answers_count"] = len(self.pattern_stats)
+    
+    def _update_rating_stats(self, question_type: str, rating: int):
+        self.rating_stats[question_type].update(rating)
+        self.global_rating_stats.update(rating)
+        self.improvement_metrics["avg_response_quality"] = self.global_rating_stats.mean
+    
+    def _pattern(self, question_type: str) -> Optional[Dict]:
+        """Learned pattern for one question type, read from its aggregates"""
+        stats = self.pattern_stats.get(question_type)
+        if not stats:
+            return None
+        count = stats["count"]
+        avg_length = stats["length_sum"] / count
+        return {
+            "count": count,
+            "avg_rating": stats["rating_sum"] / count,
+            "response_style": {
+                "avg_response_length": int(avg_length),
+                "uses_formatting": stats["formatted"] / count > 0.5,
+                "uses_examples": stats["with_examples"] / count > 0.5,
+                "style": "detailed" if avg_length > 300 else "concise"
+            },
+        }
+    
+    def _top_keywords(self, question_type: str) -> List[Tuple[str, int]]:
+        """Most common keywords in high-rated questions of a type"""
+        return self.pattern_stats[question_type]["keywords"].top(TOP_KEYWORDS)
     
     def learn_effective_patterns(self) -> Dict[str, Dict]:
         """Learn effective response patterns from high-rated interactions"""
         effective_patterns = {}
         
-        for question_type, interactions in self.question_patterns.items():
-            high_rated = [i for i in interactions if i.get('rating', 0) >= 4]
-            
-            if high_rated:
-                effective_patterns[question_type] = {
-                    "count": len(high_rated),
-                    "avg_rating": sum(i['rating'] for i in high_rated) / len(high_rated),
-                    "common_keywords": self._extract_keywords(high_rated),
-                    "response_style": self._analyze_response_style(high_rated),
-                }
-                
-                logger.info(f"📈 Learned pattern for {question_type}: {effective_patterns[question_type]}")
+        for question_type in self.pattern_stats:
+            effective_patterns[question_type] = {
+                **self._pattern(question_type),
+                "common_keywords": self._top_keywords(question_type),
+            }
+            logger.info(f"📈 Learned pattern for {question_type}: {effective_patterns[question_type]}")
         
         self.improvement_metrics["learned_answers_count"] = len(effective_patterns)
         return effective_patterns
     
-    def _extract_keywords(self, interactions: List[Dict]) -> List[str]:
-        """Extract common keywords from high-rated interactions"""
-        keywords = defaultdict(int)
-        
-        for interaction in interactions:
-            words = interaction['question'].lower().split()
-            for word in words:
-                if len(word) > 4:  # Filter short words
-                    keywords[word] += 1
-        
-        # Return top 10 keywords
-        return sorted(keywords.items(), key=lambda x: x[1], reverse=True)[:10]
-    
-    def _analyze_response_style(self, interactions: List[Dict]) -> Dict:
-        """Analyze response style of high-rated answers"""
-        avg_length = sum(len(i['response']) for i in interactions) / len(interactions)
-        has_formatting = sum(1 for i in interactions if '**' in i['response'] or '✅' in i['response'])
-        has_examples = sum(1 for i in interactions if 'example' in i['response'].lower())
-        
-        return {
-            "avg_response_length": int(avg_length),
-            "uses_formatting": has_formatting / len(interactions) > 0.5,
-            "uses_examples": has_examples / len(interactions) > 0.5,
-            "style": "detailed" if avg_length > 300 else "concise"
-        }
+    def publish_snapshot(self) -> ModelSnapshot:
+        """Swap in a fresh snapshot; readers holding the old one are unaffected"""
+        self.snapshot = ModelSnapshot(
+            {qt: self._pattern(qt) for qt in self.pattern_stats},
+            self.classifier,
+            self.get_improvement_metrics(),
+        )
+        return self.snapshot
     
     def get_trained_response_template(self, question_type: str) -> Dict:
         """Get trained template for specific question type"""
-        patterns = self.learn_effective_patterns()
+        pattern = self._pattern(question_type)
         
-        if question_type in patterns:
-            return patterns[question_type]
+        if pattern:
+            return {**pattern, "common_keywords": self._top_keywords(question_type)}
         
         return None
     
     def predict_optimal_response_format(self, question: str) -> Dict:
         """Predict optimal response format for a question"""
-        question_type = self._classify_question(question)
-        pattern = self.get_trained_response_template(question_type)
+        # One attribute read: a snapshot is consistent even while training runs
+        snapshot = self.snapshot
+        question_type = snapshot.classifier.predict(question)
+        pattern = snapshot.patterns.get(question_type)
         
         if pattern:
             return {
@@ -160,39 +425,221 @@ class NeuralNetworkTrainer:
         return {
             **self.improvement_metrics,
             "interactions_recorded": len(self.user_interactions),
-            "question_types_learned": len(self.question_patterns),
+            "question_types_learned": len(self.type_counts),
+            "classifier_samples": self.classifier.trained_samples,
+            "rating_stats": {
+                "global": self.global_rating_stats.to_dict(),
+                "by_type": {qt: stats.to_dict() for qt, stats in self.rating_stats.items()},
+            },
             "timestamp": datetime.now().isoformat(),
         }
     
-    def save_training_data(self, filepath: str = "training_data.json"):
-        """Save training data for persistence"""
-        training_data = {
-            "interactions": self.user_interactions,
-            "patterns": dict(self.question_patterns),
+    def _snapshot_state(self) -> Dict:
+        """Aggregates that replace compacted log segments"""
+        return {
             "metrics": self.improvement_metrics,
+            "type_counts": dict(self.type_counts),
+            "pattern_stats": {
+                qt: {**stats, "keywords": stats["keywords"].state()}
+                for qt, stats in self.pattern_stats.items()
+            },
+            "rating_stats": {
+                "global": self.global_rating_stats.state(),
+                "by_type": {qt: stats.state() for qt, stats in self.rating_stats.items()},
+            },
             "timestamp": datetime.now().isoformat(),
         }
+    
+    def _restore_state(self, state: Dict):
+        self.improvement_metrics.update(state.get("metrics", {}))
+        self.type_counts = defaultdict(int, state.get("type_counts", {}))
+        self.pattern_stats = {
+            qt: {**stats, "keywords": SpaceSaving.from_state(stats["keywords"])}
+            for qt, stats in state.get("pattern_stats", {}).items()
+        }
+        rating_stats = state.get("rating_stats")
+        if rating_stats:
+            self.global_rating_stats = RunningStats.from_state(rating_stats["global"])
+            self.rating_stats = defaultdict(RunningStats, {
+                qt: RunningStats.from_state(s) for qt, s in rating_stats["by_type"].items()
+            })
+    
+    def _merge_partial(self, partial: Dict):
+        """Fold a worker's aggregate_segment result in; partials must arrive in log order"""
+        for qt, count in partial["type_counts"].items():
+            self.type_counts[qt] += count
+        for qt, stats in partial["pattern_stats"].items():
+            mine = self.pattern_stats.get(qt)
+            if mine is None:
+                self.pattern_stats[qt] = stats
+                continue
+            for field in ("count", "rating_sum", "length_sum", "formatted", "with_examples"):
+                mine[field] += stats[field]
+            mine["keywords"].merge(stats["keywords"])
+        for qt, stats in partial["rating_stats"].items():
+            self.rating_stats[qt].merge(stats, *partial["ewma"][qt])
+        self.global_rating_stats.merge(partial["global_rating_stats"], *partial["global_ewma"])
         
+        self.improvement_metrics["total_interactions"] += partial["records"]
+        self.improvement_metrics["learned_answers_count"] = len(self.pattern_stats)
+        self.improvement_metrics["avg_response_quality"] = self.global_rating_stats.mean
+    
+    def _log(self, log_dir: str) -> InteractionLog:
+        if self.interaction_log is None or self.interaction_log.log_dir != log_dir:
+            # Archive compacted segments so the offline retrain can still replay them
+            self.interaction_log = InteractionLog(log_dir, archive_compacted=True)
+        return self.interaction_log
+    
+    def save_training_data(self, log_dir: str = TRAINING_LOG_DIR):
+        """Append interactions recorded since the last save; compact when segments pile up"""
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(training_data, f, ensure_ascii=False, indent=2)
-            logger.info(f"✅ Training data saved to {filepath}")
+            log = self._log(log_dir)
+            pending = len(self.unflushed)
+            log.append(self.unflushed)
+            self.unflushed = []
+            self.dirty = 0
+            if log.needs_compaction():
+                log.compact(self._snapshot_state())
+            if self.classifier_dirty:
+                self.classifier.save(os.path.join(log_dir, CLASSIFIER_FILE))
+                self.classifier_dirty = False
+            logger.info(f"✅ Training data saved to {log_dir} ({pending} new interactions)")
         except Exception as e:
             logger.error(f"❌ Failed to save training data: {e}")
     
-    def load_training_data(self, filepath: str = "training_data.json"):
-        """Load previous training data"""
+    def load_training_data(self, log_dir: str = TRAINING_LOG_DIR):
+        """Load the latest snapshot and replay the log tail after it"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                training_data = json.load(f)
+            log = self._log(log_dir)
+            classifier_path = os.path.join(log_dir, CLASSIFIER_FILE)
+            if os.path.exists(classifier_path):
+                self.classifier = QuestionClassifier.load(classifier_path)
+            snapshot = log.load_snapshot()
+            if snapshot:
+                self._restore_state(snapshot["state"])
+            replayed = 0
+            for interaction in log.iter_tail():
+                self._apply(interaction)
+                replayed += 1
             
-            self.user_interactions = training_data.get("interactions", [])
-            self.question_patterns = defaultdict(list, training_data.get("patterns", {}))
-            self.improvement_metrics = training_data.get("metrics", {})
+            if not snapshot and not replayed and os.path.exists(LEGACY_TRAINING_FILE):
+                self._import_legacy(LEGACY_TRAINING_FILE)
+            self.publish_snapshot()
             
-            logger.info(f"✅ Training data loaded from {filepath}")
+            logger.info(f"✅ Training data loaded from {log_dir} (snapshot + {replayed} logged interactions)")
         except Exception as e:
             logger.warning(f"⚠️ Could not load training data: {e}")
+    
+    def _import_legacy(self, filepath: str):
+        """Replay interactions from the old single-file format; the next save logs them"""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            training_data = json.load(f)
+        for interaction in training_data.get("interactions", []):
+            interaction.setdefault("question_type", self._classify_question(interaction["question"]))
+            # The old format always stored the "general" default, never a real label
+            if interaction.get("category") == "general":
+                interaction["category"] = None
+            self._apply(interaction)
+            self.unflushed.append(interaction)
+        self.dirty += len(self.unflushed)
+        logger.info(f"📥 Imported {len(self.unflushed)} interactions from {filepath}")
+
+
+class BackgroundTrainer:
+    """Daemon thread that owns all learning; request handlers only enqueue"""
+    
+    def __init__(self, trainer: NeuralNetworkTrainer, publish_interval: float = PUBLISH_INTERVAL,
+                 publish_every: int = PUBLISH_EVERY, autosave_interval: float = AUTOSAVE_INTERVAL,
+                 autosave_every: int = AUTOSAVE_EVERY, log_dir: str = TRAINING_LOG_DIR):
+        self.trainer = trainer
+        self.publish_interval = publish_interval
+        self.publish_every = publish_every
+        self.autosave_interval = autosave_interval
+        self.autosave_every = autosave_every
+        self.log_dir = log_dir
+        self.queue = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+    
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+    
+    def start(self):
+        with self._start_lock:
+            if not self.running:
+                self.trainer.autopublish = False
+                self.thread = threading.Thread(target=self._run, name="background-trainer", daemon=True)
+                self.thread.start()
+    
+    def submit(self, user_id: int, question: str, response: str,
+               rating: Optional[int] = None, category: Optional[str] = None):
+        """Queue an interaction; returns immediately, raising ValueError for a bad rating or category"""
+        rating = coerce_rating(rating)
+        category = coerce_category(category)
+        self.start()
+        self.queue.put(("record", (user_id, question, response, rating, category)))
+    
+    def flush(self, save: bool = False, timeout: float = FLUSH_TIMEOUT) -> bool:
+        """Wait until everything queued so far is learned and published (and saved)"""
+        if not self.running:
+            self.trainer.publish_snapshot()
+            if save:
+                self.trainer.save_training_data(self.log_dir)
+            return True
+        done = threading.Event()
+        self.queue.put(("flush", (save, done)))
+        return done.wait(timeout)
+    
+    def stop(self, timeout: float = FLUSH_TIMEOUT):
+        """Drain the queue, publish, checkpoint, and end the thread"""
+        if self.running:
+            self.queue.put(("stop", None))
+            self.thread.join(timeout)
+        self.trainer.autopublish = True
+    
+    def _run(self):
+        pending = 0
+        last_publish = last_save = time.monotonic()
+        while True:
+            wait = max(0.0, self.publish_interval - (time.monotonic() - last_publish))
+            if self.trainer.dirty:
+                wait = min(wait, max(0.0, self.autosave_interval - (time.monotonic() - last_save)))
+            try:
+                kind, payload = self.queue.get(timeout=wait)
+            except queue.Empty:
+                kind, payload = None, None
+            
+            try:
+                if kind == "record":
+                    self.trainer.record_interaction(*payload)
+                    pending += 1
+                
+                due = time.monotonic() - last_publish >= self.publish_interval
+                if pending and (due or pending >= self.publish_every or kind in ("flush", "stop")):
+                    self.trainer.publish_snapshot()
+                    pending = 0
+                if due or not pending:
+                    last_publish = time.monotonic()
+                
+                # Checkpoint on the trainer thread, never in a request
+                save_due = time.monotonic() - last_save >= self.autosave_interval
+                if (kind == "flush" and payload[0]) or kind == "stop" or (self.trainer.dirty and (
+                        save_due or self.trainer.dirty >= self.autosave_every)):
+                    if self.trainer.dirty:
+                        self.trainer.save_training_data(self.log_dir)
+                    last_save = time.monotonic()
+                elif not self.trainer.dirty:
+                    last_save = time.monotonic()
+            except Exception as e:
+                logger.error(f"❌ Background training failed: {e}")
+            finally:
+                if kind == "flush":
+                    payload[1].set()
+            
+            if kind == "stop":
+                logger.info("🛑 Background trainer stopped")
+                return
 
 
 class ResponseOptimizer:
@@ -213,28 +660,43 @@ class ResponseOptimizer:
             response = self._add_examples(response)
         
         # Adjust length if needed
-        if len(response) > format_hint["recommended_length"] * 1.5:
+        if len(response) > format_hint["recommended_length"] * TRIM_SLACK:
             response = self._trim_response(response, format_hint["recommended_length"])
         
         return response
     
+    def stream(self, question: str) -> "ResponseStream":
+        """Incremental optimize_response for one streamed answer"""
+        return ResponseStream(self.trainer.predict_optimal_response_format(question))
+    
+    async def optimize_stream(self, chunks: AsyncIterator[str], question: str) -> AsyncIterator[str]:
+        """Transform an upstream chunk stream; stops reading it once the answer is long enough"""
+        stream = self.stream(question)
+        try:
+            async for chunk in chunks:
+                # One (possibly empty) chunk out per chunk in, so consumers
+                # still see time-to-first-token while a line is buffered
+                yield stream.feed(chunk)
+                if stream.done:
+                    break
+        finally:
+            # Closing the upstream generator closes its HTTP response: no more tokens are generated
+            aclose = getattr(chunks, "aclose", None)
+            if aclose:
+                await aclose()
+        tail = stream.close()
+        if tail:
+            yield tail
+    
     def _add_formatting(self, response: str) -> str:
         """Add formatting to response"""
         # Add emojis and bold text
         lines = response.split('\n')
-        formatted_lines = []
-        
-        for line in lines:
-            if len(line.strip()) > 0:
-                if any(marker in line for marker in [':', '●', '•', '-']):
-                    line = f"• {line.strip()}"
-                formatted_lines.append(line)
-        
-        return '\n'.join(formatted_lines)
+        return '\n'.join(_format_line(line) for line in lines if line.strip())
     
     def _add_examples(self, response: str) -> str:
         """Add examples to response"""
-        return response + "\n\n💡 *Example: This is a sample response format.*"
+        return response + EXAMPLES_FOOTER
     
     def _trim_response(self, response: str, max_length: int) -> str:
         """Trim response to recommended length"""
@@ -245,19 +707,219 @@ class ResponseOptimizer:
         return trimmed
 
 
+def _format_line(line: str) -> str:
+    if any(marker in line for marker in LIST_MARKERS):
+        return f"• {line.strip()}"
+    return line
+
+
+class ResponseStream:
+    """optimize_response over chunks: feed() returns the transformed text that is final so far
+
+    Lines are formatted as they complete. Formatting stops at the first line
+    containing "**" (the whole-string version skips it entirely in that case).
+    Output only runs ahead to the last word boundary within recommended_length;
+    once the text passes recommended_length * TRIM_SLACK it is trimmed exactly
+    like _trim_response and `done` is set so the caller stops reading upstream.
+    """
+    
+    def __init__(self, format_hint: Dict):
+        self.recommended = format_hint["recommended_length"]
+        self.limit = self.recommended * TRIM_SLACK
+        self.use_examples = format_hint["use_examples"]
+        self.raw = not format_hint["use_formatting"]
+        self.partial = ""       # current incomplete line
+        self.lines = 0          # lines written, for the '\n' joins
+        self.has_example = False
+        self.pending = ""       # transformed text not yet returned
+        self.emitted = 0        # transformed characters returned so far
+        self.done = False
+    
+    def feed(self, chunk: str) -> str:
+        if self.done:
+            return ""
+        *complete, self.partial = (self.partial + chunk).split('\n')
+        out = "".join(self._push(self._line(line)) for line in complete)
+        # A single long line can cross the trim threshold on its own: the
+        # answer will be trimmed either way, so cut it here instead of
+        # waiting for its newline (the "• " prefix is judged on what arrived)
+        if not self.done and self.emitted + len(self.pending) + len(self.partial.strip()) > self.limit:
+            out += self._push(self._line(self.partial))
+            self.partial = ""
+        return out
+    
+    def close(self) -> str:
+        """Final line, examples footer and any held-back text"""
+        if self.done:
+            return ""
+        out = self._push(self._line(self.partial))
+        self.partial = ""
+        if self.use_examples and not self.has_example:
+            out += self._push(EXAMPLES_FOOTER)
+        if not self.done:
+            out += self.pending
+            self.emitted += len(self.pending)
+            self.pending = ""
+        self.done = True
+        return out
+    
+    def _line(self, line: str) -> str:
+        if not self.raw and "**" in line:
+            self.raw = True
+        if not self.raw:
+            if not line.strip():
+                return ""
+            line = _format_line(line)
+        self.has_example = self.has_example or "example" in line.lower()
+        separator = "\n" if self.lines else ""
+        self.lines += 1
+        return separator + line
+    
+    def _push(self, text: str) -> str:
+        if self.done or not text:
+            return ""
+        self.pending += text
+        total = self.emitted + len(self.pending)
+        if total <= self.recommended:
+            # Everything before the last space survives any later trim
+            safe = self.pending.rfind(' ')
+        else:
+            window = self.pending[:self.recommended - self.emitted]
+            safe = window.rfind(' ')
+            if safe < 0 and not self.emitted:
+                safe = len(window)
+        if total > self.limit:
+            self.done = True
+            out = self.pending[:max(safe, 0)] + "..."
+            self.emitted += len(out)
+            self.pending = ""
+            return out
+        if safe <= 0:
+            return ""
+        out = self.pending[:safe]
+        self.pending = self.pending[safe:]
+        self.emitted += safe
+        return out
+
+
+def _ewma_step(ewma: List[float], rating: int):
+    ewma[0] *= 1 - RATING_EWMA_ALPHA
+    ewma[1] += RATING_EWMA_ALPHA * (rating - ewma[1])
+
+
+def aggregate_segment(path: str) -> Dict:
+    """Pool task: partial aggregates and classifier features of one log segment"""
+    trainer = NeuralNetworkTrainer()
+    ewma = defaultdict(lambda: [1.0, 0.0])
+    global_ewma = [1.0, 0.0]
+    samples = []
+    records = 0
+    for interaction in read_segment(path):
+        interaction.setdefault("question_type", trainer._classify_question(interaction["question"]))
+        trainer._aggregate(interaction)
+        records += 1
+        rating = interaction.get("rating")
+        if rating:
+            _ewma_step(ewma[interaction["question_type"]], rating)
+            _ewma_step(global_ewma, rating)
+        label = training_label(interaction)
+        if label and (rating or 0) >= HIGH_RATING:
+            samples.append((question_features(interaction["question"]), label))
+    return {
+        "records": records,
+        "type_counts": dict(trainer.type_counts),
+        "pattern_stats": trainer.pattern_stats,
+        "rating_stats": dict(trainer.rating_stats),
+        "global_rating_stats": trainer.global_rating_stats,
+        "ewma": dict(ewma),
+        "global_ewma": global_ewma,
+        "samples": samples,
+    }
+
+
+def retrain_from_logs(log_dir: str = TRAINING_LOG_DIR, output_dir: Optional[str] = None,
+                      workers: Optional[int] = None, include_archive: bool = True) -> Dict:
+    """Rebuild the trainer from logged interactions; writes a loadable log dir when output_dir is set"""
+    started = time.monotonic()
+    log = InteractionLog(log_dir)
+    paths = log.segment_paths(include_archive)
+    if log.load_snapshot() and not (include_archive and os.path.isdir(os.path.join(log_dir, ARCHIVE_DIR))):
+        logger.warning(f"⚠️ {log_dir} has compacted history without an archive; it is not replayed")
+    
+    trainer = NeuralNetworkTrainer()
+    samples = deque(maxlen=BATCH_MAX_CLASSIFIER_SAMPLES)
+    with Pool(workers or os.cpu_count() or 1) as pool:
+        # imap keeps segment order, which the recent-mean merge depends on
+        for partial in pool.imap(aggregate_segment, paths):
+            trainer._merge_partial(partial)
+            samples.extend(partial["samples"])
+    records = trainer.improvement_metrics["total_interactions"]
+    aggregate_seconds = time.monotonic() - started
+    
+    holdout = [s for i, s in enumerate(samples) if i % HOLDOUT_EVERY == 0]
+    train = [s for i, s in enumerate(samples) if i % HOLDOUT_EVERY != 0]
+    fit = trainer.classifier.fit_features([f for f, _ in train], [label for _, label in train])
+    classifier_report = {
+        "samples": fit["samples"],
+        "train_accuracy": fit["accuracy"],
+        "holdout_samples": len(holdout),
+        "holdout_accuracy": round(trainer.classifier.accuracy([f for f, _ in holdout],
+                                                               [label for _, label in holdout]), 4),
+    }
+    
+    if output_dir:
+        if os.path.abspath(output_dir) == os.path.abspath(log_dir):
+            raise ValueError("output_dir must differ from the source log_dir")
+        output_log = InteractionLog(output_dir)
+        if output_log.segments():
+            raise ValueError(f"{output_dir} already holds log segments")
+        output_log.compact(trainer._snapshot_state())
+        trainer.classifier.save(os.path.join(output_dir, CLASSIFIER_FILE))
+    
+    seconds = time.monotonic() - started
+    report = {
+        "log_dir": log_dir,
+        "output_dir": output_dir,
+        "segments": len(paths),
+        "records": records,
+        "seconds": round(seconds, 3),
+        "records_per_second": round(records / aggregate_seconds, 1) if aggregate_seconds else 0.0,
+        "metrics": {k: v for k, v in trainer.get_improvement_metrics().items() if k != "rating_stats"},
+        "by_type": {
+            qt: {
+                "interactions": count,
+                "high_rated": trainer.pattern_stats[qt]["count"] if qt in trainer.pattern_stats else 0,
+                "rating": trainer.rating_stats[qt].to_dict() if qt in trainer.rating_stats else None,
+                "pattern": trainer.get_trained_response_template(qt),
+            }
+            for qt, count in sorted(trainer.type_counts.items())
+        },
+        "classifier": classifier_report,
+    }
+    logger.info(f"✅ Retrained from {records} logged interactions in {report['seconds']}s")
+    return report
+
+
 # Global trainer instance
 _trainer = NeuralNetworkTrainer()
 _optimizer = ResponseOptimizer(_trainer)
+_background = BackgroundTrainer(_trainer)
+
+
+def record_user_feedback(user_id: int, question: str, response: str, rating: int,
+                         category: Optional[str] = None):
+    """Record user feedback for training; `category` labels the question for the classifier"""
+    _background.submit(user_id, question, response, rating, category)
 
 
-def record_user_feedback(user_id: int, question: str, response: str, rating: int):
-    """Record user feedback for training"""
-    _trainer.record_interaction(user_id, question, response, rating)
+def classify_question(question: str) -> str:
+    """Classify a question into one of the trainer's question types"""
+    return _trainer.snapshot.classifier.predict(question)
 
 
 def get_training_metrics() -> Dict:
     """Get current training metrics"""
-    return _trainer.get_improvement_metrics()
+    return _trainer.snapshot.metrics
 
 
 def optimize_response(response: str, question: str) -> str:
@@ -265,9 +927,15 @@ def optimize_response(response: str, question: str) -> str:
     return _optimizer.optimize_response(response, question)
 
 
-def save_training_data():
-    """Save training progress"""
-    _trainer.save_training_data()
+def optimize_stream(chunks: AsyncIterator[str], question: str) -> AsyncIterator[str]:
+    """Optimize a streamed response chunk by chunk, stopping upstream early when trimmed"""
+    return _optimizer.optimize_stream(chunks, question)
+
+
+def save_training_data() -> bool:
+    """Save training progress; False if the trainer thread did not finish in time"""
+    # Saving runs on the trainer thread so it never races a record in progress
+    return _background.flush(save=True)
 
 
 def load_training_data():
@@ -275,20 +943,31 @@ def load_training_data():
     _trainer.load_training_data()
 
 
+def shutdown_training():
+    """Learn everything still queued and checkpoint it; call from shutdown hooks"""
+    _background.stop()
+    if _background.running:
+        # Still draining or saving; a second writer would race it
+        logger.warning("⚠️ Background trainer did not stop in time; skipping final checkpoint")
+    elif _trainer.dirty:
+        _trainer.save_training_data()
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Retrain and re-evaluate the trainer from interaction logs")
+    parser.add_argument("log_dir", nargs="?", default=TRAINING_LOG_DIR, help="Interaction log directory")
+    parser.add_argument("--output", help="Write a loadable snapshot and classifier to this directory")
+    parser.add_argument("--report", help="Write the report to this file instead of stdout")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPUs)")
+    parser.add_argument("--no-archive", action="store_true", help="Only replay the live log tail")
+    args = parser.parse_args()
     
-    # Example usage
-    trainer = NeuralNetworkTrainer()
-    
-    # Record some interactions
-    trainer.record_interaction(1, "Who is Pushkin?", "Pushkin was a Russian poet...", rating=5)
-    trainer.record_interaction(1, "What is romanticism?", "Romanticism is a movement...", rating=4)
-    trainer.record_interaction(1, "Compare Tolstoy and Dostoevsky", "Both are great, but...", rating=5)
-    
-    # Learn patterns
-    patterns = trainer.learn_effective_patterns()
-    print("Learned Patterns:", json.dumps(patterns, ensure_ascii=False, indent=2))
-    
-    # Get metrics
-    print("Metrics:", trainer.get_improvement_metrics())
+    report = retrain_from_logs(args.log_dir, args.output, workers=args.workers,
+                               include_archive=not args.no_archive)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(f"💾 Report written to {args.report}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
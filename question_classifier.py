@@ -0,0 +1,194 @@
+"""
+Question Classifier - Hashed n-gram logistic regression over question types
+Word unigrams/bigrams and character trigrams are hashed into a fixed feature
+space and scored by a multinomial logistic regression in NumPy; keyword rules
+answer until the model has seen enough rated questions
+"""
+import logging
+import os
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUESTION_TYPES = ["author_info", "definition", "comparison", "analysis", "quotes", "general"]
+N_FEATURES = 2 ** 16
+MIN_TRAINING_SAMPLES = 50     # below this the keyword rules answer
+MIN_CONFIDENCE = 0.5          # model answers only when this sure
+LEARNING_RATE = 0.5
+L2 = 1e-5
+EPOCHS = 5
+BATCH_SIZE = 32
+CACHE_SIZE = 4096
+
+# Most specific first: a comparison that starts with "что" is still a comparison
+KEYWORD_RULES = [
+    ("comparison", ['compare', 'vs', 'difference', 'сравн', 'отличие']),
+    ("quotes", ['quote', 'цитат', 'said', 'сказал']),
+    ("analysis", ['analyze', 'анализ', 'explain', 'объясн']),
+    ("author_info", ['who', 'кто']),
+    ("definition", ['what', 'что']),
+]
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def coerce_category(category) -> Optional[str]:
+    """A known question type, or None for no label; ValueError for anything else"""
+    if category is None or category == "":
+        return None
+    if category not in QUESTION_TYPES:
+        raise ValueError(f"Category must be one of {', '.join(QUESTION_TYPES)}, got {category!r}")
+    return category
+
+
+def keyword_classify(question: str) -> str:
+    """Rule-based question type, used for cold start and low-confidence questions"""
+    q_lower = question.lower()
+    for question_type, keywords in KEYWORD_RULES:
+        if any(kw in q_lower for kw in keywords):
+            return question_type
+    return "general"
+
+
+def question_features(question: str, n_features: int = N_FEATURES) -> np.ndarray:
+    """Sorted unique hashed feature indices of a question"""
+    words = _WORD_RE.findall(question.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    # crc32 is stable across processes, unlike hash()
+    indices = {zlib.crc32(gram.encode('utf-8')) % n_features for gram in grams}
+    return np.fromiter(sorted(indices), dtype=np.int64, count=len(indices))
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class QuestionClassifier:
+    """Multinomial logistic regression on hashed, L2-normalized binary n-grams"""
+
+    def __init__(self, n_features: int = N_FEATURES, classes: Sequence[str] = QUESTION_TYPES):
+        self.n_features = n_features
+        self.classes = list(classes)
+        self.class_index = {c: i for i, c in enumerate(self.classes)}
+        self.weights = np.zeros((n_features, len(self.classes)), dtype=np.float32)
+        self.bias = np.zeros(len(self.classes), dtype=np.float32)
+        self.trained_samples = 0
+        self._cache: Dict[str, str] = {}
+
+    @property
+    def is_trained(self) -> bool:
+        return self.trained_samples >= MIN_TRAINING_SAMPLES
+
+    def _scores(self, batch: List[np.ndarray]) -> np.ndarray:
+        """Row-wise sum of weight rows per question, scaled by 1/sqrt(len)"""
+        lengths = np.array([len(f) for f in batch])
+        if not lengths.sum():
+            return np.tile(self.bias, (len(batch), 1))
+        flat = np.concatenate(batch)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        sums = np.zeros((len(batch), len(self.classes)), dtype=np.float32)
+        nonempty = lengths > 0
+        sums[nonempty] = np.add.reduceat(self.weights[flat], starts[nonempty], axis=0)
+        scale = 1 / np.sqrt(np.maximum(lengths, 1))
+        return sums * scale[:, None] + self.bias
+
+    def predict_proba_batch(self, questions: Sequence[str]) -> np.ndarray:
+        return _softmax(self._scores([question_features(q, self.n_features) for q in questions]))
+
+    def predict_batch(self, questions: Sequence[str]) -> List[str]:
+        """Question types for many questions in one vectorized pass"""
+        if not self.is_trained:
+            return [keyword_classify(q) for q in questions]
+        probabilities = self.predict_proba_batch(questions)
+        best = probabilities.argmax(axis=1)
+        return [
+            self.classes[b] if probabilities[i, b] >= MIN_CONFIDENCE else keyword_classify(q)
+            for i, (q, b) in enumerate(zip(questions, best))
+        ]
+
+    def predict(self, question: str) -> str:
+        """Question type of one question, memoized until the model changes"""
+        cached = self._cache.get(question)
+        if cached is None:
+            cached = self.predict_batch([question])[0]
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.clear()
+            self._cache[question] = cached
+        return cached
+
+    def fit(self, questions: Sequence[str], labels: Sequence[str], epochs: int = EPOCHS,
+            learning_rate: float = LEARNING_RATE, seed: int = 0) -> Dict:
+        """Mini-batch SGD on softmax cross-entropy; returns training accuracy"""
+        features = [question_features(q, self.n_features) for q in questions]
+        return self.fit_features(features, labels, epochs, learning_rate, seed)
+
+    def fit_features(self, features: Sequence[np.ndarray], labels: Sequence[str], epochs: int = EPOCHS,
+                     learning_rate: float = LEARNING_RATE, seed: int = 0) -> Dict:
+        """fit() on precomputed question_features, e.g. extracted in worker processes"""
+        samples = [(f, self.class_index[label])
+                   for f, label in zip(features, labels) if label in self.class_index]
+        if not samples:
+            return {"samples": 0, "accuracy": 0.0}
+        rng = np.random.default_rng(seed)
+        for _ in range(epochs):
+            order = rng.permutation(len(samples))
+            for start in range(0, len(order), BATCH_SIZE):
+                batch = [samples[i] for i in order[start:start + BATCH_SIZE]]
+                self._sgd_step([f for f, _ in batch], np.array([y for _, y in batch]), learning_rate)
+
+        features = [f for f, _ in samples]
+        targets = np.array([y for _, y in samples])
+        accuracy = float((self._scores(features).argmax(axis=1) == targets).mean())
+        self.trained_samples = len(samples)
+        self._cache.clear()
+        logger.info(f"🧠 Question classifier trained on {len(samples)} questions (accuracy {accuracy:.2f})")
+        return {"samples": len(samples), "accuracy": round(accuracy, 4)}
+
+    def accuracy(self, features: Sequence[np.ndarray], labels: Sequence[str]) -> float:
+        """Share of known-label questions the model (without keyword fallback) gets right"""
+        pairs = [(f, self.class_index[label]) for f, label in zip(features, labels) if label in self.class_index]
+        if not pairs:
+            return 0.0
+        predicted = self._scores([f for f, _ in pairs]).argmax(axis=1)
+        return float((predicted == np.array([y for _, y in pairs])).mean())
+
+    def _sgd_step(self, batch: List[np.ndarray], targets: np.ndarray, learning_rate: float):
+        gradient = _softmax(self._scores(batch))
+        gradient[np.arange(len(batch)), targets] -= 1
+        gradient /= len(batch)
+        lengths = np.array([len(f) for f in batch])
+        rows = np.concatenate(batch)
+        # Each feature row gets its question's gradient scaled by that question's feature value
+        row_gradient = np.repeat(gradient / np.sqrt(np.maximum(lengths, 1))[:, None], lengths, axis=0)
+        np.add.at(self.weights, rows, -learning_rate * (row_gradient + L2 * self.weights[rows]))
+        self.bias -= learning_rate * gradient.sum(axis=0)
+
+    def save(self, path: str):
+        """Write the model atomically: temp file, fsync, rename"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f, weights=self.weights, bias=self.bias, classes=np.array(self.classes),
+                trained_samples=np.array(self.trained_samples),
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "QuestionClassifier":
+        data = np.load(path)
+        classifier = cls(n_features=data["weights"].shape[0], classes=data["classes"].tolist())
+        classifier.weights = data["weights"]
+        classifier.bias = data["bias"]
+        classifier.trained_samples = int(data["trained_samples"])
+        return classifier
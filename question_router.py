@@ -0,0 +1,117 @@
+"""
+Question Router - Local-first routing between the knowledge base and the LLM
+Scores how confidently the local KB resolves a question and answers
+factual questions locally, escalating open-ended ones to the LLM
+"""
+import logging
+import re
+import time
+from typing import Dict
+
+import literature_knowledge
+from literature_knowledge import WEAK_ALIASES, match_writer, match_work, match_movement
+from neural_trainer import classify_question
+
+logger = logging.getLogger(__name__)
+
+# Minimum confidence for answering from the local knowledge base
+LOCAL_CONFIDENCE_THRESHOLD = 0.7
+
+# Question types the KB can answer completely on its own
+FACTUAL_TYPES = {"author_info", "definition", "general"}
+
+# Question types that always need the LLM
+ESCALATE_TYPES = {"comparison", "analysis", "quotes"}
+
+# Open-ended phrasing the keyword classifier does not catch
+OPEN_ENDED_MARKERS = (
+    'почему', 'зачем', 'как ', 'в чём', 'в чем', 'смысл', 'мнение', 'думаешь',
+    'сравн', 'анализ', 'объясн', 'цитат', 'why', 'how ', 'meaning', 'opinion',
+    'think', 'compare', 'analy', 'explain', 'difference', 'quote',
+)
+
+# Match strengths per alias kind
+STRONG_MATCH = 1.0
+WEAK_MATCH = 0.5
+
+# Questions longer than this are usually open-ended
+LONG_QUESTION_WORDS = 12
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _match_strength(alias: str) -> float:
+    return WEAK_MATCH if alias in WEAK_ALIASES else STRONG_MATCH
+
+
+def _count_writers(q_lower: str) -> int:
+    """Number of distinct writers strongly mentioned in the question"""
+    return len({
+        # Read through the module: registrations swap in a new alias dict
+        key for alias, key in literature_knowledge.WRITER_ALIASES.items()
+        if alias not in WEAK_ALIASES and alias in q_lower
+    })
+
+
+def score_question(question: str) -> Dict:
+    """Score how confidently the local knowledge base resolves a question"""
+    q_lower = question.lower()
+    question_type = classify_question(question)
+    
+    matches = {}
+    for kind, matcher in (("writer", match_writer), ("work", match_work),
+                          ("movement", match_movement)):
+        entry, alias = matcher(question)
+        if entry:
+            matches[kind] = alias
+    
+    confidence = max((_match_strength(alias) for alias in matches.values()), default=0.0)
+    
+    open_ended = (
+        question_type in ESCALATE_TYPES
+        or any(marker in q_lower for marker in OPEN_ENDED_MARKERS)
+        or _count_writers(q_lower) > 1
+    )
+    
+    if len(_WORD_RE.findall(q_lower)) > LONG_QUESTION_WORDS:
+        confidence *= 0.8
+    if question_type not in FACTUAL_TYPES:
+        confidence *= 0.5
+    
+    return {
+        "question_type": question_type,
+        "matches": matches,
+        "confidence": round(confidence, 3),
+        "open_ended": open_ended,
+    }
+
+
+def route_question(question: str, threshold: float = LOCAL_CONFIDENCE_THRESHOLD) -> Dict:
+    """Decide whether a question is answered locally ("local") or by the LLM ("llm")"""
+    started = time.perf_counter()
+    score = score_question(question)
+    
+    if score["open_ended"]:
+        route, reason = "llm", "open_ended"
+    elif score["confidence"] >= threshold:
+        route, reason = "local", "kb_confident"
+    else:
+        route, reason = "llm", "low_confidence"
+    
+    decision = {
+        **score,
+        "route": route,
+        "reason": reason,
+        "decision_us": round((time.perf_counter() - started) * 1_000_000, 1),
+    }
+    return decision
+
+
+def log_routing(decision: Dict, answer_ms: float):
+    """Log a routing decision with its latency for threshold tuning"""
+    logger.info(
+        f"🧭 route={decision['route']} reason={decision['reason']} "
+        f"confidence={decision['confidence']} type={decision['question_type']} "
+        f"matches={','.join(decision['matches']) or '-'} "
+        f"decision_us={decision['decision_us']} answer_ms={answer_ms:.1f}"
+    )
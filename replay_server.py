@@ -0,0 +1,223 @@
+"""
+Replay Fixture Server - Record MediaWiki API responses once, serve them locally
+In record mode it proxies /w/api.php to the real API and stores every page it
+sees; in replay mode it answers any multi-title query from those pages, so the
+scraper runs unchanged (api_url=...) with configurable latency and failures
+
+Usage:
+    python replay_server.py --record --fixtures wiki_fixtures.json     # then run the scraper
+    python replay_server.py --fixtures wiki_fixtures.json --latency-ms 120 --error-rate 0.02
+    python replay_server.py --synthesize-missing                       # no fixtures needed
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+from typing import Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from mock_openrouter import LATENCY_DISTRIBUTIONS, MockSettings
+from web_scraper import WIKIPEDIA_API_URL
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_FILE = "wiki_fixtures.json"
+API_PATH = "/w/api.php"
+SAVE_EVERY = 20                # recorded responses between fixture saves
+SYNTHETIC_LINKS = 5            # links per synthesized page
+USER_AGENT = "educational-chatbot-fixture-recorder/1.0"
+
+
+class FixtureStore:
+    """Recorded pages by title plus the normalized/redirect mappings seen"""
+
+    def __init__(self, path: Optional[str] = FIXTURES_FILE, synthesize_missing: bool = False):
+        self.path = path
+        self.synthesize_missing = synthesize_missing
+        self.pages: Dict[str, Dict] = {}
+        self.aliases: Dict[str, List[str]] = {}    # from -> [kind, to]
+        self.missing = set()
+        self.dirty = 0
+
+    def record(self, data: Dict):
+        """Fold one real API response into the store"""
+        query = data.get("query", {})
+        for kind in ("normalized", "redirects"):
+            for mapping in query.get(kind, []):
+                self.aliases[mapping["from"]] = [kind, mapping["to"]]
+        for page in query.get("pages", {}).values():
+            if "missing" in page or "invalid" in page:
+                self.missing.add(page["title"])
+                continue
+            merged = self.pages.setdefault(page["title"], {})
+            for key, value in page.items():
+                if isinstance(value, list) and isinstance(merged.get(key), list):
+                    merged[key].extend(v for v in value if v not in merged[key])
+                else:
+                    merged[key] = value
+        self.dirty += 1
+
+    def _synthesize(self, title: str) -> Dict:
+        """Deterministic literature-like page whose lead names the pages it links to"""
+        seed = int(hashlib.sha256(title.encode("utf-8")).hexdigest()[:8], 16)
+        rng = random.Random(seed)
+        links = [f"{title} {chr(65 + i)}" for i in range(SYNTHETIC_LINKS)]
+        extract = (
+            f"{title} (born {rng.randint(1700, 1900)}) was a "
+            f"{rng.choice(['Russian', 'French', 'English', 'German'])} novelist of the "
+            f"{rng.choice(['Romantic', 'Realist', 'Modernist'])} era. "
+            f"Related: {', '.join(links)}. " + "Filler sentence about literature. " * 20
+        )
+        return {
+            "pageid": seed, "ns": 0, "title": title, "lastrevid": seed % 100000,
+            "touched": "2024-01-01T00:00:00Z", "extract": extract,
+            "links": [{"ns": 0, "title": link} for link in links],
+        }
+
+    def respond(self, params: Dict) -> Dict:
+        """Assemble a MediaWiki query response for the requested titles"""
+        prop = params.get("prop", "")
+        query: Dict = {"pages": {}}
+        for index, title in enumerate(t for t in params.get("titles", "").split("|") if t):
+            resolved, seen = title, set()
+            while resolved in self.aliases and resolved not in seen:
+                seen.add(resolved)
+                kind, target = self.aliases[resolved]
+                query.setdefault(kind, []).append({"from": resolved, "to": target})
+                resolved = target
+
+            page = self.pages.get(resolved)
+            if page is None and self.synthesize_missing and resolved not in self.missing:
+                page = self._synthesize(resolved)
+            if page is None:
+                query["pages"][str(-1 - index)] = {"ns": 0, "title": resolved, "missing": ""}
+                continue
+            # Only the props that were asked for, like the real API
+            page = {k: v for k, v in page.items()
+                    if (k != "extract" or "extracts" in prop) and (k != "links" or "links" in prop)}
+            key = str(page.get("pageid", -1 - index))
+            query["pages"][key if key not in query["pages"] else str(-1 - index)] = page
+        return {"batchcomplete": "", "query": query}
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"pages": self.pages, "aliases": self.aliases,
+                       "missing": sorted(self.missing)}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = 0
+        logger.info(f"💾 Fixtures saved: {len(self.pages)} pages")
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.pages = data.get("pages", {})
+        self.aliases = data.get("aliases", {})
+        self.missing = set(data.get("missing", []))
+        logger.info(f"📚 Fixtures loaded: {len(self.pages)} pages")
+
+
+async def replay_api(request: web.Request) -> web.Response:
+    """GET /w/api.php from the fixture store"""
+    settings: MockSettings = request.app["settings"]
+    stats: Dict = request.app["stats"]
+    stats["requests"] += 1
+    await asyncio.sleep(settings.sample_latency())
+    if random.random() < settings.error_rate:
+        stats["errors"] += 1
+        status = random.choice(settings.error_statuses)
+        headers = {"Retry-After": str(settings.retry_after)} if status == 429 else {}
+        return web.json_response({"error": {"code": str(status), "info": "Injected failure"}},
+                                 status=status, headers=headers)
+    stats["pages"] += len(request.query.get("titles", "").split("|"))
+    return web.json_response(request.app["store"].respond(dict(request.query)))
+
+
+async def record_api(request: web.Request) -> web.Response:
+    """GET /w/api.php proxied to the upstream API and recorded"""
+    store: FixtureStore = request.app["store"]
+    request.app["stats"]["requests"] += 1
+    session: aiohttp.ClientSession = request.app["upstream_session"]
+    async with session.get(request.app["upstream"], params=request.query) as resp:
+        body = await resp.text()
+        if resp.status == 200:
+            store.record(json.loads(body))
+            if store.dirty >= SAVE_EVERY:
+                store.save()
+        return web.Response(text=body, status=resp.status, content_type="application/json")
+
+
+async def get_stats(request: web.Request) -> web.Response:
+    """GET /stats - request counters since start"""
+    return web.json_response(request.app["stats"])
+
+
+def create_app(store: FixtureStore, settings: MockSettings = None,
+               upstream: Optional[str] = None) -> web.Application:
+    """Replay app, or a recording proxy when `upstream` is given"""
+    app = web.Application()
+    app["store"] = store
+    app["settings"] = settings or MockSettings(latency="fixed", latency_ms=0)
+    app["stats"] = {"requests": 0, "errors": 0, "pages": 0}
+    if upstream:
+        app["upstream"] = upstream
+
+        async def upstream_session(app):
+            app["upstream_session"] = aiohttp.ClientSession(headers={"User-Agent": USER_AGENT})
+            yield
+            await app["upstream_session"].close()
+            store.save()
+
+        app.cleanup_ctx.append(upstream_session)
+        app.router.add_get(API_PATH, record_api)
+    else:
+        app.router.add_get(API_PATH, replay_api)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def add_replay_arguments(parser: argparse.ArgumentParser):
+    """Register fixture and fault-injection options on a CLI parser"""
+    parser.add_argument("--fixtures", default=FIXTURES_FILE, help="Fixture file to replay or record into")
+    parser.add_argument("--synthesize-missing", action="store_true",
+                        help="Serve deterministic synthetic pages for titles not in the fixtures")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean per-request latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with an error status")
+    parser.add_argument("--error-statuses", default="429,500,503")
+
+
+def replay_app_from_args(args: argparse.Namespace) -> web.Application:
+    store = FixtureStore(args.fixtures, synthesize_missing=args.synthesize_missing)
+    store.load()
+    settings = MockSettings(
+        latency=args.latency, latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_statuses.split(",") if s],
+    )
+    upstream = args.upstream if getattr(args, "record", False) else None
+    return create_app(store, settings, upstream=upstream)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Record/replay fixture server for the MediaWiki API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--record", action="store_true", help="Proxy to --upstream and record")
+    parser.add_argument("--upstream", default=WIKIPEDIA_API_URL)
+    add_replay_arguments(parser)
+    args = parser.parse_args()
+    logger.info(f"🧪 Scraper api_url: http://{args.host}:{args.port}{API_PATH}")
+    web.run_app(replay_app_from_args(args), host=args.host, port=args.port)
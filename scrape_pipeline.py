@@ -0,0 +1,270 @@
+"""
+Scrape-to-Index Pipeline - Staged async expansion of the live knowledge base
+fetch -> extract -> normalize -> index, connected by bounded queues so a slow
+stage applies backpressure upstream; the index stage registers entries in
+literature_knowledge, making them answerable offline without a restart.
+The CLI has no live bot to index into, so it merges the scraped entries into
+the expanded knowledge base file instead.
+
+Usage:
+    python scrape_pipeline.py --authors "Victor Hugo" "Homer" --works "Les Misérables:Victor Hugo"
+    python scrape_pipeline.py --works "Hamlet:Shakespeare" --output expanded_kb.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from chatgpt_brain import invalidate_response_cache
+from crawl_scheduler import classify_page
+from literature_knowledge import LITERATURE_DB, link_work_to_writer, register_writer, register_work
+from web_scraper import (
+    LiteratureWebScraper, EXTRACT_QUERY, MAX_EXTRACTS_PER_QUERY, SEED_AUTHORS, SEED_WORKS,
+    author_entry, work_entry, work_key,
+)
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100              # items buffered between two stages
+FETCH_WORKERS = 4
+SUMMARY_CHARS = 400           # summary shown in offline answers
+EXPANDED_KB_FILE = "expanded_kb.json"
+
+_SLUG_RE = re.compile(r"[^\w]+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def _slug(text: str) -> str:
+    return _SLUG_RE.sub("_", text.lower()).strip("_")
+
+
+def _summary(extract: str) -> str:
+    """Whole sentences of the lead, up to SUMMARY_CHARS"""
+    summary = ""
+    for sentence in _SENTENCE_END_RE.split(extract.strip()):
+        if summary and len(summary) + len(sentence) > SUMMARY_CHARS:
+            break
+        summary = f"{summary} {sentence}".strip()
+    return summary[:SUMMARY_CHARS]
+
+
+def normalize_author(data: Dict) -> Tuple[str, Dict, List[str]]:
+    """(key, literature_knowledge writer entry, aliases) for a scraped author"""
+    name = data["name"]
+    years = f"{data.get('birth_year') or '?'}-{data.get('death_year') or '?'}"
+    era = data.get("era", "Unknown")
+    entry = {
+        "name": name,
+        "period": f"{era} Era ({years})" if era != "Unknown" else f"({years})",
+        "works": [],
+        "quotes": [],
+        "genres": [],
+        "summary": _summary(data.get("wikipedia_summary", "")),
+        "nationality": data.get("nationality", "Unknown"),
+        "source": "Wikipedia",
+    }
+    # Full name plus surname, the form questions usually use
+    base_name = name.split(" (")[0]
+    return _slug(base_name), entry, [base_name, base_name.split()[-1]]
+
+
+def normalize_work(data: Dict) -> Tuple[str, Dict, List[str]]:
+    """(key, literature_knowledge work entry, aliases) for a scraped work"""
+    title = data["title"].split(" (")[0]
+    entry = {
+        "title": title,
+        "author": data.get("author", "Unknown"),
+        "year": data.get("year") or "Unknown",
+        "genre": data.get("genre", "Literary Work"),
+        "themes": data.get("themes", []),
+        "summary": _summary(data.get("wikipedia_summary", "")),
+        "source": "Wikipedia",
+    }
+    return _slug(title), entry, [title]
+
+
+class ScrapePipeline:
+    """Four stages with bounded queues between them"""
+
+    def __init__(self, scraper: LiteratureWebScraper, fetch_workers: int = FETCH_WORKERS,
+                 queue_size: int = QUEUE_SIZE, batch_size: int = MAX_EXTRACTS_PER_QUERY,
+                 kb: Optional[Dict] = None):
+        self.scraper = scraper
+        # Optional build_expanded_knowledge_base-schema dict that also receives every extracted entry
+        self.kb = kb
+        self.fetch_workers = fetch_workers
+        self.batch_size = batch_size
+        self.requests: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.pages: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.entries: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.normalized: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = {"requested": 0, "fetched": 0, "missing": 0, "extracted": 0,
+                      "skipped": 0, "indexed": 0, "aliases": 0, "failed_batches": 0}
+
+    # -- stages ---------------------------------------------------------
+
+    async def _fetch(self):
+        """Batch queued titles into multi-title queries"""
+        while True:
+            items = [await self.requests.get()]
+            while len(items) < self.batch_size and not self.requests.empty():
+                items.append(self.requests.get_nowait())
+            try:
+                # A work's author disambiguates the lookup, as in fetch_work_from_wikipedia
+                lookups = [f"{title} {author}" if author else title for _, title, author in items]
+                pages = await self.scraper.query_titles(lookups, EXTRACT_QUERY)
+                for (kind, title, _), lookup in zip(items, lookups):
+                    page = pages.get(lookup)
+                    if page and page.get("extract"):
+                        self.stats["fetched"] += 1
+                        await self.pages.put((kind, title, page))
+                    else:
+                        self.stats["missing"] += 1
+            except Exception as e:
+                self.stats["failed_batches"] += 1
+                logger.warning(f"Pipeline fetch failed for {len(items)} titles: {e}")
+            finally:
+                for _ in items:
+                    self.requests.task_done()
+
+    async def _extract(self):
+        while True:
+            kind, title, page = await self.pages.get()
+            try:
+                kind = kind or classify_page(page["extract"])
+                if kind == "author":
+                    data = author_entry(page, title)
+                elif kind == "work":
+                    data = work_entry(page, title)
+                else:
+                    self.stats["skipped"] += 1
+                    continue
+                if self.kb is not None:
+                    if kind == "author":
+                        self.kb["authors"][title] = data
+                    else:
+                        self.kb["works"][work_key(data)] = data
+                await self.entries.put((kind, data))
+                self.stats["extracted"] += 1
+            except Exception as e:
+                self.stats["skipped"] += 1
+                logger.warning(f"Pipeline extract failed for {title}: {e}")
+            finally:
+                self.pages.task_done()
+
+    async def _normalize(self):
+        while True:
+            kind, data = await self.entries.get()
+            try:
+                normalize = normalize_author if kind == "author" else normalize_work
+                await self.normalized.put((kind, *normalize(data)))
+            except Exception as e:
+                self.stats["skipped"] += 1
+                logger.warning(f"Pipeline normalize failed: {e}")
+            finally:
+                self.entries.task_done()
+
+    async def _index(self):
+        """Single writer into the live index, so registrations never interleave"""
+        while True:
+            kind, key, entry, aliases = await self.normalized.get()
+            try:
+                if kind == "author":
+                    self.stats["aliases"] += len(register_writer(key, entry, aliases))
+                else:
+                    self.stats["aliases"] += len(register_work(key, entry, aliases))
+                    _link_work_to_author(entry)
+                self.stats["indexed"] += 1
+                # Cached "not found" answers would hide the new entry
+                invalidate_response_cache()
+            except Exception as e:
+                self.stats["skipped"] += 1
+                logger.warning(f"Pipeline index failed for {key}: {e}")
+            finally:
+                self.normalized.task_done()
+
+    # -- driver ---------------------------------------------------------
+
+    async def run(self, items: List[Tuple[Optional[str], str, Optional[str]]]) -> Dict:
+        """Push (kind, title, author) items through every stage; kind None lets the extractor classify"""
+        started = time.monotonic()
+        workers = [asyncio.create_task(self._fetch()) for _ in range(self.fetch_workers)]
+        workers += [asyncio.create_task(stage()) for stage in (self._extract, self._normalize, self._index)]
+        try:
+            for item in items:
+                # Blocks while the fetch stage is behind: backpressure reaches the producer
+                await self.requests.put(item)
+                self.stats["requested"] += 1
+            for queue in (self.requests, self.pages, self.entries, self.normalized):
+                await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        elapsed = time.monotonic() - started
+        logger.info(f"✅ Pipeline indexed {self.stats['indexed']} entries in {elapsed:.1f}s")
+        return {**self.stats, "seconds": round(elapsed, 2)}
+
+
+def _link_work_to_author(work: Dict):
+    """List an indexed work under its author when the author is indexed too"""
+    author = work["author"].lower()
+    for region, writers in LITERATURE_DB["classic_authors"].items():
+        for key, writer in writers.items():
+            if writer.get("source") == "Wikipedia" and writer["name"].lower() == author:
+                link_work_to_writer(key, work["title"], region)
+                return
+
+
+def _pipeline_items(authors: List[str], works: List[Tuple[str, str]]) -> List[Tuple]:
+    return [("author", name, None) for name in authors] + [
+        ("work", title, author or None) for title, author in works
+    ]
+
+
+async def expand_live_index(authors: List[str], works: List[Tuple[str, str]] = (),
+                            kb: Optional[Dict] = None) -> Dict:
+    """Scrape authors and (title, author) works into the running process's index (and `kb`, if given)"""
+    scraper = LiteratureWebScraper()
+    try:
+        return await ScrapePipeline(scraper, kb=kb).run(_pipeline_items(authors, works))
+    finally:
+        await scraper.close()
+
+
+def expand_knowledge_file(path: str, authors: List[str], works: List[Tuple[str, str]] = ()) -> Dict:
+    """Scrape authors and works into the expanded knowledge base file at `path`, creating it if needed"""
+    kb = {"authors": {}, "works": {}, "sources": []}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            kb = json.load(f)
+    stats = asyncio.run(expand_live_index(authors, works, kb))
+    kb["timestamp"] = str(time.time())
+    if "Wikipedia API" not in kb.setdefault("sources", []):
+        kb["sources"].append("Wikipedia API")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(kb, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    logger.info(f"💾 {stats['extracted']} entries merged into {path}")
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Scrape authors and works into the expanded knowledge base")
+    parser.add_argument("--authors", nargs="*", default=None, help="Author page titles")
+    parser.add_argument("--works", nargs="*", default=None, help="Work titles as 'Title:Author'")
+    parser.add_argument("--output", default=EXPANDED_KB_FILE, help="Knowledge base file to create or update")
+    args = parser.parse_args()
+
+    authors = SEED_AUTHORS if args.authors is None and args.works is None else (args.authors or [])
+    works = SEED_WORKS if args.authors is None and args.works is None else [
+        tuple(item.split(":", 1)) if ":" in item else (item, "") for item in args.works or []
+    ]
+    print(json.dumps(expand_knowledge_file(args.output, authors, works), indent=2))
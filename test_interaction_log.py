@@ -0,0 +1,69 @@
+"""
+Tests for the segmented interaction log and its compaction
+"""
+import os
+
+from interaction_log import ARCHIVE_DIR, SNAPSHOT_FILE, InteractionLog
+from neural_trainer import NeuralNetworkTrainer
+
+
+def _records(start, count):
+    return [{"id": i} for i in range(start, start + count)]
+
+
+def test_append_rotates_segments_and_survives_reopen(tmp_path):
+    log = InteractionLog(str(tmp_path), segment_max_records=3)
+    log.append(_records(0, 4))
+    log.append(_records(4, 4))
+    assert len(log.segments()) == 3
+
+    reopened = InteractionLog(str(tmp_path), segment_max_records=3)
+    assert [r["id"] for r in reopened.iter_tail()] == list(range(8))
+    reopened.append(_records(8, 1))
+    assert [r["id"] for r in reopened.iter_tail()] == list(range(9))
+
+
+def test_torn_final_line_is_skipped(tmp_path):
+    log = InteractionLog(str(tmp_path))
+    log.append(_records(0, 2))
+    with open(log._segment_path(log.current), 'a', encoding='utf-8') as f:
+        f.write('{"id": 2')
+    assert [r["id"] for r in InteractionLog(str(tmp_path)).iter_tail()] == [0, 1]
+
+
+def test_compaction_archives_and_ignores_leftover_segments(tmp_path):
+    log = InteractionLog(str(tmp_path), segment_max_records=2, archive_compacted=True)
+    log.append(_records(0, 5))
+    compacted = log.segments()
+    log.compact({"total": 5})
+    log.append(_records(5, 1))
+
+    reopened = InteractionLog(str(tmp_path), segment_max_records=2)
+    assert reopened.load_snapshot()["state"] == {"total": 5}
+    assert [r["id"] for r in reopened.iter_tail()] == [5]
+    assert [r["id"] for r in reopened.iter_all()] == list(range(6))
+    assert len(os.listdir(os.path.join(str(tmp_path), ARCHIVE_DIR))) == len(compacted)
+
+    # A crash between the snapshot and segment removal leaves covered segments behind
+    os.replace(os.path.join(str(tmp_path), ARCHIVE_DIR, os.path.basename(log._segment_path(compacted[0]))),
+               log._segment_path(compacted[0]))
+    assert [r["id"] for r in InteractionLog(str(tmp_path)).iter_tail()] == [5]
+
+
+def test_trainer_restores_snapshot_plus_tail(tmp_path):
+    trainer = NeuralNetworkTrainer()
+    log = trainer._log(str(tmp_path))
+    log.segment_max_records = 4
+    log.compact_after_segments = 2
+    for i in range(33):
+        trainer.record_interaction(1, f"who is writer {i}", "answer", rating=i % 5 + 1)
+        if i % 5 == 4 or i == 32:
+            trainer.save_training_data(str(tmp_path))
+    assert os.path.exists(os.path.join(str(tmp_path), SNAPSHOT_FILE))
+    assert log.segments()
+
+    restored = NeuralNetworkTrainer()
+    restored.load_training_data(str(tmp_path))
+    assert restored.improvement_metrics == trainer.improvement_metrics
+    assert dict(restored.type_counts) == dict(trainer.type_counts)
+    assert restored.global_rating_stats.state() == trainer.global_rating_stats.state()
@@ -0,0 +1,99 @@
+"""
+Tests for hedged model calls
+"""
+import asyncio
+import time
+
+import pytest
+
+from model_hedging import HedgedModelCaller
+from upstream_guard import UpstreamGuard
+
+CHAIN = [{"model": "primary", "ttft_slo": 0.05}, {"model": "hedge", "ttft_slo": 0.05}]
+
+
+def _streamer(delays, closed=None):
+    """stream_fn whose models wait `delays[model]` seconds before one chunk"""
+    async def stream(model):
+        try:
+            await asyncio.sleep(delays[model])
+            yield model
+        finally:
+            if closed is not None:
+                closed.append(model)
+    return stream
+
+
+def test_hedge_wins_and_cancels_slow_primary():
+    caller = HedgedModelCaller(CHAIN)
+    closed = []
+
+    async def main():
+        return await caller.call(_streamer({"primary": 1.0, "hedge": 0.01}, closed))
+
+    started = time.monotonic()
+    assert asyncio.run(main()) == "hedge"
+    assert time.monotonic() - started < 0.5
+    assert caller.stats["hedges"] == 1
+    assert "primary" in closed
+    # The cancelled primary is censored, not a time-to-first-token sample
+    assert len(caller.histograms["primary"]) == 0
+    assert len(caller.histograms["primary"].censored) == 1
+    assert len(caller.histograms["hedge"]) == 1
+
+
+def test_cancelled_hedges_do_not_lower_the_hedge_delay():
+    caller = HedgedModelCaller(CHAIN)
+
+    async def main():
+        for _ in range(25):
+            assert await caller.call(_streamer({"primary": 0.08, "hedge": 0.04})) == "primary"
+
+    asyncio.run(main())
+    stats = caller.get_latency_stats()["hedge"]
+    assert stats["samples"] == 0
+    assert stats["censored"] > 0
+    assert stats["p50"] is None
+
+
+def test_failed_primary_falls_back():
+    caller = HedgedModelCaller(CHAIN)
+
+    async def stream(model):
+        if model == "primary":
+            raise RuntimeError("boom")
+        yield "fallback"
+
+    assert asyncio.run(caller.call(stream)) == "fallback"
+    assert caller.stats["fallbacks"] == 1
+
+
+def test_hedge_waits_for_a_guard_slot():
+    guard = UpstreamGuard(global_concurrency=1, rate_per_second=1000, burst=100)
+    caller = HedgedModelCaller(CHAIN)
+    started_models = []
+
+    async def stream(model):
+        started_models.append(model)
+        await asyncio.sleep(0.2 if model == "primary" else 0.01)
+        yield model
+
+    async def request(timeout):
+        deadline = time.monotonic() + timeout
+        return await caller.call(stream, extra_budget=lambda concurrent: guard.extra_request(deadline, concurrent))
+
+    # The only slot belongs to the primary, so the hedge never reaches upstream
+    assert asyncio.run(guard.call(1, request)) == "primary"
+    assert caller.stats["hedges"] == 1
+    assert started_models == ["primary"]
+
+
+def test_all_models_failing_raises_last_error():
+    caller = HedgedModelCaller(CHAIN)
+
+    async def stream(model):
+        raise RuntimeError(model)
+        yield
+
+    with pytest.raises(RuntimeError, match="hedge"):
+        asyncio.run(caller.call(stream))
@@ -0,0 +1,187 @@
+"""
+Tests for the neural trainer: classifier retraining, feedback labels, offline retraining,
+mergeable statistics and streamed response optimization
+"""
+import random
+from collections import Counter
+
+import pytest
+
+import neural_trainer
+from neural_trainer import (
+    CLASSIFIER_RETRAIN_EVERY, BackgroundTrainer, NeuralNetworkTrainer, ResponseOptimizer, RunningStats,
+    SpaceSaving, _ewma_step,
+    retrain_from_logs,
+)
+from question_classifier import keyword_classify
+
+LABELLED_QUESTIONS = {
+    "author_info": "who is {}",
+    "definition": "что такое {}",
+    "comparison": "compare {} and Gogol",
+    "analysis": "analyze the themes of {}",
+    "quotes": "quote from {}",
+    "general": "recommend books like {}",
+}
+NAMES = ["Pushkin", "Tolstoy", "Blok", "Gorky", "Chekhov", "Bulgakov"]
+
+
+def test_unlabelled_feedback_does_not_collapse_classifier():
+    trainer = NeuralNetworkTrainer()
+    for i in range(3 * CLASSIFIER_RETRAIN_EVERY):
+        template = list(LABELLED_QUESTIONS.values())[i % len(LABELLED_QUESTIONS)]
+        trainer.record_interaction(1, template.format(NAMES[i % len(NAMES)]), "answer", rating=5)
+
+    assert trainer.classifier.trained_samples == 0
+    assert trainer._classify_question("who is Lermontov") == "author_info"
+    assert trainer._classify_question("compare Blok and Bely") == "comparison"
+
+
+def test_retrain_on_labelled_feedback_keeps_every_class():
+    trainer = NeuralNetworkTrainer()
+    for i in range(CLASSIFIER_RETRAIN_EVERY):
+        category = list(LABELLED_QUESTIONS)[i % len(LABELLED_QUESTIONS)]
+        question = LABELLED_QUESTIONS[category].format(NAMES[i % len(NAMES)])
+        trainer.record_interaction(1, question, "answer", rating=5, category=category)
+
+    assert trainer.classifier.is_trained
+    predicted = trainer.classifier.predict_batch(
+        [template.format("Lermontov") for template in LABELLED_QUESTIONS.values()]
+    )
+    assert predicted == list(LABELLED_QUESTIONS)
+
+
+def test_feedback_api_category_trains_live_classifier(tmp_path, monkeypatch):
+    import app as flask_app
+
+    trainer = NeuralNetworkTrainer()
+    background = BackgroundTrainer(trainer, log_dir=str(tmp_path))
+    monkeypatch.setattr(neural_trainer, "_trainer", trainer)
+    monkeypatch.setattr(neural_trainer, "_background", background)
+    client = flask_app.app.test_client()
+
+    # The keyword rules would call this "general"
+    template = "tell me about the poems of {}"
+    assert keyword_classify(template.format("Lermontov")) == "general"
+    for i in range(CLASSIFIER_RETRAIN_EVERY):
+        category = "analysis" if i % 2 else "quotes"
+        question = template.format(NAMES[i % len(NAMES)]) if i % 2 else f"quote from {NAMES[i % len(NAMES)]}"
+        reply = client.post("/api/feedback", json={
+            "question": question, "response": "answer", "rating": 5, "category": category,
+        })
+        assert reply.status_code == 200
+    assert client.post("/api/feedback", json={"rating": 5, "category": "poetry"}).status_code == 400
+
+    assert background.flush()
+    background.stop()
+    assert trainer.snapshot.classifier.is_trained
+    assert neural_trainer.classify_question(template.format("Lermontov")) == "analysis"
+
+
+def test_offline_retrain_matches_live_stats_after_compaction(tmp_path):
+    trainer = NeuralNetworkTrainer()
+    log = trainer._log(str(tmp_path))
+    log.segment_max_records = 5
+    log.compact_after_segments = 2
+    templates = list(LABELLED_QUESTIONS.values())
+    for i in range(60):
+        question = templates[i % len(templates)].format(NAMES[i % len(NAMES)])
+        trainer.record_interaction(i % 3, question, "answer " * (i % 7 + 1), rating=i % 5 + 1)
+        if i % 4 == 3:
+            trainer.save_training_data(str(tmp_path))
+    trainer.save_training_data(str(tmp_path))
+    assert log.load_snapshot() is not None
+
+    report = retrain_from_logs(str(tmp_path), workers=1)
+    live = trainer.get_improvement_metrics()
+    assert report["records"] == 60
+    for key in ("total_interactions", "learned_answers_count", "question_types_learned"):
+        assert report["metrics"][key] == live[key]
+    for key in ("avg_response_quality", "user_satisfaction"):
+        assert report["metrics"][key] == pytest.approx(live[key])
+    assert {qt: row["interactions"] for qt, row in report["by_type"].items()} == dict(trainer.type_counts)
+
+
+def test_running_stats_merge_matches_sequential_updates():
+    ratings = [5, 3, 4, 1, 2, 5, 5, 4, 3, 2, 1, 4, 5, 3]
+    sequential = RunningStats()
+    for rating in ratings:
+        sequential.update(rating)
+
+    for split in (0, 1, 6, len(ratings)):
+        first, second = RunningStats(), RunningStats()
+        ewma = [1.0, 0.0]   # decay, weighted contribution of the second half
+        for rating in ratings[:split]:
+            first.update(rating)
+        for rating in ratings[split:]:
+            second.update(rating)
+            _ewma_step(ewma, rating)
+        first.merge(second, *ewma)
+
+        assert first.count == sequential.count
+        assert first.mean == pytest.approx(sequential.mean)
+        assert first.variance == pytest.approx(sequential.variance)
+        assert first.recent_mean == pytest.approx(sequential.recent_mean)
+
+
+def _zipf_stream(seed, length, vocabulary=500):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    return rng.choices([f"w{i}" for i in range(vocabulary)], weights, k=length)
+
+
+def _assert_within_bounds(sketch, truth):
+    for item, count in sketch.counts.items():
+        assert count - sketch.errors[item] <= truth[item] <= count
+
+
+def test_space_saving_merge_keeps_error_bounds():
+    first_stream, second_stream = _zipf_stream(1, 5000), _zipf_stream(2, 5000)
+    first, second = SpaceSaving(50), SpaceSaving(50)
+    for word in first_stream:
+        first.add(word)
+    for word in second_stream:
+        second.add(word)
+    _assert_within_bounds(first, Counter(first_stream))
+
+    first.merge(second)
+    truth = Counter(first_stream + second_stream)
+    assert len(first.counts) <= 50
+    _assert_within_bounds(first, truth)
+    # The heavy hitters of a skewed stream survive the merge in order
+    assert [item for item, _ in first.top(5)] == [item for item, _ in truth.most_common(5)]
+
+    restored = SpaceSaving.from_state(first.state())
+    assert restored.top(10) == first.top(10)
+
+
+def _random_answer(rng):
+    words = ["Pushkin", "wrote", "the", "novel", "in", "verse", "about", "Onegin", "and", "Tatiana"]
+    lines = []
+    for _ in range(rng.randint(1, 30)):
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+        lines.append(f"- {line}" if rng.random() < 0.3 else line)
+        if rng.random() < 0.1:
+            lines.append("")
+    return "\n".join(lines)
+
+
+def _stream_in_chunks(optimizer, answer, question, rng):
+    stream = optimizer.stream(question)
+    out, position = [], 0
+    while position < len(answer) and not stream.done:
+        size = rng.randint(1, 12)
+        out.append(stream.feed(answer[position:position + size]))
+        position += size
+    out.append(stream.close())
+    return "".join(out)
+
+
+def test_response_stream_matches_batch_optimize():
+    rng = random.Random(7)
+    optimizer = ResponseOptimizer(NeuralNetworkTrainer())
+    for question in ("who is Pushkin", "analyze the themes of Onegin", "compare Pushkin and Gogol"):
+        for _ in range(300):
+            answer = _random_answer(rng)
+            assert _stream_in_chunks(optimizer, answer, question, rng) == \
+                optimizer.optimize_response(answer, question)
@@ -0,0 +1,125 @@
+"""
+Tests for the upstream guard's loop-independent limits
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from upstream_guard import DeadlineExceededError, LoopSafeSemaphore, TokenBucket, UpstreamGuard
+
+
+def _run_in_thread(coro_fn):
+    """asyncio.run(coro_fn()) on a new thread and loop, like a Flask async view"""
+    result = {}
+
+    def target():
+        try:
+            result["value"] = asyncio.run(coro_fn())
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, result
+
+
+def test_semaphore_release_wakes_waiter_on_another_loop():
+    semaphore = LoopSafeSemaphore(1)
+    held = threading.Event()
+    release = threading.Event()
+
+    async def holder():
+        await semaphore.acquire()
+        held.set()
+        await asyncio.to_thread(release.wait)
+        semaphore.release()
+
+    async def waiter():
+        started = time.monotonic()
+        async with semaphore:
+            return time.monotonic() - started
+
+    holder_thread, _ = _run_in_thread(holder)
+    assert held.wait(2)
+    waiter_thread, result = _run_in_thread(waiter)
+    time.sleep(0.1)
+    release.set()
+    holder_thread.join(2)
+    waiter_thread.join(2)
+
+    assert "error" not in result
+    assert result["value"] >= 0.05
+
+
+def test_cancelled_waiter_passes_the_slot_on():
+    async def main():
+        semaphore = LoopSafeSemaphore(1)
+        await semaphore.acquire()
+        first = asyncio.create_task(semaphore.acquire())
+        second = asyncio.create_task(semaphore.acquire())
+        await asyncio.sleep(0)
+        # first is woken by the release, then cancelled before it can take the slot
+        semaphore.release()
+        first.cancel()
+        await asyncio.wait_for(second, 1)
+        assert first.cancelled()
+        semaphore.release()
+        # Nothing leaked: the slot is free again
+        await asyncio.wait_for(semaphore.acquire(), 1)
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_is_forgotten():
+    async def main():
+        semaphore = LoopSafeSemaphore(1)
+        await semaphore.acquire()
+        waiter = asyncio.create_task(semaphore.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert not semaphore._waiters
+        semaphore.release()
+        await asyncio.wait_for(semaphore.acquire(), 1)
+
+    asyncio.run(main())
+
+
+def test_token_bucket_deadline():
+    async def main():
+        bucket = TokenBucket(rate=1.0, capacity=1.0)
+        await bucket.acquire()
+        with pytest.raises(DeadlineExceededError):
+            await bucket.acquire(deadline=time.monotonic() + 0.1)
+
+    asyncio.run(main())
+
+
+def test_guard_shared_across_loops_respects_global_limit():
+    guard = UpstreamGuard(global_concurrency=2, per_user_concurrency=1, rate_per_second=1000, burst=100)
+    lock = threading.Lock()
+    active = [0, 0]   # current, peak
+
+    async def request(timeout):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        await asyncio.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        return True
+
+    def caller(user_id):
+        async def main():
+            return await asyncio.gather(*(guard.call(user_id, request) for _ in range(3)))
+        return main
+
+    threads = [_run_in_thread(caller(i % 3)) for i in range(6)]
+    for thread, _ in threads:
+        thread.join(5)
+
+    assert all(result.get("value") == [True] * 3 for _, result in threads)
+    assert active[1] <= 2
+    assert guard._user_semaphores == {}
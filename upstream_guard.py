@@ -0,0 +1,325 @@
+"""
+Upstream Guard for the OpenRouter API
+Concurrency limits, token-bucket rate limiting, jittered retries and a circuit breaker
+Keeps bursts from overwhelming the API and lets callers fail over to local answers
+State is guarded by threading primitives, so one guard can be shared by callers
+running on different event loops (Flask runs each async view on its own loop)
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: rate limited or upstream trouble
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """Non-successful response from the upstream API"""
+
+    def __init__(self, status: int, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(f"Upstream error {status}: {message[:200]}")
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status in RETRYABLE_STATUSES
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a call"""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a call cannot complete within its deadline"""
+
+
+class LoopSafeSemaphore:
+    """Async semaphore usable from any event loop; waiters are woken thread-safely"""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._lock = threading.Lock()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._value > 0:
+                    self._value -= 1
+                    return
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+            try:
+                await waiter[1]
+            except BaseException:
+                with self._lock:
+                    woken = waiter not in self._waiters
+                    if not woken:
+                        self._waiters.remove(waiter)
+                if woken:
+                    # Pass the wake-up on so the freed slot is not stranded
+                    self._wake_next()
+                raise
+
+    def release(self):
+        with self._lock:
+            self._value += 1
+        self._wake_next()
+
+    def _wake_next(self):
+        while True:
+            with self._lock:
+                if not self._waiters or self._value <= 0:
+                    return
+                loop, future = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+                return
+            except RuntimeError:
+                # The waiter's loop is already closed; try the next one
+                continue
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, deadline: Optional[float] = None):
+        """Wait for a token; raise DeadlineExceededError if none arrives in time"""
+        # Reserve the token up front (tokens may go negative), then sleep off the debt
+        with self._lock:
+            self._refill()
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise DeadlineExceededError("Rate limit wait exceeds deadline")
+            self.tokens -= 1
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """Classic closed / open / half-open circuit breaker"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Whether a call may go upstream right now"""
+        with self._lock:
+            return self._allow_request()
+
+    def _allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_started_at = None
+        # Half-open: let one probe through (a lost probe expires after reset_timeout)
+        now = time.monotonic()
+        if self._probe_started_at is not None and now - self._probe_started_at < self.reset_timeout:
+            return False
+        self._probe_started_at = now
+        return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("🔌 Circuit closed - upstream recovered")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_started_at = None
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"⛔ Circuit opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+
+class UpstreamGuard:
+    """Wraps upstream calls with concurrency limits, rate limiting, retries and a breaker"""
+
+    def __init__(self, global_concurrency: int = 8, per_user_concurrency: int = 1,
+                 rate_per_second: float = 5.0, burst: Optional[float] = None,
+                 max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 deadline: float = 30.0, breaker: Optional[CircuitBreaker] = None):
+        self.global_semaphore = LoopSafeSemaphore(global_concurrency)
+        self.per_user_concurrency = per_user_concurrency
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        # Per-user semaphores are dropped as soon as nobody holds or waits on them
+        self._user_semaphores: Dict[int, LoopSafeSemaphore] = {}
+        self._user_refs: Dict[int, int] = {}
+        self._users_lock = threading.Lock()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Full-jitter exponential backoff, never shorter than Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def _acquire_user(self, user_id: int) -> LoopSafeSemaphore:
+        with self._users_lock:
+            semaphore = self._user_semaphores.get(user_id)
+            if semaphore is None:
+                semaphore = LoopSafeSemaphore(self.per_user_concurrency)
+                self._user_semaphores[user_id] = semaphore
+            self._user_refs[user_id] = self._user_refs.get(user_id, 0) + 1
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            self._release_user_ref(user_id)
+            raise
+        return semaphore
+
+    def _release_user_ref(self, user_id: int):
+        with self._users_lock:
+            self._user_refs[user_id] -= 1
+            if self._user_refs[user_id] == 0:
+                del self._user_refs[user_id]
+                del self._user_semaphores[user_id]
+
+    @asynccontextmanager
+    async def extra_request(self, deadline: Optional[float] = None,
+                            concurrent: bool = True) -> AsyncIterator[None]:
+        """
+        Budget for one more upstream request made inside a guarded call (a hedge
+        or fallback): a rate token, plus a global slot when it runs alongside
+        the call's own request. Raises DeadlineExceededError if none frees in time.
+        """
+        if concurrent:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                await asyncio.wait_for(self.global_semaphore.acquire(), remaining)
+            except asyncio.TimeoutError:
+                raise DeadlineExceededError("No upstream slot free before the deadline")
+        try:
+            await self.bucket.acquire(deadline)
+            yield
+        finally:
+            if concurrent:
+                self.global_semaphore.release()
+
+    async def call(self, user_id: int, request_fn: Callable[[float], Awaitable[T]]) -> T:
+        """
+        Run `request_fn(timeout)` under the guard.
+        Raises CircuitOpenError when the breaker is open and DeadlineExceededError
+        when retries run out of time; the last upstream error is raised otherwise.
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("Upstream circuit is open")
+
+        deadline = time.monotonic() + self.deadline
+        user_semaphore = await self._acquire_user(user_id)
+        try:
+            async with self.global_semaphore:
+                return await self._call_with_retries(request_fn, deadline)
+        finally:
+            user_semaphore.release()
+            self._release_user_ref(user_id)
+
+    async def _call_with_retries(self, request_fn: Callable[[float], Awaitable[T]],
+                                 deadline: float) -> T:
+        attempt = 0
+        while True:
+            await self.bucket.acquire(deadline)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.breaker.record_failure()
+                raise DeadlineExceededError("Upstream deadline exceeded")
+
+            retry_after = None
+            try:
+                result = await asyncio.wait_for(request_fn(remaining), timeout=remaining)
+                self.breaker.record_success()
+                return result
+            except UpstreamError as e:
+                if not e.retryable:
+                    # Client-side errors say nothing about upstream health
+                    self.breaker.record_success()
+                    raise
+                error = e
+                retry_after = e.retry_after
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            except Exception:
+                self.breaker.record_failure()
+                raise
+
+            delay = self._backoff(attempt, retry_after)
+            attempt += 1
+            if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+                self.breaker.record_failure()
+                raise error
+            logger.warning(f"🔁 Upstream retry {attempt}/{self.max_retries} in {delay:.2f}s: {error}")
+            await asyncio.sleep(delay)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
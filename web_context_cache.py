@@ -0,0 +1,105 @@
+"""
+Web Context Cache - TTL-bounded, size-bounded cache with on-disk snapshots
+Stores web research results per resolved entity so repeated questions about
+the same author or work never refetch Wikipedia within the TTL
+"""
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 3600          # successful fetches: 1 hour
+DEFAULT_FAILURE_TTL = 300   # failed or empty fetches: retry after 5 minutes
+DEFAULT_MAX_ENTRIES = 1000
+SNAPSHOT_EVERY = 10         # write a snapshot after this many new successful entries
+
+
+class WebContextCache:
+    """LRU cache with per-entry expiry and JSON snapshots"""
+
+    def __init__(self, snapshot_path: Optional[str] = None, ttl: float = DEFAULT_TTL,
+                 failure_ttl: float = DEFAULT_FAILURE_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.snapshot_path = snapshot_path
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.dirty = 0
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached value for `key`, or None when missing or expired"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        if entry["expires_at"] <= time.time():
+            del self.entries[key]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry["value"]
+
+    def set(self, key: str, value: Dict, ok: bool = True):
+        """Store a value; failed lookups expire after the short failure TTL"""
+        ttl = self.ttl if ok else self.failure_ttl
+        self.entries[key] = {"value": value, "ok": ok, "expires_at": time.time() + ttl}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evicted"] += 1
+
+        if ok:
+            self.dirty += 1
+            if self.snapshot_path and self.dirty >= SNAPSHOT_EVERY:
+                self.save()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save(self, path: Optional[str] = None):
+        """Write successful, unexpired entries to disk atomically"""
+        path = path or self.snapshot_path
+        if not path:
+            return
+        now = time.time()
+        snapshot = {
+            key: entry for key, entry in self.entries.items()
+            if entry["ok"] and entry["expires_at"] > now
+        }
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self.dirty = 0
+            logger.info(f"💾 Web context cache snapshot: {len(snapshot)} entries")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save web context cache: {e}")
+
+    def load(self, path: Optional[str] = None):
+        """Load a snapshot, skipping entries that expired while we were down"""
+        path = path or self.snapshot_path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load web context cache: {e}")
+            return
+
+        now = time.time()
+        live = sorted(
+            ((key, entry) for key, entry in snapshot.items() if entry.get("expires_at", 0) > now),
+            key=lambda item: item[1]["expires_at"]
+        )
+        for key, entry in live[-self.max_entries:]:
+            self.entries[key] = entry
+        logger.info(f"📚 Web context cache loaded: {len(self.entries)} entries")
@@ -6,63 +6,309 @@ Builds and expands knowledge base automatically
 import asyncio
 import aiohttp
 import logging
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
 import json
-from bs4 import BeautifulSoup
-import re
+from urllib.parse import urlencode
+
+from http_cache import HttpCache, HTTP_CACHE_DIR
+from field_extractor import extract_fields, year_pattern
+from html_extractor import HtmlExtractor, MAX_DOCUMENT_BYTES, sniff_charset
 
 logger = logging.getLogger(__name__)
 
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+
+# Connection pool settings
+MAX_CONNECTIONS = 20           # sockets across all hosts
+MAX_CONNECTIONS_PER_HOST = 6   # sockets per host (Wikipedia etiquette)
+DNS_CACHE_TTL = 300            # seconds
+MAX_CONCURRENT_FETCHES = 8     # pages fetched at once by bulk helpers
+REQUEST_TIMEOUT = 10           # seconds per request
+HTML_READ_CHUNK = 64 * 1024    # bytes per read while streaming an HTML body
+
+# MediaWiki accepts up to 50 titles per query, but TextExtracts only returns
+# several extracts at once for intro-only extracts and at most 20 per request
+MAX_TITLES_PER_QUERY = 50
+MAX_EXTRACTS_PER_QUERY = 20
+BATCH_WINDOW = 0.01            # seconds the batcher waits for more titles
+
+# Query used for author and work pages
+EXTRACT_QUERY = {
+    "prop": "extracts|pageimages|info",
+    "explaintext": 1,
+    "exintro": 1,
+    "exlimit": "max",
+}
+
+# Revision metadata only - cheap enough to check 50 pages per request
+REVISION_QUERY = {
+    "prop": "info",
+}
+
+
+class WikipediaBatcher:
+    """
+    Coalesces concurrent single-title lookups into multi-title queries.
+    Callers await `get(title)`; pending titles are flushed when a batch is
+    full or after BATCH_WINDOW, and each caller receives its own page.
+    """
+    
+    def __init__(self, fetch_titles, batch_size: int, window: float = BATCH_WINDOW):
+        self.fetch_titles = fetch_titles  # async (titles) -> {title: page or None}
+        self.batch_size = batch_size
+        self.window = window
+        self.pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+    
+    async def get(self, title: str) -> Optional[Dict]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.setdefault(title, []).append(future)
+        
+        if len(self.pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch: Dict[str, List[asyncio.Future]]):
+        try:
+            pages = await self.fetch_titles(list(batch))
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for title, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(pages.get(title))
+
+async def _close_with_loop(session: aiohttp.ClientSession) -> AsyncIterator[None]:
+    """Parked on a session's loop; the loop's shutdown_asyncgens() closes the session"""
+    try:
+        yield
+    finally:
+        await session.close()
+
+
 class LiteratureWebScraper:
     """Scrapes literature data from Wikipedia and other sources"""
     
-    def __init__(self):
+    def __init__(self, api_url: str = WIKIPEDIA_API_URL,
+                 max_connections: int = MAX_CONNECTIONS,
+                 max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+                 max_concurrency: int = MAX_CONCURRENT_FETCHES,
+                 cache_dir: Optional[str] = HTTP_CACHE_DIR):
         self.authors_cache = {}
         self.works_cache = {}
         self.movements_cache = {}
-        self.session = None
+        self.api_url = api_url
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.max_concurrency = max_concurrency
+        # aiohttp sessions and batchers belong to one event loop; Flask runs
+        # every async view on a fresh loop, so each loop gets its own
+        self.sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self.batchers: Dict[asyncio.AbstractEventLoop, WikipediaBatcher] = {}
+        self._session_closers: Dict[asyncio.AbstractEventLoop, AsyncIterator[None]] = {}
+        # Persistent HTTP cache; pass cache_dir=None to disable
+        self.http_cache = HttpCache(cache_dir) if cache_dir else None
+        # Process pool for HTML parsing, created on first use
+        self.html_extractor: Optional[HtmlExtractor] = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Pooled session of the running loop: one connector with global and per-host limits"""
+        loop = asyncio.get_running_loop()
+        # Sessions reference their loop, so entries of finished loops are dropped by hand
+        for finished in [other for other in self.sessions if other.is_closed()]:
+            self.sessions.pop(finished, None)
+            self.batchers.pop(finished, None)
+            self._session_closers.pop(finished, None)
+        session = self.sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                ttl_dns_cache=DNS_CACHE_TTL,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            )
+            self.sessions[loop] = session
+            # Start the closer so the loop tracks it; asyncio.run (and asgiref)
+            # finalize tracked async generators before closing the loop
+            closer = _close_with_loop(session)
+            try:
+                closer.asend(None).send(None)
+            except StopIteration:
+                pass
+            self._session_closers[loop] = closer
+        return session
+    
+    async def _gather_bounded(self, coros: List) -> List:
+        """asyncio.gather with at most max_concurrency coroutines running"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run(coro):
+            async with semaphore:
+                return await coro
+        
+        return await asyncio.gather(*(run(coro) for coro in coros))
+    
+    async def _get_text(self, url: str, revalidate: bool = False) -> str:
+        """
+        GET through the on-disk cache: fresh entries are read locally, stale ones
+        are revalidated with a conditional request, and a stale copy is served
+        if the network fails. `revalidate` skips the local freshness check.
+        """
+        cache = self.http_cache
+        entry = await asyncio.to_thread(cache.lookup, url) if cache else None
+        if entry and not revalidate and cache.is_fresh(entry):
+            cache.stats["fresh"] += 1
+            return entry["body"]
+        
+        headers = cache.conditional_headers(entry) if entry else {}
+        try:
+            async with self._get_session().get(url, headers=headers) as resp:
+                if resp.status == 304 and entry:
+                    cache.stats["revalidated"] += 1
+                    await asyncio.to_thread(cache.refresh, url, entry, resp.headers)
+                    return entry["body"]
+                if resp.status != 200:
+                    raise aiohttp.ClientResponseError(
+                        resp.request_info, resp.history, status=resp.status,
+                        message=f"HTTP {resp.status} for {url}"
+                    )
+                body = await resp.text()
+                if cache:
+                    await asyncio.to_thread(cache.store, url, body, resp.headers)
+                return body
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if entry:
+                cache.stats["stale_served"] += 1
+                logger.warning(f"⚠️ Serving stale cached copy of {url}")
+                return entry["body"]
+            raise
     
     async def fetch_url(self, url: str) -> Optional[str]:
         """Fetch URL with error handling"""
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
-            
-            async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                if resp.status == 200:
-                    return await resp.text()
+            return await self._get_text(url)
         except Exception as e:
             logger.warning(f"Failed to fetch {url}: {e}")
         return None
     
+    async def _query(self, params: Dict, revalidate: bool = False) -> Dict:
+        """Run one MediaWiki API query and return the decoded JSON"""
+        query = {"action": "query", "format": "json", "redirects": 1, **params}
+        # Sorted parameters give every logical query a single cache key
+        url = f"{self.api_url}?{urlencode(sorted(query.items()))}"
+        return json.loads(await self._get_text(url, revalidate))
+    
+    async def query_titles(self, titles: List[str], params: Dict, revalidate: bool = False,
+                           before_request: Optional[Callable[[], Awaitable]] = None
+                           ) -> Dict[str, Optional[Dict]]:
+        """
+        One multi-title query (following `continue`), demultiplexed back to the
+        requested titles through the `normalized` and `redirects` mappings.
+        `before_request` is awaited before every HTTP request, continuations included.
+        """
+        pages_by_title: Dict[str, Dict] = {}
+        aliases: Dict[str, str] = {}
+        request = {**params, "titles": "|".join(titles)}
+        
+        while True:
+            if before_request:
+                await before_request()
+            data = await self._query(request, revalidate)
+            query = data.get('query', {})
+            for mapping in query.get('normalized', []) + query.get('redirects', []):
+                aliases[mapping['from']] = mapping['to']
+            for page in query.get('pages', {}).values():
+                if 'missing' in page or 'invalid' in page:
+                    continue
+                # Continuation responses add fields (or more list items such as
+                # links) to pages we have already seen
+                merged = pages_by_title.setdefault(page['title'], {})
+                for key, value in page.items():
+                    if isinstance(value, list) and isinstance(merged.get(key), list):
+                        merged[key].extend(value)
+                    else:
+                        merged[key] = value
+            if 'continue' not in data:
+                break
+            request = {**request, **data['continue']}
+        
+        results = {}
+        for title in titles:
+            resolved = title
+            seen = set()
+            while resolved in aliases and resolved not in seen:
+                seen.add(resolved)
+                resolved = aliases[resolved]
+            results[title] = pages_by_title.get(resolved)
+        return results
+    
+    async def fetch_pages(self, titles: List[str], params: Dict = None,
+                          batch_size: int = MAX_EXTRACTS_PER_QUERY,
+                          revalidate: bool = False) -> Dict[str, Optional[Dict]]:
+        """Fetch many pages with multi-title queries of up to `batch_size` titles"""
+        params = params if params is not None else EXTRACT_QUERY
+        unique = list(dict.fromkeys(titles))
+        chunks = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+        
+        async def fetch_chunk(chunk):
+            try:
+                return await self.query_titles(chunk, params, revalidate)
+            except Exception as e:
+                logger.warning(f"Wikipedia batch fetch error ({len(chunk)} titles): {e}")
+                return {}
+        
+        results = {}
+        for chunk_result in await self._gather_bounded([fetch_chunk(c) for c in chunks]):
+            results.update(chunk_result)
+        logger.info(f"📦 Fetched {len(unique)} titles in {len(chunks)} batched requests")
+        return {title: results.get(title) for title in unique}
+    
+    async def _fetch_page(self, title: str) -> Optional[Dict]:
+        """Single-title lookup, coalesced with concurrent lookups into one query"""
+        loop = asyncio.get_running_loop()
+        batcher = self.batchers.get(loop)
+        if batcher is None:
+            batcher = self.batchers[loop] = WikipediaBatcher(
+                lambda titles: self.query_titles(titles, EXTRACT_QUERY),
+                batch_size=MAX_EXTRACTS_PER_QUERY,
+            )
+        return await batcher.get(title)
+    
+    def _author_info(self, page: Dict, author_name: str) -> Dict:
+        return author_entry(page, author_name)
+    
+    def _work_info(self, page: Dict, work_title: str) -> Dict:
+        return work_entry(page, work_title)
+    
     async def fetch_author_from_wikipedia(self, author_name: str) -> Dict:
         """Fetch comprehensive author information from Wikipedia"""
         try:
-            # Wikipedia API endpoint
-            url = f"https://en.wikipedia.org/w/api.php?action=query&titles={author_name}&prop=extracts|pageimages&explaintext=1&format=json"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        pages = data.get('query', {}).get('pages', {})
-                        
-                        for page_id, page in pages.items():
-                            if page_id != '-1':
-                                extract = page.get('extract', '')[:2000]
-                                
-                                # Parse key information
-                                author_info = {
-                                    "name": page.get('title', author_name),
-                                    "wikipedia_summary": extract,
-                                    "birth_year": extract_year(extract, "born"),
-                                    "death_year": extract_year(extract, "died"),
-                                    "nationality": extract_nationality(extract),
-                                    "era": extract_era(extract),
-                                }
-                                
-                                logger.info(f"✅ Fetched Wikipedia data for {author_name}")
-                                return author_info
+            page = await self._fetch_page(author_name)
+            if page:
+                logger.info(f"✅ Fetched Wikipedia data for {author_name}")
+                return self._author_info(page, author_name)
         except Exception as e:
             logger.warning(f"Wikipedia fetch error for {author_name}: {e}")
         
@@ -72,128 +318,233 @@ class LiteratureWebScraper:
         """Fetch comprehensive work information from Wikipedia"""
         try:
             search_query = f"{work_title} {author}" if author else work_title
-            url = f"https://en.wikipedia.org/w/api.php?action=query&titles={search_query}&prop=extracts&explaintext=1&format=json"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        pages = data.get('query', {}).get('pages', {})
-                        
-                        for page_id, page in pages.items():
-                            if page_id != '-1':
-                                extract = page.get('extract', '')[:2000]
-                                
-                                work_info = {
-                                    "title": page.get('title', work_title),
-                                    "wikipedia_summary": extract,
-                                    "author": extract_author(extract),
-                                    "year": extract_year(extract, "published|written|year"),
-                                    "genre": extract_genre(extract),
-                                    "themes": extract_themes(extract),
-                                }
-                                
-                                logger.info(f"✅ Fetched Wikipedia data for {work_title}")
-                                return work_info
+            page = await self._fetch_page(search_query)
+            if page:
+                logger.info(f"✅ Fetched Wikipedia data for {work_title}")
+                return self._work_info(page, work_title)
         except Exception as e:
             logger.warning(f"Wikipedia fetch error for {work_title}: {e}")
         
         return None
     
     async def fetch_multiple_authors(self, author_names: List[str]) -> Dict[str, Dict]:
-        """Fetch data for multiple authors concurrently"""
-        tasks = [self.fetch_author_from_wikipedia(name) for name in author_names]
-        results = await asyncio.gather(*tasks)
+        """Fetch data for multiple authors with batched multi-title queries"""
+        pages = await self.fetch_pages(author_names)
         
         return {
-            author_names[i]: results[i]
-            for i in range(len(author_names))
-            if results[i]
+            name: self._author_info(pages[name], name)
+            for name in author_names
+            if pages.get(name)
         }
     
     async def fetch_multiple_works(self, works: List[tuple]) -> Dict[str, Dict]:
-        """Fetch data for multiple works concurrently"""
-        tasks = [
-            self.fetch_work_from_wikipedia(title, author)
-            for title, author in works
+        """Fetch data for multiple works with batched multi-title queries"""
+        queries = [f"{title} {author}" if author else title for title, author in works]
+        pages = await self.fetch_pages(queries)
+        
+        entries = [
+            self._work_info(pages[query], title)
+            for (title, _), query in zip(works, queries)
+            if pages.get(query)
         ]
-        results = await asyncio.gather(*tasks)
+        return {work_key(entry): entry for entry in entries}
+    
+    async def refresh_entries(self, kb: Dict) -> Dict:
+        """
+        Refresh a knowledge base built by this scraper in place.
+        Only revision metadata is queried (50 titles per request); pages whose
+        lastrevid changed are refetched and re-extracted, the rest are untouched.
+        """
+        tracked = []  # (section, key, page title)
+        for section, title_field in (("authors", "name"), ("works", "title")):
+            for key, entry in kb.get(section, {}).items():
+                tracked.append((section, key, entry.get(title_field, key)))
         
-        return {
-            f"{works[i][0]} by {works[i][1]}": results[i]
-            for i in range(len(works))
-            if results[i]
-        }
+        titles = [title for _, _, title in tracked]
+        latest = await self.fetch_pages(
+            titles, REVISION_QUERY, batch_size=MAX_TITLES_PER_QUERY, revalidate=True
+        )
+        
+        changed = []
+        failed = 0
+        for section, key, title in tracked:
+            page = latest.get(title)
+            if page is None:
+                failed += 1  # deleted, renamed away or fetch failed - keep what we have
+                continue
+            known = kb[section][key].get("page_revision") or {}
+            if known.get("lastrevid") != page.get("lastrevid"):
+                changed.append((section, key, title))
+        
+        refreshed = 0
+        if changed:
+            pages = await self.fetch_pages([title for _, _, title in changed], revalidate=True)
+            for section, key, title in changed:
+                page = pages.get(title)
+                if not page:
+                    failed += 1  # known to be stale, but the refetch failed
+                    continue
+                if section == "authors":
+                    kb[section][key] = self._author_info(page, title)
+                else:
+                    kb[section][key] = self._work_info(page, title)
+                refreshed += 1
+        
+        stats = {"checked": len(tracked), "changed": refreshed, "failed": failed,
+                 "unchanged": len(tracked) - refreshed - failed}
+        logger.info(f"🔄 Refresh: {stats}")
+        return stats
+    
+    async def _get_html(self, url: str) -> Optional[str]:
+        """GET an HTML page, refusing bodies over MAX_DOCUMENT_BYTES without reading them"""
+        try:
+            async with self._get_session().get(url) as resp:
+                if resp.status != 200:
+                    logger.warning(f"Failed to fetch {url}: HTTP {resp.status}")
+                    return None
+                if (resp.content_length or 0) > MAX_DOCUMENT_BYTES:
+                    logger.warning(f"⚠️ Skipping {url}: {resp.content_length} bytes exceeds the cap")
+                    return None
+                # read(n) returns whatever is buffered, so stream to EOF or the cap
+                body = bytearray()
+                async for chunk in resp.content.iter_chunked(HTML_READ_CHUNK):
+                    body += chunk
+                    if len(body) > MAX_DOCUMENT_BYTES:
+                        logger.warning(f"⚠️ Skipping {url}: body exceeds {MAX_DOCUMENT_BYTES} bytes")
+                        return None
+                # get_encoding() raises when Content-Type has no charset
+                return body.decode(sniff_charset(body, resp.charset), errors="replace")
+        except Exception as e:
+            logger.warning(f"Failed to fetch {url}: {e}")
+        return None
+    
+    async def fetch_html_pages(self, urls: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch literature pages from sites without a JSON API. Downloads stay on
+        the event loop; BeautifulSoup parsing runs in the HtmlExtractor pool.
+        """
+        if self.html_extractor is None:
+            self.html_extractor = HtmlExtractor()
+        
+        async def fetch_and_parse(url):
+            html = await self._get_html(url)
+            return await self.html_extractor.extract(url, html) if html else None
+        
+        results = await self._gather_bounded([fetch_and_parse(url) for url in urls])
+        return {url: result for url, result in zip(urls, results) if result}
     
     async def close(self):
         """Close session"""
-        if self.session:
-            await self.session.close()
+        if self.html_extractor:
+            self.html_extractor.close()
+            self.html_extractor = None
+        # Sessions of other loops are closed when those loops shut down
+        session = self.sessions.pop(asyncio.get_running_loop(), None)
+        if session:
+            await session.close()
 
 
 # Helper functions for data extraction
+def page_revision(page: Dict) -> Dict:
+    """Revision metadata used for incremental refresh"""
+    return {
+        "pageid": page.get("pageid"),
+        "lastrevid": page.get("lastrevid"),
+        "touched": page.get("touched"),
+    }
+
+
+def author_entry(page: Dict, author_name: str) -> Dict:
+    """Knowledge base entry for an author page (API result or dump page)"""
+    extract = page.get('extract', '')[:2000]
+    fields = extract_fields(extract)
+    
+    # Parse key information
+    return {
+        "name": page.get('title', author_name),
+        "wikipedia_summary": extract,
+        "birth_year": fields["birth_year"],
+        "death_year": fields["death_year"],
+        "nationality": fields["nationality"],
+        "era": fields["era"],
+        "page_revision": page_revision(page),
+    }
+
+
+def work_entry(page: Dict, work_title: str) -> Dict:
+    """Knowledge base entry for a work page (API result or dump page)"""
+    extract = page.get('extract', '')[:2000]
+    fields = extract_fields(extract)
+    
+    return {
+        "title": page.get('title', work_title),
+        "wikipedia_summary": extract,
+        "author": fields["author"],
+        "year": fields["year"],
+        "genre": fields["genre"],
+        "themes": fields["themes"],
+        "page_revision": page_revision(page),
+    }
+
+
+def work_key(entry: Dict) -> str:
+    """Knowledge base key for a work entry, the same whichever source produced it"""
+    if entry.get("author"):
+        return f"{entry['title']} by {entry['author']}"
+    return entry["title"]
+
+
 def extract_year(text: str, keywords: str) -> Optional[int]:
     """Extract year from text"""
-    pattern = rf"({'|'.join(keywords.split('|'))})\s+(\d{{4}})"
-    match = re.search(pattern, text, re.IGNORECASE)
-    if match:
-        try:
-            return int(match.group(2))
-        except:
-            pass
-    return None
+    match = year_pattern(keywords).search(text)
+    return int(match.group(1)) if match else None
 
 
 def extract_nationality(text: str) -> str:
     """Extract nationality from text"""
-    nationalities = ['Russian', 'English', 'French', 'German', 'American', 'Italian']
-    for nat in nationalities:
-        if nat.lower() in text.lower():
-            return nat
-    return "Unknown"
+    return extract_fields(text)["nationality"]
 
 
 def extract_era(text: str) -> str:
     """Extract literary era"""
-    eras = [
-        'Romantic', 'Victorian', 'Elizabethan', 'Realist', 'Modernist',
-        'Baroque', 'Classical', 'Medieval', 'Renaissance', 'Contemporary'
-    ]
-    for era in eras:
-        if era.lower() in text.lower():
-            return era
-    return "Unknown"
+    return extract_fields(text)["era"]
 
 
 def extract_author(text: str) -> str:
     """Extract author name from work description"""
-    pattern = r"by\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)"
-    match = re.search(pattern, text)
-    if match:
-        return match.group(1)
-    return "Unknown"
+    return extract_fields(text)["author"]
 
 
 def extract_genre(text: str) -> str:
     """Extract genre from text"""
-    genres = ['novel', 'play', 'poem', 'drama', 'tragedy', 'comedy', 'novella', 'short story']
-    for genre in genres:
-        if genre.lower() in text.lower():
-            return genre.capitalize()
-    return "Literary Work"
+    return extract_fields(text)["genre"]
 
 
 def extract_themes(text: str) -> List[str]:
     """Extract themes from text"""
-    themes = [
-        'love', 'death', 'power', 'morality', 'freedom', 'society', 'betrayal',
-        'redemption', 'justice', 'identity', 'fate', 'madness', 'revenge', 'grief'
-    ]
-    found_themes = []
-    for theme in themes:
-        if theme in text.lower():
-            found_themes.append(theme.capitalize())
-    return found_themes[:3]  # Top 3 themes
+    return extract_fields(text)["themes"]
+
+
+# List of famous authors to fetch
+SEED_AUTHORS = [
+    "Leo Tolstoy", "Fyodor Dostoevsky", "Alexander Pushkin",
+    "Anton Chekhov", "Nikolai Gogol", "Ivan Turgenev",
+    "William Shakespeare", "Jane Austen", "Charles Dickens",
+    "Oscar Wilde", "Franz Kafka", "James Joyce",
+    "Virginia Woolf", "Ernest Hemingway", "George Bernard Shaw"
+]
+
+# List of famous works to fetch
+SEED_WORKS = [
+    ("War and Peace", "Tolstoy"),
+    ("Crime and Punishment", "Dostoevsky"),
+    ("Eugene Onegin", "Pushkin"),
+    ("The Great Gatsby", "Fitzgerald"),
+    ("Hamlet", "Shakespeare"),
+    ("Pride and Prejudice", "Austen"),
+    ("1984", "Orwell"),
+    ("The Brothers Karamazov", "Dostoevsky"),
+]
 
 
 async def build_expanded_knowledge_base() -> Dict:
@@ -203,26 +554,8 @@ async def build_expanded_knowledge_base() -> Dict:
     try:
         logger.info("🌐 Starting web-based knowledge base expansion...")
         
-        # List of famous authors to fetch
-        authors_to_fetch = [
-            "Leo Tolstoy", "Fyodor Dostoevsky", "Alexander Pushkin",
-            "Anton Chekhov", "Nikolai Gogol", "Ivan Turgenev",
-            "William Shakespeare", "Jane Austen", "Charles Dickens",
-            "Oscar Wilde", "Franz Kafka", "James Joyce",
-            "Virginia Woolf", "Ernest Hemingway", "George Bernard Shaw"
-        ]
-        
-        # List of famous works to fetch
-        works_to_fetch = [
-            ("War and Peace", "Tolstoy"),
-            ("Crime and Punishment", "Dostoevsky"),
-            ("Eugene Onegin", "Pushkin"),
-            ("The Great Gatsby", "Fitzgerald"),
-            ("Hamlet", "Shakespeare"),
-            ("Pride and Prejudice", "Austen"),
-            ("1984", "Orwell"),
-            ("The Brothers Karamazov", "Dostoevsky"),
-        ]
+        authors_to_fetch = SEED_AUTHORS
+        works_to_fetch = SEED_WORKS
         
         # Fetch data
         logger.info(f"📖 Fetching {len(authors_to_fetch)} authors...")
@@ -245,7 +578,38 @@ async def build_expanded_knowledge_base() -> Dict:
         await scraper.close()
 
 
+async def refresh_expanded_knowledge_base(kb: Dict) -> Dict:
+    """Bring a previously built knowledge base up to date with a revision-delta refresh"""
+    scraper = LiteratureWebScraper()
+    try:
+        stats = await scraper.refresh_entries(kb)
+        kb["timestamp"] = str(asyncio.get_event_loop().time())
+        kb["last_refresh"] = stats
+        return kb
+    finally:
+        await scraper.close()
+
+
 if __name__ == "__main__":
+    import argparse
+    
     logging.basicConfig(level=logging.INFO)
-    kb = asyncio.run(build_expanded_knowledge_base())
-    print(json.dumps(kb, indent=2, ensure_ascii=False))
+    parser = argparse.ArgumentParser(description="Build or refresh the expanded knowledge base")
+    parser.add_argument("--output", help="Write the knowledge base to this file instead of stdout")
+    parser.add_argument("--refresh", metavar="KB_FILE",
+                        help="Refresh an existing knowledge base file, refetching only changed pages")
+    args = parser.parse_args()
+    
+    if args.refresh:
+        with open(args.refresh, 'r', encoding='utf-8') as f:
+            kb = asyncio.run(refresh_expanded_knowledge_base(json.load(f)))
+    else:
+        kb = asyncio.run(build_expanded_knowledge_base())
+    
+    output_path = args.output or args.refresh
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(kb, f, indent=2, ensure_ascii=False)
+        logger.info(f"💾 Knowledge base written to {output_path}")
+    else:
+        print(json.dumps(kb, indent=2, ensure_ascii=False))